@@ -0,0 +1,240 @@
+"""
+BITFIELD support: typed integer fields at arbitrary bit offsets of a string.
+"""
+from mockredis.bitops import MAX_BIT_OFFSET, from_bytes, to_bytes
+from mockredis.exceptions import ResponseError
+
+OVERFLOW_MODES = ('WRAP', 'SAT', 'FAIL')
+
+
+class BitFieldOperation(object):
+    """
+    Builds up a BITFIELD command, as redis-py's ``BitFieldOperation`` does, and executes
+    it against a ``MockRedis``.
+    """
+
+    def __init__(self, client, key, default_overflow=None):
+        self.client = client
+        self.key = key
+        self._default_overflow = default_overflow
+        self.reset()
+
+    def reset(self):
+        """
+        Discard the operations built up so far.
+        """
+        self.operations = []
+        self._last_overflow = 'WRAP'
+        self.overflow(self._default_overflow or self._last_overflow)
+
+    def overflow(self, overflow):
+        """
+        Set the overflow mode (WRAP, SAT or FAIL) of the following SET and INCRBY operations.
+        """
+        overflow = overflow.upper()
+        if overflow != self._last_overflow:
+            self._last_overflow = overflow
+            self.operations.append(('OVERFLOW', overflow))
+        return self
+
+    def incrby(self, fmt, offset, increment, overflow=None):
+        """
+        Increment a field, returning its new value.
+        """
+        if overflow is not None:
+            self.overflow(overflow)
+        self.operations.append(('INCRBY', fmt, offset, increment))
+        return self
+
+    def get(self, fmt, offset):
+        """
+        Get a field.
+        """
+        self.operations.append(('GET', fmt, offset))
+        return self
+
+    def set(self, fmt, offset, value):
+        """
+        Set a field, returning its previous value.
+        """
+        self.operations.append(('SET', fmt, offset, value))
+        return self
+
+    @property
+    def command(self):
+        command = ['BITFIELD', self.key]
+        for operation in self.operations:
+            command.extend(operation)
+        return command
+
+    def execute(self):
+        """
+        Execute the operations, returning a list with one result per GET, SET and INCRBY.
+        """
+        arguments = self.command[2:]
+        self.reset()
+        return self.client._bitfield(self.key, arguments)
+
+
+class Field(object):
+    """
+    One parsed GET, SET or INCRBY sub-command of BITFIELD.
+    """
+    __slots__ = ('operation', 'signed', 'width', 'offset', 'value', 'overflow')
+
+    def __init__(self, operation, fmt, offset, value, overflow):
+        self.operation = operation
+        self.signed, self.width = parse_type(fmt)
+        self.offset = parse_offset(offset, self.width)
+        self.value = value
+        self.overflow = overflow
+
+    @property
+    def end(self):
+        """
+        The bit offset just past the field.
+        """
+        return self.offset + self.width
+
+    def bounds(self):
+        """
+        Return the smallest and largest values the field can hold.
+        """
+        if self.signed:
+            return -(1 << (self.width - 1)), (1 << (self.width - 1)) - 1
+        return 0, (1 << self.width) - 1
+
+    def read(self, data):
+        """
+        Read the field from a byte string, which is treated as padded with zero bytes.
+        """
+        first, last = self.offset >> 3, (self.end + 7) >> 3
+        chunk = bytes(data[first:last])
+        value = from_bytes(chunk + b'\x00' * (last - first - len(chunk)))
+        value = value >> (last * 8 - self.end) & ((1 << self.width) - 1)
+        if self.signed and value >> (self.width - 1):
+            value -= 1 << self.width
+        return value
+
+    def write(self, bitmap, value):
+        """
+        Write the field into a bytearray that is long enough to hold it.
+        """
+        first, last = self.offset >> 3, (self.end + 7) >> 3
+        shift = last * 8 - self.end
+        mask = ((1 << self.width) - 1) << shift
+        current = from_bytes(bytes(bitmap[first:last]))
+        bitmap[first:last] = to_bytes(current & ~mask | (value << shift) & mask, last - first)
+
+    def limit(self, value):
+        """
+        Apply the overflow mode to a new value, returning None if it fails.
+        """
+        low, high = self.bounds()
+        if low <= value <= high:
+            return value
+        if self.overflow == 'FAIL':
+            return None
+        if self.overflow == 'SAT':
+            return high if value > high else low
+        value &= (1 << self.width) - 1
+        if self.signed and value >> (self.width - 1):
+            value -= 1 << self.width
+        return value
+
+
+def parse_type(fmt):
+    """
+    Parse a field type such as ``i16`` or ``u8`` into its signedness and width.
+    """
+    fmt = _text(fmt)
+    try:
+        signed, width = fmt[:1].lower(), int(fmt[1:])
+    except ValueError:
+        signed, width = None, 0
+    if (signed == 'i' and 1 <= width <= 64) or (signed == 'u' and 1 <= width <= 63):
+        return signed == 'i', width
+    raise ResponseError("Invalid bitfield type. Use something like i16 u8. "
+                        "Note that u64 is not supported but i64 is.")
+
+
+def parse_offset(offset, width):
+    """
+    Parse a bit offset, or a ``#N`` offset counted in fields of ``width`` bits.
+    """
+    offset = _text(offset)
+    try:
+        offset = int(offset[1:]) * width if offset.startswith('#') else int(offset)
+    except ValueError:
+        offset = -1
+    if not 0 <= offset or offset + width - 1 > MAX_BIT_OFFSET:
+        raise ResponseError("bit offset is not an integer or out of range")
+    return offset
+
+
+def parse_fields(arguments, read_only=False):
+    """
+    Parse the sub-commands of BITFIELD into a list of ``Field``.
+    """
+    fields = []
+    overflow = 'WRAP'
+    arguments = list(arguments)
+    position = 0
+    try:
+        while position < len(arguments):
+            operation = _text(arguments[position]).upper()
+            if read_only and operation != 'GET':
+                raise ResponseError("BITFIELD_RO only supports the GET subcommand")
+            if operation == 'OVERFLOW':
+                overflow = _text(arguments[position + 1]).upper()
+                if overflow not in OVERFLOW_MODES:
+                    raise ResponseError("Invalid OVERFLOW type specified")
+                position += 2
+            elif operation == 'GET':
+                fields.append(Field(operation, arguments[position + 1], arguments[position + 2],
+                                    None, overflow))
+                position += 3
+            elif operation in ('SET', 'INCRBY'):
+                try:
+                    value = int(arguments[position + 3])
+                except ValueError:
+                    raise ResponseError("value is not an integer or out of range")
+                fields.append(Field(operation, arguments[position + 1], arguments[position + 2],
+                                    value, overflow))
+                position += 4
+            else:
+                raise ResponseError("syntax error")
+    except IndexError:
+        raise ResponseError("syntax error")
+    return fields
+
+
+def execute_fields(fields, data):
+    """
+    Execute parsed fields in order on ``data`` and return their results.
+
+    ``data`` may be any byte string if every field is a GET, and must otherwise be a
+    bytearray long enough to hold every field that is written.
+    """
+    results = []
+    for field in fields:
+        current = field.read(data)
+        if field.operation == 'GET':
+            results.append(current)
+            continue
+        value = field.limit(field.value if field.operation == 'SET' else current + field.value)
+        if value is None:
+            results.append(None)
+            continue
+        field.write(data, value)
+        results.append(current if field.operation == 'SET' else value)
+    return results
+
+
+def _text(argument):
+    """
+    Convert a sub-command argument, which may be bytes, to a native string.
+    """
+    if isinstance(argument, bytes) and not isinstance(argument, str):
+        return argument.decode('ascii', 'replace')
+    return str(argument)
@@ -0,0 +1,147 @@
+"""
+Bitmap operations on byte strings (SETBIT, GETBIT, BITCOUNT, BITPOS, BITOP).
+
+Bits are numbered from the most significant bit of the first byte, as Redis does. Counting
+and combining work on large integers built from whole chunks of bytes rather than on
+individual bits.
+"""
+from binascii import hexlify, unhexlify
+from functools import reduce
+from operator import and_, or_, xor
+import sys
+
+if sys.version_info >= (3, 0):
+    xrange = range
+
+# number of bytes converted to an integer at a time
+CHUNK_SIZE = 1 << 16
+
+# largest bit offset Redis accepts (bitmaps are limited to 512MB)
+MAX_BIT_OFFSET = 2 ** 32 - 1
+
+OPERATORS = {
+    'AND': and_,
+    'OR': or_,
+    'XOR': xor,
+}
+
+
+if hasattr(int, 'from_bytes'):
+    def from_bytes(data):
+        """
+        Convert big-endian bytes to an integer.
+        """
+        return int.from_bytes(data, 'big')
+
+    def to_bytes(value, length):
+        """
+        Convert an integer to ``length`` big-endian bytes.
+        """
+        return value.to_bytes(length, 'big')
+else:
+    def from_bytes(data):
+        return int(hexlify(data) or b'0', 16)
+
+    def to_bytes(value, length):
+        return unhexlify('{:0{}x}'.format(value, length * 2)) if length else b''
+
+
+if hasattr(int, 'bit_count'):
+    def bit_count(value):
+        """
+        Return the number of set bits in a non-negative integer.
+        """
+        return value.bit_count()
+else:
+    def bit_count(value):
+        return bin(value).count('1')
+
+
+def getbit(data, offset):
+    """
+    Return the bit at ``offset``, which is zero past the end of ``data``.
+    """
+    index = offset >> 3
+    if index >= len(data):
+        return 0
+    return bytearray(data[index:index + 1])[0] >> (7 - (offset & 7)) & 1
+
+
+def setbit(bitmap, offset, value):
+    """
+    Set the bit at ``offset`` of a bytearray, growing it with zero bytes if needed, and return
+    the previous bit.
+    """
+    index, shift = offset >> 3, 7 - (offset & 7)
+    if index >= len(bitmap):
+        bitmap.extend(b'\x00' * (index + 1 - len(bitmap)))
+    previous = bitmap[index] >> shift & 1
+    bitmap[index] = bitmap[index] & (0xff ^ (1 << shift)) | (value << shift)
+    return previous
+
+
+def bitcount(data, start=0, end=None):
+    """
+    Count the set bits from bit ``start`` up to (but excluding) bit ``end``.
+    """
+    length = len(data) * 8
+    end = length if end is None else min(end, length)
+    if start >= end:
+        return 0
+    first, last = start >> 3, (end + 7) >> 3
+    count = _popcount(memoryview(data)[first:last])
+    # remove the bits of the partial bytes at either end
+    head = start & 7
+    if head:
+        count -= bit_count(bytearray(data[first:first + 1])[0] >> (8 - head))
+    tail = last * 8 - end
+    if tail:
+        count -= bit_count(bytearray(data[last - 1:last])[0] & ((1 << tail) - 1))
+    return count
+
+
+def bitpos(data, bit, start=0, end=None):
+    """
+    Return the position of the first bit set to ``bit`` from bit ``start`` up to (but
+    excluding) bit ``end``, or -1 if there is none.
+    """
+    length = len(data) * 8
+    end = length if end is None else min(end, length)
+    skip = b'\x00' if bit else b'\xff'
+    index = start >> 3
+    last = (end + 7) >> 3
+    while index < last:
+        chunk = bytes(data[index:min(last, index + CHUNK_SIZE)])
+        # skip over whole bytes that cannot hold a match
+        remaining = len(chunk.lstrip(skip))
+        if not remaining:
+            index += len(chunk)
+            continue
+        index += len(chunk) - remaining
+        for position in xrange(max(start, index * 8), min(end, index * 8 + 8)):
+            if getbit(data, position) == bit:
+                return position
+        index += 1
+    return -1
+
+
+def bitop(operation, values):
+    """
+    Combine byte strings with a bitwise AND, OR, XOR or NOT, padding shorter strings with zero
+    bytes, and return the result.
+    """
+    length = max(len(value) for value in values) if values else 0
+    if operation == 'NOT':
+        (value,) = values
+        return to_bytes(from_bytes(value) ^ ((1 << (length * 8)) - 1), length)
+    combine = OPERATORS[operation]
+    return to_bytes(reduce(combine, (from_bytes(bytes(value) + b'\x00' * (length - len(value)))
+                                     for value in values)), length)
+
+
+def _popcount(view):
+    """
+    Count the set bits of a memoryview, converting it to integers a chunk at a time.
+    """
+    return sum(bit_count(from_bytes(view[offset:offset + CHUNK_SIZE].tobytes()))
+               for offset in xrange(0, len(view), CHUNK_SIZE))
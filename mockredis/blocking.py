@@ -0,0 +1,68 @@
+"""
+Bookkeeping for clients blocked on lists (BLPOP, BRPOP, BRPOPLPUSH).
+"""
+from collections import deque
+
+
+class BlockedClient(object):
+    """
+    A client waiting for one of several lists to receive a value.
+
+    ``serve`` is called with the name of a list that has values and returns the client's
+    result (or None if it could not be served from that list).
+    """
+
+    def __init__(self, keys, serve, condition):
+        self.keys = keys
+        self.serve = serve
+        self.condition = condition
+        self.result = None
+        self.served = False
+
+
+class WaitQueue(object):
+    """
+    First-in, first-out queues of blocked clients, by list name.
+    """
+
+    def __init__(self):
+        # dictionary from list name to deque of BlockedClient
+        self._queues = {}
+
+    def __len__(self):
+        """
+        Return the number of lists with blocked clients.
+        """
+        return len(self._queues)
+
+    def __contains__(self, key):
+        return key in self._queues
+
+    def add(self, client):
+        """
+        Queue a client on each of its lists.
+        """
+        for key in client.keys:
+            self._queues.setdefault(key, deque()).append(client)
+
+    def remove(self, client):
+        """
+        Remove a client from the queues of all of its lists.
+        """
+        for key in client.keys:
+            queue = self._queues.get(key)
+            if queue is None:
+                continue
+            try:
+                queue.remove(client)
+            except ValueError:
+                pass
+            if not queue:
+                del self._queues[key]
+
+    def oldest(self, key):
+        """
+        Return the client that has been blocked on ``key`` the longest, or None.
+        """
+        queue = self._queues.get(key)
+        return queue[0] if queue else None
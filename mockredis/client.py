@@ -1,26 +1,56 @@
 from __future__ import division
-from collections import defaultdict
-from itertools import chain
+from collections import defaultdict, deque
+from itertools import chain, count, islice
 from datetime import datetime, timedelta
 from hashlib import sha1
+from heapq import nlargest, nsmallest
+from math import isinf, isnan
 from operator import add
-from random import choice, sample
-import time
+from threading import Condition, RLock
+from weakref import WeakValueDictionary
 import re
 import sys
 
-from mockredis.clock import SystemClock
-from mockredis.lock import MockRedisLock
+from mockredis import bitops
+from mockredis.bitfield import BitFieldOperation, execute_fields, parse_fields
+from mockredis.blocking import BlockedClient, WaitQueue
+from mockredis.clock import SystemClock, VirtualClock
+from mockredis.compacthash import CompactHash
+from mockredis.compression import CompressedString, Compressor
+from mockredis.dedup import ValuePool
 from mockredis.exceptions import RedisError, ResponseError
+from mockredis.expiry import ExpiryIndex
+from mockredis.hyperloglog import HyperLogLog
+from mockredis.indexedset import IndexedSet
+from mockredis.intset import IntSet, as_integer
+from mockredis.lock import MockRedisLock
+from mockredis.mutablestring import (MAX_STRING_LENGTH, MutableString, is_ascii,
+                                     is_ascii_compatible, to_bytes)
+from mockredis.notifications import (NOTIFY_CHANNELS, NOTIFY_EXPIRED, NOTIFY_GENERIC,
+                                     NOTIFY_HASH, NOTIFY_KEYEVENT, NOTIFY_KEYSPACE,
+                                     NOTIFY_LIST, NOTIFY_SET, NOTIFY_STRING, NOTIFY_ZSET,
+                                     flags_to_string, parse_flags)
 from mockredis.pipeline import MockRedisPipeline
+from mockredis.quicklist import QuickList
 from mockredis.script import Script
+from mockredis.setalgebra import difference, intersection, union
+from mockredis.shared import SHARED_STRING_LENGTH, shared
 from mockredis.sortedset import SortedSet
+from mockredis.views import HashView, SetView
 
 if sys.version_info >= (3, 0):
     long = int
     xrange = range
     basestring = str
+    unicode = str
     from functools import reduce
+    from sys import intern
+
+# value types of int-encoded strings
+INTEGER_TYPES = (int, long)
+# range of int-encoded strings and of INCR results
+LONG_MIN = -2 ** 63
+LONG_MAX = 2 ** 63 - 1
 
 
 class MockRedis(object):
@@ -29,33 +59,142 @@ class MockRedis(object):
 
     Expire functionality must be explicitly
     invoked using do_expire(time). Automatic
-    expiry is NOT supported.
+    expiry is NOT supported, unless a VirtualClock
+    is used, in which case advancing the clock
+    expires keys.
     """
 
+    # Redis type names of the stored data structures
+    TYPE_NAMES = {
+        dict: 'hash',
+        CompactHash: 'hash',
+        str: 'string',
+        CompressedString: 'string',
+        bytes: 'string',
+        MutableString: 'string',
+        HyperLogLog: 'string',
+        int: 'string',
+        long: 'string',
+        IntSet: 'set',
+        IndexedSet: 'set',
+        QuickList: 'list',
+        SortedSet: 'zset',
+    }
+
+    # OBJECT ENCODING names of the stored data structures, other than strings
+    ENCODINGS = {
+        MutableString: 'raw',
+        HyperLogLog: 'raw',
+        CompressedString: 'raw',
+        int: 'int',
+        long: 'int',
+        dict: 'hashtable',
+        CompactHash: 'listpack',
+        IntSet: 'intset',
+        IndexedSet: 'hashtable',
+        QuickList: 'quicklist',
+        SortedSet: 'skiplist',
+    }
+
+    # Integer CONFIG parameters, and the attributes that hold their values
+    INTEGER_CONFIG = {
+        'set-max-intset-entries': '_max_intset_entries',
+        'hash-max-listpack-entries': '_max_listpack_entries',
+        'hash-max-listpack-value': '_max_listpack_value',
+        'hll-sparse-max-bytes': '_hll_sparse_max_bytes',
+    }
+
     def __init__(self,
                  strict=False,
                  clock=None,
                  load_lua_dependencies=True,
                  blocking_timeout=1000,
                  blocking_sleep_interval=0.01,
+                 zero_copy=False,
+                 decode_responses=None,
+                 encoding='utf-8',
+                 compress_threshold=None,
+                 compression='zlib',
+                 decompressed_cache_size=16,
+                 dedup_threshold=None,
                  **kwargs):
         """
         Initialize as either StrictRedis or Redis.
 
         Defaults to non-strict.
+
+        String values are stored as given if they are bytes or strings (and as strings
+        otherwise), and returned as stored by default. Hash fields and values, list elements
+        and set and sorted set members are stored as strings if they are valid text, so that
+        text and bytes holding the same bytes are the same field or member. As in redis-py,
+        ``decode_responses=True`` returns string, hash, list, set and sorted set values as
+        text and ``decode_responses=False`` returns them as bytes, converting with
+        ``encoding``. Keys are always returned as stored.
+
+        In zero-copy mode, SMEMBERS, HGETALL, HKEYS and HVALS return read-only views of the
+        stored set or hash instead of copies. Zero-copy mode is not available together with
+        ``decode_responses``, which has to convert each value.
+
+        Given a ``compress_threshold``, string values of at least that many bytes are stored
+        compressed with ``compression`` ('zlib' or 'lzma') and decompressed when read, keeping
+        the ``decompressed_cache_size`` most recently read values. ``info`` reports how well
+        the stored values compress.
+
+        Given a ``dedup_threshold``, string values, hash values and list elements of at least
+        that many bytes are deduplicated: identical values are stored once.
         """
         self.strict = strict
+        self.db = kwargs.get('db', 0)
         self.clock = SystemClock() if clock is None else clock
         self.load_lua_dependencies = load_lua_dependencies
         self.blocking_timeout = blocking_timeout
+        # no longer used: blocked clients are woken by pushes instead of polling
         self.blocking_sleep_interval = blocking_sleep_interval
+        # Clients blocked on lists, and the lock they wait with
+        self._blocked = WaitQueue()
+        self._blocking_lock = RLock()
+        # Lists that received values while clients are blocked on them
+        self._ready_keys = deque()
+        self._serving_ready_keys = False
+        self.decode_responses = decode_responses
+        self.encoding = encoding
+        self._ascii_encoding = is_ascii_compatible(encoding)
+        self.zero_copy = zero_copy and decode_responses is None
+        self._compressor = None if compress_threshold is None else \
+            Compressor(compress_threshold, compression, decompressed_cache_size, encoding)
+        self._value_pool = None if dedup_threshold is None else ValuePool(dedup_threshold)
+        # Live views (see mockredis.views), by an arbitrary token
+        self._views = WeakValueDictionary()
+        self._view_tokens = count()
         # The 'Redis' store
         self.redis = defaultdict(dict)
-        self.timeouts = defaultdict(dict)
+        self.timeouts = ExpiryIndex()
+        # Hash field expiry times, by hash and then field
+        self.hash_timeouts = {}
+        # Earliest field expiry time, by hash
+        self._hash_expiries = ExpiryIndex()
+        # Most expired hash fields reclaimed by a single do_expire
+        self.hash_field_reclaim_limit = 1000
         # The 'PubSub' store
         self.pubsub = defaultdict(list)
         # Dictionary from script to sha ''Script''
         self.shas = dict()
+        # Supported CONFIG parameters
+        self.config = {
+            'notify-keyspace-events': '',
+            'set-max-intset-entries': '512',
+            'hash-max-listpack-entries': '128',
+            'hash-max-listpack-value': '64',
+            'hll-sparse-max-bytes': '3000',
+        }
+        # Keyspace notification classes; zero unless a channel is selected
+        self._notify_flags = 0
+        # Encoding limits, from the integer CONFIG parameters
+        for name, attribute in self.INTEGER_CONFIG.items():
+            setattr(self, attribute, int(self.config[name]))
+
+        if isinstance(self.clock, VirtualClock):
+            self.clock.register(self._clock_advanced)
 
     #### Connection Functions ####
 
@@ -101,23 +240,100 @@ class MockRedis(object):
         in this mock, so this is a no-op."""
         pass
 
+    #### Server Functions ####
+
+    def config_get(self, pattern='*'):
+        """Emulate config_get."""
+        regex = '^' + pattern.replace('*', '.*') + '$'
+        return dict((name, value) for name, value in self.config.items() if re.match(regex, name))
+
+    def config_set(self, name, value):
+        """Emulate config_set."""
+        name = name.lower()
+        if name not in self.config:
+            raise ResponseError("Unsupported CONFIG parameter: {}".format(name))
+        if name == 'notify-keyspace-events':
+            try:
+                flags = parse_flags(str(value))
+            except ValueError as error:
+                raise ResponseError(str(error))
+            self._notify_flags = flags if flags & NOTIFY_CHANNELS else 0
+            value = flags_to_string(flags)
+        elif name in self.INTEGER_CONFIG:
+            try:
+                setattr(self, self.INTEGER_CONFIG[name], int(value))
+            except ValueError:
+                raise ResponseError("Invalid argument '{}' for CONFIG SET '{}'".format(value, name))
+
+        self.config[name] = str(value)
+        return True
+
     #### Keys Functions ####
 
+    def info(self, section=None):
+        """
+        Emulate info.
+
+        Only the keyspace section, a compression section with the sizes of the stored
+        compressed values and a dedup section with the number of deduplicated values are
+        supported.
+        """
+        section = (section or 'default').lower()
+        if section not in ('default', 'all', 'everything', 'keyspace', 'compression', 'dedup'):
+            return {}
+        info = {}
+        if section in ('default', 'all', 'everything', 'keyspace') and self.redis:
+            info['db{}'.format(self.db)] = {'keys': len(self.redis),
+                                            'expires': len(self.timeouts),
+                                            'avg_ttl': 0}
+        if section in ('default', 'all', 'everything', 'compression') and \
+                self._compressor is not None:
+            compressor = self._compressor
+            compressed = [value for value in self.redis.values()
+                          if type(value) is CompressedString]
+            compressed_bytes = sum(len(value.data) for value in compressed)
+            original_bytes = sum(value.length for value in compressed)
+            info.update({
+                'compression': compressor.codec,
+                'compress_threshold': compressor.threshold,
+                'compressed_keys': len(compressed),
+                'compressed_bytes': compressed_bytes,
+                'uncompressed_bytes': original_bytes,
+                'compression_ratio': round(original_bytes / compressed_bytes, 2)
+                if compressed else 1.0,
+                'decompressed_cache_hits': compressor.cache_hits,
+                'decompressed_cache_misses': compressor.cache_misses,
+            })
+        if section in ('default', 'all', 'everything', 'dedup') and self._value_pool is not None:
+            self._value_pool.prune()
+            info.update({
+                'dedup_threshold': self._value_pool.threshold,
+                'dedup_values': len(self._value_pool),
+            })
+        return info
+
+    def object(self, infotype, key):
+        """
+        Emulate object.
+
+        Only the ENCODING subcommand is supported.
+        """
+        if infotype.lower() != 'encoding':
+            raise ResponseError("Unsupported OBJECT subcommand: {}".format(infotype))
+        if key not in self.redis:
+            return None
+        value = self.redis[key]
+        if isinstance(value, (bytes, str)):
+            return 'embstr' if len(value) <= 44 else 'raw'
+        return self.ENCODINGS[type(value)]
+
     def type(self, key):
         if key not in self.redis:
             return 'none'
         type_ = type(self.redis[key])
-        if type_ is dict:
-            return 'hash'
-        elif type_ is str:
-            return 'string'
-        elif type_ is set:
-            return 'set'
-        elif type_ is list:
-            return 'list'
-        elif type_ is SortedSet:
-            return 'zset'
-        raise TypeError("unhandled type {}".format(type_))
+        if type_ not in self.TYPE_NAMES:
+            raise TypeError("unhandled type {}".format(type_))
+        return self.TYPE_NAMES[type_]
 
     def keys(self, pattern='*'):
         """Emulate keys."""
@@ -136,8 +352,10 @@ class MockRedis(object):
             if key in self.redis:
                 del self.redis[key]
                 key_counter += 1
+                self._notify(NOTIFY_GENERIC, 'del', key)
             if key in self.timeouts:
                 del self.timeouts[key]
+            self._forget_hash_timeouts(key)
         return key_counter
 
     def __delitem__(self, name):
@@ -155,6 +373,7 @@ class MockRedis(object):
             return False
 
         self.timeouts[key] = self.clock.now() + delta
+        self._notify(NOTIFY_GENERIC, 'expire', key)
         return True
 
     def expire(self, key, delta):
@@ -171,6 +390,7 @@ class MockRedis(object):
         expire_time = datetime.fromtimestamp(when)
         if key in self.redis:
             self.timeouts[key] = expire_time
+            self._notify(NOTIFY_GENERIC, 'expire', key)
             return True
         return False
 
@@ -218,17 +438,33 @@ class MockRedis(object):
         """
         Expire objects assuming now == time
         """
-        for key, value in self.timeouts.items():
-            if value - self.clock.now() < timedelta(0):
-                del self.timeouts[key]
-                # removing the expired key
-                if key in self.redis:
-                    self.redis.pop(key, None)
+        now = self.clock.now()
+        for key, _ in self.timeouts.pop_due(now):
+            # removing the expired key
+            self._forget_hash_timeouts(key)
+            if self.redis.pop(key, None) is not None:
+                self._notify(NOTIFY_EXPIRED, 'expired', key)
+
+        # reclaim expired hash fields, visiting only hashes with fields due
+        budget = self.hash_field_reclaim_limit
+        while budget > 0:
+            due = self._hash_expiries.pop_due(now, limit=1)
+            if not due:
+                break
+            budget -= self._expire_hash_fields(due[0][0], now, limit=budget)
+
+    def _clock_advanced(self, now):
+        """
+        Expire objects when a virtual clock advances.
+        """
+        self.do_expire()
 
     def flushdb(self):
         self.redis.clear()
         self.pubsub.clear()
         self.timeouts.clear()
+        self.hash_timeouts.clear()
+        self._hash_expiries.clear()
 
     #### String Functions ####
 
@@ -236,7 +472,7 @@ class MockRedis(object):
 
         # Override the default dict
         result = None if key not in self.redis else self.redis[key]
-        return result
+        return self._decode(result)
 
     def __getitem__(self, name):
         """
@@ -250,7 +486,8 @@ class MockRedis(object):
 
     def mget(self, keys, *args):
         args = self._list_or_args(keys, args)
-        return [self.get(arg) for arg in args]
+        get, decode = self.redis.get, self._decode
+        return [decode(get(arg)) for arg in args]
 
     def set(self, key, value, ex=None, px=None, nx=False, xx=False):
         """
@@ -287,12 +524,8 @@ class MockRedis(object):
         return old_value
 
     def _set(self, key, value):
-        self.redis[key] = str(value)
-
-        # removing the timeout
-        if key in self.timeouts:
-            self.timeouts.pop(key, None)
-
+        self._replace(key, self._string_value(value))
+        self._notify(NOTIFY_STRING, 'set', key)
         return True
 
     def _should_set(self, key, mode):
@@ -347,14 +580,7 @@ class MockRedis(object):
         Sets key/values based on a mapping. Mapping can be supplied as a single
         dictionary argument or as kwargs.
         """
-        if args:
-            if len(args) != 1 or not isinstance(args[0], dict):
-                raise RedisError('MSET requires **kwargs or a single dict arg')
-            mapping = args[0]
-        else:
-            mapping = kwargs
-        for key, value in mapping.items():
-            self.set(key, value)
+        self._set_many(self._mapping('MSET', args, kwargs))
         return True
 
     def msetnx(self, *args, **kwargs):
@@ -363,71 +589,604 @@ class MockRedis(object):
         Mapping can be supplied as a single dictionary argument or as kwargs.
         Returns a boolean indicating if the operation was successful.
         """
+        mapping = self._mapping('MSETNX', args, kwargs)
+        redis = self.redis
+        if any(key in redis for key in mapping):
+            return False
+        self._set_many(mapping)
+        return True
+
+    def msetex(self, mapping, ex=None, px=None, nx=False, xx=False):
+        """
+        Emulate msetex: set several keys with the same time to live, as a single operation.
+
+        As with ``set``, ``px`` takes precedence over ``ex``. With ``nx`` (or ``xx``), nothing
+        is set unless none (or all) of the keys exist. Returns a boolean indicating if the
+        keys were set.
+        """
+        if nx and xx:
+            raise ResponseError("syntax error")
+        expire = None
+        if ex is not None:
+            expire = ex if isinstance(ex, timedelta) else timedelta(seconds=ex)
+        if px is not None:
+            expire = px if isinstance(px, timedelta) else timedelta(milliseconds=px)
+        if expire is None or expire.total_seconds() <= 0:
+            raise ResponseError("invalid expire time in MSETEX")
+        redis = self.redis
+        if (nx and any(key in redis for key in mapping)) or \
+                (xx and not all(key in redis for key in mapping)):
+            return False
+        self._set_many(mapping, self.clock.now() + expire)
+        return True
+
+    def _mapping(self, command, args, kwargs):
+        """
+        Get the mapping of a multi-key set command, given as a single dict or as kwargs.
+        """
         if args:
             if len(args) != 1 or not isinstance(args[0], dict):
-                raise RedisError('MSETNX requires **kwargs or a single dict arg')
-            mapping = args[0]
-        else:
-            mapping = kwargs
+                raise RedisError('{} requires **kwargs or a single dict arg'.format(command))
+            return args[0]
+        return kwargs
 
+    def _set_many(self, mapping, expire_at=None):
+        """
+        Set several string values in a single pass, replacing (or, given ``expire_at``,
+        setting) their timeouts.
+        """
+        redis, timeouts, string_value = self.redis, self.timeouts, self._string_value
+        inline = self._compressor is None and self._value_pool is None
+        if self.hash_timeouts:
+            for key in mapping:
+                self._forget_hash_timeouts(key)
         for key, value in mapping.items():
-            if key in self.redis:
-                return False
-        for key, value in mapping.items():
-            self.set(key, value)
+            if inline and type(value) is str:
+                # the common case, inlined
+                redis[key] = intern(value) if len(value) <= SHARED_STRING_LENGTH else value
+            else:
+                redis[key] = string_value(value)
+        if expire_at is not None:
+            for key in mapping:
+                timeouts[key] = expire_at
+        elif timeouts:
+            for key in mapping:
+                timeouts.pop(key, None)
+        if self._notify_flags:
+            for key in mapping:
+                self._notify(NOTIFY_STRING, 'set', key)
+                if expire_at is not None:
+                    self._notify(NOTIFY_GENERIC, 'expire', key)
+
+    def _string_value(self, value):
+        """
+        Convert a string value for storage, int-encoding integers in range.
+        """
+        if type(value) in INTEGER_TYPES and LONG_MIN <= value <= LONG_MAX:
+            return shared(value)
+        value = self._encode(value)
+        if self._compressor is not None:
+            value = self._compressor.compress(value)
+        if self._value_pool is not None:
+            value = self._value_pool.share(value)
+        return shared(value)
+
+    def _stored(self, value):
+        """
+        Convert a hash value or list element for storage, sharing it with an identical stored
+        value if possible.
+        """
+        value = shared(self._element(value))
+        return value if self._value_pool is None else self._value_pool.share(value)
 
-        return True
+    def append(self, key, value):
+        """
+        Emulate append.
+
+        The first append converts the value to a ``MutableString``, which later appends extend
+        in place.
+        """
+        if key not in self.redis:
+            self.redis[key] = shared(self._encode(value))
+            self._notify(NOTIFY_STRING, 'append', key)
+            return self.strlen(key)
+        redis_string = self._get_mutable_string(key, 'APPEND')
+        redis_string.write(len(redis_string), self._encode(value), self.encoding)
+        self._notify(NOTIFY_STRING, 'append', key)
+        return len(redis_string)
+
+    def getrange(self, key, start, end):
+        """
+        Emulate getrange.
+
+        Only the requested range is copied, even from a long value. A range of a text value is
+        returned as text unless it splits a character, in which case its bytes are returned.
+        """
+        value = self._get_string(key, 'GETRANGE', default='')
+        if type(value) is MutableString:
+            data, is_text = value, value.is_text
+        elif isinstance(value, unicode) and self._ascii_encoding and is_ascii(value):
+            # one byte per character, so the string can be sliced directly
+            data, is_text = value, False
+        else:
+            data, is_text = to_bytes(value, self.encoding)
+
+        length = len(data)
+        if start < 0 and end < 0 and start > end:
+            return self._decode(data[:0])
+        start = max(0, start + length if start < 0 else start)
+        end = min(length - 1, max(0, end + length if end < 0 else end))
+        if start > end:
+            result = data[:0]
+        else:
+            result = memoryview(data)[start:end + 1].tobytes() if type(data) is MutableString \
+                else data[start:end + 1]
+        if is_text:
+            try:
+                result = result.decode(self.encoding)
+            except UnicodeDecodeError:
+                pass
+        return self._decode(result)
+
+    def setrange(self, key, offset, value):
+        """Emulate setrange."""
+        if offset < 0:
+            raise ResponseError("offset is out of range")
+        value = self._encode(value)
+        if offset + len(value) > MAX_STRING_LENGTH:
+            raise ResponseError("string exceeds maximum allowed size (proto-max-bulk-len)")
+        if not value:
+            return self.strlen(key)
+        if key not in self.redis:
+            self.redis[key] = MutableString(is_text=True)
+        redis_string = self._get_mutable_string(key, 'SETRANGE')
+        redis_string.write(offset, value, self.encoding)
+        self._notify(NOTIFY_STRING, 'setrange', key)
+        return len(redis_string)
+
+    def strlen(self, key):
+        """
+        Emulate strlen.
+
+        Returns the length of the value in bytes.
+        """
+        if type(self.redis.get(key)) is CompressedString:
+            return self.redis[key].length
+        value = self._get_string(key, 'STRLEN', default=b'')
+        if isinstance(value, (bytes, bytearray)):
+            return len(value)
+        return len(to_bytes(value, self.encoding)[0])
+
+    def _get_mutable_string(self, key, operation):
+        """
+        Get the existing string value of ``key`` as a ``MutableString``, converting it first
+        if needed.
+        """
+        value = self._get_string(key, operation)
+        if type(value) is not MutableString:
+            value = self.redis[key] = MutableString.from_value(value, self.encoding)
+        return value
 
     def decr(self, key, amount=1):
         """Emulate decr."""
-        previous_value = long(self.redis.get(key, '0'))
-        self.redis[key] = str(previous_value - amount)
-        return long(self.redis[key])
+        return self._incrby(key, -amount, 'decrby')
 
     def decrby(self, key, amount=1):
         return self.decr(key, amount)
 
     def incr(self, key, amount=1):
         """Emulate incr."""
-        previous_value = long(self.redis.get(key, '0'))
-        self.redis[key] = str(previous_value + amount)
-        return long(self.redis[key])
+        return self._incrby(key, amount, 'incrby')
 
     def incrby(self, key, amount=1):
         return self.incr(key, amount)
 
+    def incrbyfloat(self, key, amount=1.0):
+        """Emulate incrbyfloat."""
+        value = self._add_floats(self._float_value(self._get_string(key, 'INCRBYFLOAT')), amount)
+        self.redis[key] = format_float(value)
+        self._notify(NOTIFY_STRING, 'incrbyfloat', key)
+        return value
+
+    def _incrby(self, key, amount, event):
+        """
+        Shared incr and decr routine.
+
+        The value is kept int-encoded, so no string formatting or parsing is needed.
+        """
+        value = self._add_integers(self._integer_value(self._get_string(key, event.upper())),
+                                   amount)
+        self.redis[key] = shared(value)
+        self._notify(NOTIFY_STRING, event, key)
+        return value
+
+    def _get_string(self, key, operation, default=0):
+        """
+        Get the stored (maybe int-encoded or mutable) string value of ``key``, or ``default``
+        if there is none.
+        """
+        value = self.redis.get(key, default)
+        if self.TYPE_NAMES.get(type(value)) != 'string':
+            raise TypeError("{} requires a string".format(operation))
+        if type(value) is HyperLogLog:
+            return value.dumps()
+        if type(value) is CompressedString:
+            return self._compressor.decompress(value)
+        return value
+
+    def _encode(self, value):
+        """
+        Convert a value for storage: bytes and strings are stored as they are, buffers as
+        bytes and anything else as a string.
+        """
+        if isinstance(value, (bytes, str)):
+            return value
+        if isinstance(value, memoryview):
+            return value.tobytes()
+        if isinstance(value, bytearray):
+            return bytes(value)
+        return str(value)
+
+    def _element(self, value):
+        """
+        Convert a hash field or value, list element or set member for storage.
+
+        Text and bytes holding the same bytes must be the same element, so text is stored as
+        a native string, as are bytes that are valid in ``encoding``; other bytes are stored
+        as they are.
+        """
+        if type(value) is str:
+            return value
+        if isinstance(value, unicode) and not isinstance(value, str):
+            return value.encode(self.encoding)
+        value = self._encode(value)
+        if isinstance(value, bytes) and not isinstance(value, str):
+            try:
+                return value.decode(self.encoding)
+            except UnicodeDecodeError:
+                return value
+        return value
+
+    def _field(self, attribute):
+        """
+        Convert a hash field name for storage, interning it if it is a string.
+        """
+        attribute = self._element(attribute)
+        return intern(attribute) if type(attribute) is str else attribute
+
+    def _decode(self, value):
+        """
+        Convert a stored value (or None) for returning to the caller.
+
+        Int-encoded values become strings and, if ``decode_responses`` is set, values are
+        decoded to text (if True) or encoded to bytes (if False).
+        """
+        if type(value) in INTEGER_TYPES:
+            value = str(value)
+        elif type(value) is MutableString:
+            value = value.to_value(self.encoding)
+        elif type(value) is HyperLogLog:
+            value = value.dumps()
+        elif type(value) is CompressedString:
+            value = self._compressor.decompress(value)
+        decode_responses = self.decode_responses
+        if decode_responses is None or value is None:
+            return value
+        if decode_responses:
+            return value.decode(self.encoding) if isinstance(value, bytes) else value
+        return value.encode(self.encoding) if isinstance(value, unicode) else value
+
+    def _decode_values(self, values):
+        """
+        Convert stored values for returning to the caller; ``values`` is returned as it is
+        unless ``decode_responses`` is set.
+        """
+        if self.decode_responses is None:
+            return values
+        return [self._decode(value) for value in values]
+
+    def _text(self, value):
+        """
+        Convert a stored element to text, for matching against patterns and for comparing
+        elements of different types.
+        """
+        if isinstance(value, bytes) and not isinstance(value, str):
+            return value.decode(self.encoding, 'replace')
+        return value if isinstance(value, basestring) else str(value)
+
+    def _integer_value(self, value, message="value is not an integer or out of range"):
+        """
+        Convert a stored (maybe int-encoded) string value to an integer.
+        """
+        if type(value) in INTEGER_TYPES:
+            return value
+        try:
+            return long(bytes(value) if type(value) is MutableString else value)
+        except ValueError:
+            raise ResponseError(message)
+
+    def _float_value(self, value, message="value is not a valid float"):
+        """
+        Convert a stored (maybe int-encoded) string value to a float.
+        """
+        try:
+            return float(bytes(value) if type(value) is MutableString else value)
+        except ValueError:
+            raise ResponseError(message)
+
+    def _add_integers(self, value, increment):
+        """
+        Add an increment to an integer value, as Redis does with 64-bit integers.
+        """
+        result = value + increment
+        if not LONG_MIN <= result <= LONG_MAX:
+            raise ResponseError("increment or decrement would overflow")
+        return result
+
+    def _add_floats(self, value, increment):
+        """
+        Add an increment to a float value, rejecting results that are not finite.
+        """
+        result = value + float(increment)
+        if isinf(result) or isnan(result):
+            raise ResponseError("increment would produce NaN or Infinity")
+        return result
+
+    #### Bitmap Functions ####
+
+    def setbit(self, key, offset, value):
+        """
+        Emulate setbit.
+
+        Returns the previous value of the bit.
+        """
+        offset, value = self._bit_offset(offset), self._bit_value(value)
+        if key not in self.redis:
+            self.redis[key] = MutableString()
+        bitmap = self._get_mutable_string(key, 'SETBIT')
+        # bitmaps are binary, so the value is no longer read back as text
+        bitmap.is_text = False
+        previous = bitops.setbit(bitmap, offset, value)
+        self._notify(NOTIFY_STRING, 'setbit', key)
+        return previous
+
+    def getbit(self, key, offset):
+        """Emulate getbit."""
+        offset = self._bit_offset(offset)
+        return bitops.getbit(self._get_bitmap(key, 'GETBIT'), offset)
+
+    def bitcount(self, key, start=None, end=None, mode=None):
+        """
+        Emulate bitcount.
+
+        ``start`` and ``end`` are byte offsets, or bit offsets if ``mode`` is 'BIT'.
+        """
+        data = self._get_bitmap(key, 'BITCOUNT')
+        if start is None and end is None:
+            return bitops.bitcount(data)
+        if start is None or end is None:
+            raise ResponseError("syntax error")
+        bit_range = self._bit_range(len(data), start, end, mode)
+        return bitops.bitcount(data, *bit_range) if bit_range else 0
+
+    def bitpos(self, key, bit, start=None, end=None, mode=None):
+        """
+        Emulate bitpos.
+
+        Returns the position of the first bit set to ``bit``, or -1 if there is none; when
+        looking for a clear bit without an ``end``, the string is treated as padded with
+        zero bytes.
+        """
+        if bit not in (0, 1):
+            raise ResponseError("The bit argument must be 1 or 0.")
+        if key not in self.redis:
+            return -1 if bit else 0
+        data = self._get_bitmap(key, 'BITPOS')
+        bit_range = self._bit_range(len(data), start or 0, -1 if end is None else end, mode)
+        if not bit_range:
+            return -1
+        position = bitops.bitpos(data, bit, *bit_range)
+        if position < 0 and not bit and end is None:
+            return len(data) * 8
+        return position
+
+    def bitop(self, operation, dest, *keys):
+        """
+        Emulate bitop.
+
+        Stores the result (or deletes ``dest`` if it is empty) and returns its length.
+        """
+        operation = operation.upper()
+        if operation != 'NOT' and operation not in bitops.OPERATORS:
+            raise ResponseError("syntax error")
+        if operation == 'NOT' and len(keys) != 1:
+            raise ResponseError("BITOP NOT must be called with a single source key.")
+        result = bitops.bitop(operation, [self._get_bitmap(key, 'BITOP') for key in keys])
+        if not result:
+            self.delete(dest)
+            return 0
+        self._replace(dest, result)
+        self._notify(NOTIFY_STRING, 'bitop', dest)
+        return len(result)
+
+    def bitfield(self, key, default_overflow=None):
+        """
+        Emulate bitfield.
+
+        Returns a ``BitFieldOperation`` that builds up the sub-commands and executes them.
+        """
+        return BitFieldOperation(self, key, default_overflow)
+
+    def bitfield_ro(self, key, encoding, offset, items=None):
+        """Emulate bitfield_ro."""
+        arguments = ['GET', encoding, offset]
+        for item_encoding, item_offset in items or ():
+            arguments.extend(('GET', item_encoding, item_offset))
+        return self._bitfield(key, arguments, read_only=True)
+
+    def _bitfield(self, key, arguments, read_only=False):
+        """
+        Execute the sub-commands of BITFIELD (or BITFIELD_RO) in one pass over the string,
+        growing it first to hold every field that is written.
+        """
+        fields = parse_fields(arguments, read_only)
+        end = max([field.end for field in fields if field.operation != 'GET'] or [0])
+        if not end:
+            return execute_fields(fields, self._get_bitmap(key, 'BITFIELD'))
+        if key not in self.redis:
+            self.redis[key] = MutableString()
+        bitmap = self._get_mutable_string(key, 'BITFIELD')
+        bitmap.is_text = False
+        length = (end + 7) >> 3
+        if length > len(bitmap):
+            bitmap.extend(b'\x00' * (length - len(bitmap)))
+        results = execute_fields(fields, bitmap)
+        # only SET and INCRBY sub-commands that did not fail on overflow write the string
+        if any(field.operation != 'GET' and result is not None
+               for field, result in zip(fields, results)):
+            self._notify(NOTIFY_STRING, 'setbit', key)
+        return results
+
+    def _get_bitmap(self, key, operation):
+        """
+        Get the string value of ``key`` as bytes (or a bytearray), or empty if there is none.
+        """
+        return to_bytes(self._get_string(key, operation, default=b''), self.encoding)[0]
+
+    def _bit_offset(self, offset):
+        """
+        Validate a bit offset.
+        """
+        offset = self._integer_value(offset, "bit offset is not an integer or out of range")
+        if not 0 <= offset <= bitops.MAX_BIT_OFFSET:
+            raise ResponseError("bit offset is not an integer or out of range")
+        return offset
+
+    def _bit_value(self, value):
+        """
+        Validate a bit value.
+        """
+        if value not in (0, 1, '0', '1', b'0', b'1'):
+            raise ResponseError("bit is not an integer or out of range")
+        return int(value)
+
+    def _bit_range(self, length, start, end, mode):
+        """
+        Convert an inclusive range of byte (or, if ``mode`` is 'BIT', bit) offsets, which may
+        be negative, into a range of bit offsets over a string of ``length`` bytes.
+
+        Returns None if the range is empty.
+        """
+        mode = (mode or 'BYTE').upper()
+        if mode not in ('BYTE', 'BIT'):
+            raise ResponseError("syntax error")
+        total = length * 8 if mode == 'BIT' else length
+        if start < 0 and end < 0 and start > end:
+            return None
+        start = max(0, start + total if start < 0 else start)
+        end = min(total - 1, max(0, end + total if end < 0 else end))
+        if start > end:
+            return None
+        return (start, end + 1) if mode == 'BIT' else (start * 8, (end + 1) * 8)
+
+    #### HyperLogLog Functions ####
+
+    def pfadd(self, name, *values):
+        """
+        Emulate pfadd.
+
+        Returns 1 if the key was created or the estimated cardinality may have changed.
+        """
+        hll = self._get_hll(name, 'PFADD')
+        created = hll is None
+        if created:
+            hll = self.redis[name] = HyperLogLog()
+        changed = False
+        for value in values:
+            changed = hll.add(to_bytes(self._encode(value), self.encoding)[0]) or changed
+        if not (created or changed):
+            return 0
+        hll.compact(self._hll_sparse_max_bytes)
+        self._notify(NOTIFY_STRING, 'pfadd', name)
+        return 1
+
+    def pfcount(self, *sources):
+        """
+        Emulate pfcount.
+
+        The cardinality of a single HyperLogLog is cached until it changes; several are
+        merged into a temporary HyperLogLog.
+        """
+        hlls = [hll for hll in (self._get_hll(source, 'PFCOUNT') for source in sources)
+                if hll is not None]
+        if len(sources) == 1:
+            return hlls[0].count() if hlls else 0
+        return HyperLogLog.merge(hlls, self._hll_sparse_max_bytes).count()
+
+    def pfmerge(self, dest, *sources):
+        """Emulate pfmerge."""
+        hlls = [hll for hll in (self._get_hll(key, 'PFMERGE') for key in (dest,) + sources)
+                if hll is not None]
+        # the merged value takes the place of dest, whose timeout is kept as in Redis
+        self._replace(dest, HyperLogLog.merge(hlls, self._hll_sparse_max_bytes), keep_ttl=True)
+        self._notify(NOTIFY_STRING, 'pfadd', dest)
+        return True
+
+    def _get_hll(self, key, operation):
+        """
+        Get the HyperLogLog at ``key``, or None if there is none, parsing (and storing) it
+        first if it is held as a plain string.
+        """
+        value = self.redis.get(key)
+        if value is None or type(value) is HyperLogLog:
+            return value
+        try:
+            hll = HyperLogLog.loads(to_bytes(self._get_string(key, operation), self.encoding)[0])
+        except ValueError:
+            raise ResponseError("WRONGTYPE Key is not a valid HyperLogLog string value.")
+        self.redis[key] = hll
+        return hll
+
     #### Hash Functions ####
 
     def hexists(self, hashkey, attribute):
         """Emulate hexists."""
 
         redis_hash = self._get_hash(hashkey, 'HEXISTS')
-        return str(attribute) in redis_hash
+        return self._element(attribute) in redis_hash
 
     def hget(self, hashkey, attribute):
         """Emulate hget."""
 
         redis_hash = self._get_hash(hashkey, 'HGET')
-        return redis_hash.get(str(attribute))
+        return self._decode(redis_hash.get(self._element(attribute)))
 
     def hgetall(self, hashkey):
         """Emulate hgetall."""
 
         redis_hash = self._get_hash(hashkey, 'HGETALL')
-        return dict(redis_hash)
+        if self.zero_copy:
+            return self._view(HashView, redis_hash)
+        decode = self._decode
+        return dict((decode(attribute), decode(value)) for attribute, value in redis_hash.items())
 
     def hdel(self, hashkey, *keys):
         """Emulate hdel"""
 
-        redis_hash = self._get_hash(hashkey, 'HDEL')
+        redis_hash = self._unshare(hashkey, self._get_hash(hashkey, 'HDEL'))
         count = 0
-        for key in keys:
-            attribute = str(key)
+        attributes = [self._element(key) for key in keys]
+        for attribute in attributes:
             if attribute in redis_hash:
                 count += 1
                 del redis_hash[attribute]
-                if not redis_hash:
-                    del self.redis[hashkey]
+        if count:
+            self._persist_hash_fields(hashkey, attributes)
+            self._notify(NOTIFY_HASH, 'hdel', hashkey)
+            if not redis_hash:
+                del self.redis[hashkey]
+                self._forget_hash_timeouts(hashkey)
+                self._notify(NOTIFY_GENERIC, 'del', hashkey)
         return count
 
     def hlen(self, hashkey):
@@ -438,65 +1197,200 @@ class MockRedis(object):
     def hmset(self, hashkey, value):
         """Emulate hmset."""
 
-        redis_hash = self._get_hash(hashkey, 'HMSET', create=True)
-        for key, value in value.items():
-            attribute = str(key)
-            redis_hash[attribute] = str(value)
+        items = [(self._field(key), self._stored(value)) for key, value in value.items()]
+        redis_hash = self._hash_for_write(hashkey, 'HMSET', items)
+        for attribute, value in items:
+            redis_hash[attribute] = value
+        self._persist_hash_fields(hashkey, [attribute for attribute, _ in items])
+
+        self._notify(NOTIFY_HASH, 'hset', hashkey)
 
     def hmget(self, hashkey, keys, *args):
         """Emulate hmget."""
 
         redis_hash = self._get_hash(hashkey, 'HMGET')
         attributes = self._list_or_args(keys, args)
-        return [redis_hash.get(str(attribute)) for attribute in attributes]
+        return [self._decode(redis_hash.get(self._element(attribute))) for attribute in attributes]
 
     def hset(self, hashkey, attribute, value):
         """Emulate hset."""
 
-        redis_hash = self._get_hash(hashkey, 'HSET', create=True)
-        attribute = str(attribute)
-        redis_hash[attribute] = str(value)
+        attribute, value = self._field(attribute), self._stored(value)
+        redis_hash = self._hash_for_write(hashkey, 'HSET', [(attribute, value)])
+        redis_hash[attribute] = value
+        self._persist_hash_fields(hashkey, [attribute])
+        self._notify(NOTIFY_HASH, 'hset', hashkey)
 
     def hsetnx(self, hashkey, attribute, value):
         """Emulate hsetnx."""
 
-        redis_hash = self._get_hash(hashkey, 'HSETNX', create=True)
-        attribute = str(attribute)
-        if attribute in redis_hash:
+        attribute, value = self._field(attribute), self._stored(value)
+        if attribute in self._get_hash(hashkey, 'HSETNX'):
             return 0
         else:
-            redis_hash[attribute] = str(value)
+            redis_hash = self._hash_for_write(hashkey, 'HSETNX', [(attribute, value)])
+            redis_hash[attribute] = value
+            self._notify(NOTIFY_HASH, 'hset', hashkey)
             return 1
 
     def hincrby(self, hashkey, attribute, increment=1):
-        """Emulate hincrby."""
+        """
+        Emulate hincrby.
 
-        return self._hincrby(hashkey, attribute, 'HINCRBY', long, increment)
+        The value is kept int-encoded, so no string formatting or parsing is needed.
+        """
+        attribute = self._field(attribute)
+        value = self._integer_value(self._get_hash(hashkey, 'HINCRBY').get(attribute, 0),
+                                    "hash value is not an integer")
+        value = shared(self._add_integers(value, increment))
+        redis_hash = self._hash_for_write(hashkey, 'HINCRBY', [(attribute, value)])
+        redis_hash[attribute] = value
+        self._notify(NOTIFY_HASH, 'hincrby', hashkey)
+        return value
 
     def hincrbyfloat(self, hashkey, attribute, increment=1.0):
         """Emulate hincrbyfloat."""
-
-        return self._hincrby(hashkey, attribute, 'HINCRBYFLOAT', float, increment)
-
-    def _hincrby(self, hashkey, attribute, command, type_, increment):
-        """Shared hincrby and hincrbyfloat routine"""
-        redis_hash = self._get_hash(hashkey, command, create=True)
-        attribute = str(attribute)
-        previous_value = type_(redis_hash.get(attribute, '0'))
-        redis_hash[attribute] = str(previous_value + increment)
-        return type_(redis_hash[attribute])
+        attribute = self._field(attribute)
+        value = self._float_value(self._get_hash(hashkey, 'HINCRBYFLOAT').get(attribute, 0),
+                                  "hash value is not a float")
+        value = self._add_floats(value, increment)
+        redis_hash = self._hash_for_write(hashkey, 'HINCRBYFLOAT',
+                                          [(attribute, format_float(value))])
+        redis_hash[attribute] = format_float(value)
+        self._notify(NOTIFY_HASH, 'hincrbyfloat', hashkey)
+        return value
 
     def hkeys(self, hashkey):
         """Emulate hkeys."""
 
         redis_hash = self._get_hash(hashkey, 'HKEYS')
-        return redis_hash.keys()
+        if self.zero_copy:
+            return self._view(HashView, redis_hash).keys()
+        return [self._decode(attribute) for attribute in redis_hash]
 
     def hvals(self, hashkey):
         """Emulate hvals."""
 
         redis_hash = self._get_hash(hashkey, 'HVALS')
-        return redis_hash.values()
+        if self.zero_copy:
+            return self._view(HashView, redis_hash).values()
+        return [self._decode(value) for value in redis_hash.values()]
+
+    def hexpire(self, hashkey, seconds, *fields, **kwargs):
+        """
+        Emulate hexpire.
+
+        Accepts the ``nx``, ``xx``, ``gt`` and ``lt`` keyword arguments of redis-py.
+        """
+        delta = seconds if isinstance(seconds, timedelta) else timedelta(seconds=seconds)
+        return self._hexpire(hashkey, 'HEXPIRE', self.clock.now() + delta, fields, **kwargs)
+
+    def hpexpire(self, hashkey, milliseconds, *fields, **kwargs):
+        """Emulate hpexpire."""
+        delta = milliseconds if isinstance(milliseconds, timedelta) \
+            else timedelta(milliseconds=milliseconds)
+        return self._hexpire(hashkey, 'HPEXPIRE', self.clock.now() + delta, fields, **kwargs)
+
+    def hexpireat(self, hashkey, when, *fields, **kwargs):
+        """Emulate hexpireat."""
+        return self._hexpire(hashkey, 'HEXPIREAT', datetime.fromtimestamp(when), fields, **kwargs)
+
+    def hpexpireat(self, hashkey, when, *fields, **kwargs):
+        """Emulate hpexpireat."""
+        return self._hexpire(hashkey, 'HPEXPIREAT', datetime.fromtimestamp(when / 1000.0), fields,
+                             **kwargs)
+
+    def hpersist(self, hashkey, *fields):
+        """Emulate hpersist."""
+        redis_hash = self._get_hash(hashkey, 'HPERSIST')
+        field_timeouts = self.hash_timeouts.get(hashkey, {})
+        result = []
+        for attribute in map(self._element, fields):
+            if attribute not in redis_hash:
+                result.append(-2)
+            elif attribute not in field_timeouts:
+                result.append(-1)
+            else:
+                del field_timeouts[attribute]
+                result.append(1)
+        if 1 in result:
+            self._notify(NOTIFY_HASH, 'hpersist', hashkey)
+        return result
+
+    def httl(self, hashkey, *fields):
+        """Emulate httl."""
+        return self._field_time_to_live(hashkey, 'HTTL', fields, output_ms=False)
+
+    def hpttl(self, hashkey, *fields):
+        """Emulate hpttl."""
+        return self._field_time_to_live(hashkey, 'HPTTL', fields, output_ms=True)
+
+    def _hexpire(self, hashkey, command, when, fields, nx=False, xx=False, gt=False, lt=False):
+        """Shared hexpire, hpexpire, hexpireat and hpexpireat routine"""
+        if not fields:
+            raise ResponseError("wrong number of arguments for '{}' command"
+                                .format(command.lower()))
+        if sum(map(bool, (nx, xx, gt, lt))) > 1:
+            raise ResponseError("NX, XX, GT, and LT options at the same time are not compatible")
+
+        redis_hash = self._get_hash(hashkey, command)
+        if not redis_hash:
+            return [-2] * len(fields)
+
+        field_timeouts = self.hash_timeouts.setdefault(hashkey, ExpiryIndex())
+        now = self.clock.now()
+        result = []
+        for attribute in map(self._element, fields):
+            if attribute not in redis_hash:
+                result.append(-2)
+                continue
+            current = field_timeouts.get(attribute)
+            if ((nx and current is not None) or
+                    (xx and current is None) or
+                    (gt and (current is None or when <= current)) or
+                    (lt and current is not None and when >= current)):
+                # condition not met
+                result.append(0)
+            elif when <= now:
+                # a time in the past deletes the field
+                redis_hash = self._unshare(hashkey, redis_hash)
+                del redis_hash[attribute]
+                field_timeouts.pop(attribute, None)
+                result.append(2)
+            else:
+                field_timeouts[attribute] = when
+                result.append(1)
+
+        if 1 in result:
+            self._notify(NOTIFY_HASH, 'hexpire', hashkey)
+        if 2 in result:
+            self._notify(NOTIFY_HASH, 'hdel', hashkey)
+        if not redis_hash:
+            del self.redis[hashkey]
+            self._forget_hash_timeouts(hashkey)
+            self._notify(NOTIFY_GENERIC, 'del', hashkey)
+        else:
+            self._schedule_hash_expiry(hashkey)
+        return result
+
+    def _field_time_to_live(self, hashkey, command, fields, output_ms):
+        """
+        Returns time to live of each hash field in milliseconds if output_ms is True, else
+        returns seconds.
+        """
+        redis_hash = self._get_hash(hashkey, command)
+        field_timeouts = self.hash_timeouts.get(hashkey, {})
+        get_result = get_total_milliseconds if output_ms else get_total_seconds
+        now = self.clock.now()
+        result = []
+        for attribute in map(self._element, fields):
+            if attribute not in redis_hash:
+                result.append(-2)
+            elif attribute not in field_timeouts:
+                result.append(-1)
+            else:
+                result.append(long(max(0, get_result(field_timeouts[attribute] - now))))
+        return result
 
     #### List Functions ####
 
@@ -504,7 +1398,7 @@ class MockRedis(object):
         """Emulate lrange."""
         redis_list = self._get_list(key, 'LRANGE')
         start, stop = self._translate_range(len(redis_list), start, stop)
-        return redis_list[start:stop + 1]
+        return self._decode_values(redis_list[start:stop + 1])
 
     def lindex(self, key, index):
         """Emulate lindex."""
@@ -515,7 +1409,7 @@ class MockRedis(object):
             return None
 
         try:
-            return redis_list[index]
+            return self._decode(redis_list[index])
         except (IndexError):
             # Redis returns nil if the index doesn't exist
             return None
@@ -527,8 +1421,15 @@ class MockRedis(object):
         # Redis returns 0 if list doesn't exist
         return len(redis_list)
 
-    def _blocking_pop(self, pop_func, keys, timeout):
-        """Emulate blocking pop functionality"""
+    def _blocking_pop(self, serve, keys, timeout):
+        """
+        Emulate blocking pop functionality.
+
+        ``serve`` is called with the name of a list and returns the result of popping from it,
+        or None if the list is empty. If none of ``keys`` can be served immediately, the caller
+        is queued behind any other clients blocked on the same lists and waits (on the client's
+        clock) until a push serves it or the timeout passes.
+        """
         if not isinstance(timeout, (int, long)):
             raise RuntimeError('timeout is not an integer or out of range')
 
@@ -540,31 +1441,67 @@ class MockRedis(object):
         else:
             keys = list(keys)
 
-        elapsed_time = 0
-        start = time.time()
-        while elapsed_time < timeout:
-            key, val = self._pop_first_available(pop_func, keys)
-            if val:
-                return key, val
-            # small delay to avoid high cpu utilization
-            time.sleep(self.blocking_sleep_interval)
-            elapsed_time = time.time() - start
-        return None
+        with self._blocking_lock:
+            for key in keys:
+                result = serve(key)
+                if result is not None:
+                    return result
+
+            client = BlockedClient(keys, serve, Condition(self._blocking_lock))
+            self._blocked.add(client)
+            deadline = self.clock.now() + timedelta(seconds=timeout)
+            try:
+                while not client.served:
+                    remaining = (deadline - self.clock.now()).total_seconds()
+                    if remaining <= 0:
+                        break
+                    self.clock.wait(client.condition, remaining)
+            finally:
+                self._blocked.remove(client)
+            return client.result
 
-    def _pop_first_available(self, pop_func, keys):
-        for key in keys:
-            val = pop_func(key)
-            if val:
-                return key, val
-        return None, None
+    def _signal_list(self, key):
+        """
+        Serve clients blocked on ``key`` after values are pushed to it, oldest client first.
+
+        Serving a client may push to another list (e.g. BRPOPLPUSH), so ready lists are queued
+        and handled iteratively by the outermost call.
+        """
+        with self._blocking_lock:
+            if key not in self._blocked:
+                return
+            self._ready_keys.append(key)
+            if self._serving_ready_keys:
+                return
+            self._serving_ready_keys = True
+            try:
+                while self._ready_keys:
+                    key = self._ready_keys.popleft()
+                    while key in self._blocked and self.type(key) == 'list':
+                        client = self._blocked.oldest(key)
+                        self._blocked.remove(client)
+                        client.result = client.serve(key)
+                        client.served = True
+                        client.condition.notify()
+            finally:
+                self._serving_ready_keys = False
+
+    def _pop_with_key(self, pop_func):
+        """
+        Return a function that pops from a list with ``pop_func`` and returns (key, value).
+        """
+        def serve(key):
+            value = pop_func(key)
+            return None if value is None else (key, value)
+        return serve
 
     def blpop(self, keys, timeout=0):
         """Emulate blpop"""
-        return self._blocking_pop(self.lpop, keys, timeout)
+        return self._blocking_pop(self._pop_with_key(self.lpop), keys, timeout)
 
     def brpop(self, keys, timeout=0):
         """Emulate brpop"""
-        return self._blocking_pop(self.rpop, keys, timeout)
+        return self._blocking_pop(self._pop_with_key(self.rpop), keys, timeout)
 
     def lpop(self, key):
         """Emulate lpop."""
@@ -574,9 +1511,11 @@ class MockRedis(object):
             return None
 
         try:
-            value = str(redis_list.pop(0))
+            value = self._decode(redis_list.popleft())
+            self._notify(NOTIFY_LIST, 'lpop', key)
             if len(redis_list) == 0:
                 del self.redis[key]
+                self._notify(NOTIFY_GENERIC, 'del', key)
             return value
         except (IndexError):
             # Redis returns nil if popping from an empty list
@@ -586,10 +1525,21 @@ class MockRedis(object):
         """Emulate lpush."""
         redis_list = self._get_list(key, 'LPUSH', create=True)
 
-        # Creates the list at this key if it doesn't exist, and appends args to its beginning
-        args_reversed = [str(arg) for arg in args]
-        args_reversed.reverse()
-        self.redis[key] = args_reversed + redis_list
+        # Creates the list at this key if it doesn't exist, and prepends args one at a time
+        redis_list.extendleft([self._stored(value) for value in args])
+        length = len(redis_list)
+        self._notify(NOTIFY_LIST, 'lpush', key)
+        self._signal_list(key)
+        return length
+
+    def lpushx(self, key, *args):
+        """Emulate lpushx."""
+        redis_list = self._get_list(key, 'LPUSHX')
+        if not redis_list:
+            return 0
+        redis_list.extendleft([self._stored(value) for value in args])
+        self._notify(NOTIFY_LIST, 'lpush', key)
+        return len(redis_list)
 
     def rpop(self, key):
         """Emulate lpop."""
@@ -599,9 +1549,11 @@ class MockRedis(object):
             return None
 
         try:
-            value = str(redis_list.pop())
+            value = self._decode(redis_list.pop())
+            self._notify(NOTIFY_LIST, 'rpop', key)
             if len(redis_list) == 0:
                 del self.redis[key]
+                self._notify(NOTIFY_GENERIC, 'del', key)
             return value
         except (IndexError):
             # Redis returns nil if popping from an empty list
@@ -612,41 +1564,70 @@ class MockRedis(object):
         redis_list = self._get_list(key, 'RPUSH', create=True)
 
         # Creates the list at this key if it doesn't exist, and appends args to it
-        redis_list.extend(map(str, args))
+        redis_list.extend([self._stored(value) for value in args])
+        length = len(redis_list)
+        self._notify(NOTIFY_LIST, 'rpush', key)
+        self._signal_list(key)
+        return length
+
+    def rpushx(self, key, *args):
+        """Emulate rpushx."""
+        redis_list = self._get_list(key, 'RPUSHX')
+        if not redis_list:
+            return 0
+        redis_list.extend([self._stored(value) for value in args])
+        self._notify(NOTIFY_LIST, 'rpush', key)
+        return len(redis_list)
+
+    def linsert(self, key, where, refvalue, value):
+        """Emulate linsert."""
+        where = str(where).upper()
+        if where not in ('BEFORE', 'AFTER'):
+            raise ResponseError("syntax error")
+        redis_list = self._get_list(key, 'LINSERT')
+        if not redis_list:
+            return 0
+        index = next(redis_list.find(self._element(refvalue)), None)
+        if index is None:
+            return -1
+        redis_list.insert(index if where == 'BEFORE' else index + 1, self._stored(value))
+        self._notify(NOTIFY_LIST, 'linsert', key)
+        return len(redis_list)
+
+    def lpos(self, key, value, rank=None, count=None, maxlen=None):
+        """
+        Emulate lpos.
+
+        A negative ``rank`` searches from the tail; at most ``maxlen`` values are examined.
+        """
+        rank = 1 if rank is None else int(rank)
+        if rank == 0:
+            raise ResponseError("RANK can't be zero: use 1 to start from the first match, "
+                                "2 from the second ... or use negative to start from the end "
+                                "of the list")
+        if count is not None and int(count) < 0:
+            raise ResponseError("COUNT can't be negative")
+        if maxlen is not None and int(maxlen) < 0:
+            raise ResponseError("MAXLEN can't be negative")
+
+        redis_list = self._get_list(key, 'LPOS')
+        found = redis_list.find(self._element(value), reverse=rank < 0, maxlen=int(maxlen or 0))
+        matches = islice(found, abs(rank) - 1, None)
+        if count is None:
+            return next(matches, None)
+        return list(islice(matches, int(count) or None))
 
     def lrem(self, key, value, count=0):
         """Emulate lrem."""
-        key, value = str(key), str(value)
+        key, value = str(key), self._element(value)
         redis_list = self._get_list(key, 'LREM')
-        removed_count = 0
-        if key in self.redis:
-            if count == 0:
-                # Remove all ocurrences
-                while redis_list.count(value):
-                    redis_list.remove(value)
-                    removed_count += 1
-            elif count > 0:
-                counter = 0
-                # remove first 'count' ocurrences
-                while redis_list.count(value):
-                    redis_list.remove(value)
-                    counter += 1
-                    removed_count += 1
-                    if counter >= count:
-                        break
-            elif count < 0:
-                # remove last 'count' ocurrences
-                counter = -count
-                new_list = []
-                for v in reversed(redis_list):
-                    if v == value and counter > 0:
-                        counter -= 1
-                        removed_count += 1
-                    else:
-                        new_list.append(v)
-                self.redis[key] = list(reversed(new_list))
-        if removed_count > 0 and len(redis_list) == 0:
-            del self.redis[key]
+        # count > 0 removes from the head, count < 0 from the tail and count == 0 everywhere
+        removed_count = redis_list.remove_value(value, count)
+        if removed_count > 0:
+            self._notify(NOTIFY_LIST, 'lrem', key)
+            if len(redis_list) == 0:
+                del self.redis[key]
+                self._notify(NOTIFY_GENERIC, 'del', key)
         return removed_count
 
     def ltrim(self, key, start, stop):
@@ -654,25 +1635,122 @@ class MockRedis(object):
         redis_list = self._get_list(key, 'LTRIM')
         if redis_list:
             start, stop = self._translate_range(len(redis_list), start, stop)
-            self.redis[key] = redis_list[start:stop + 1]
+            redis_list.trim(start, stop)
+            self._notify(NOTIFY_LIST, 'ltrim', key)
+            if not redis_list:
+                del self.redis[key]
+                self._notify(NOTIFY_GENERIC, 'del', key)
+
         return True
 
     def rpoplpush(self, source, destination):
         """Emulate rpoplpush"""
-        transfer_item = self.rpop(source)
-        if transfer_item is not None:
-            self.lpush(destination, transfer_item)
-        return transfer_item
+        return self.lmove(source, destination, 'RIGHT', 'LEFT')
 
     def brpoplpush(self, source, destination, timeout=0):
         """Emulate brpoplpush"""
-        transfer_item = self.brpop(source, timeout)
-        if transfer_item is None:
+        return self.blmove(source, destination, timeout, 'RIGHT', 'LEFT')
+
+    def lmove(self, first_list, second_list, src='LEFT', dest='RIGHT'):
+        """
+        Emulate lmove.
+
+        The value is popped from ``first_list`` and pushed to ``second_list`` as a single step.
+        """
+        src, dest = self._list_end(src), self._list_end(dest)
+        with self._blocking_lock:
+            source_list = self._get_list(first_list, 'LMOVE')
+            # check the destination type before changing anything
+            self._get_list(second_list, 'LMOVE')
+            if not source_list:
+                return None
+
+            value = source_list.popleft() if src == 'LEFT' else source_list.pop()
+            self._notify(NOTIFY_LIST, 'lpop' if src == 'LEFT' else 'rpop', first_list)
+            destination_list = self._get_list(second_list, 'LMOVE', create=True)
+            if dest == 'LEFT':
+                destination_list.appendleft(value)
+            else:
+                destination_list.append(value)
+            self._notify(NOTIFY_LIST, 'lpush' if dest == 'LEFT' else 'rpush', second_list)
+            if not source_list:
+                del self.redis[first_list]
+                self._notify(NOTIFY_GENERIC, 'del', first_list)
+            self._signal_list(second_list)
+            return self._decode(value)
+
+    def blmove(self, first_list, second_list, timeout, src='LEFT', dest='RIGHT'):
+        """Emulate blmove."""
+        src, dest = self._list_end(src), self._list_end(dest)
+        return self._blocking_pop(lambda key: self.lmove(key, second_list, src, dest),
+                                  [first_list], timeout)
+
+    def lmpop(self, num_keys, *args, **kwargs):
+        """
+        Emulate lmpop.
+
+        ``direction`` and ``count`` may be passed as keyword arguments (as in redis-py) or
+        trail the keys (as in the redis command).
+        """
+        keys, direction, count = self._parse_mpop_args('LMPOP', num_keys, args, kwargs)
+        with self._blocking_lock:
+            for key in keys:
+                result = self._pop_values(key, direction, count)
+                if result is not None:
+                    return result
+        return None
+
+    def blmpop(self, timeout, num_keys, *args, **kwargs):
+        """Emulate blmpop."""
+        keys, direction, count = self._parse_mpop_args('BLMPOP', num_keys, args, kwargs)
+        return self._blocking_pop(lambda key: self._pop_values(key, direction, count), keys,
+                                  timeout)
+
+    def _pop_values(self, key, direction, count):
+        """
+        Pop up to ``count`` values from one end of a list, returning [key, values] or None.
+        """
+        redis_list = self._get_list(key, 'LMPOP')
+        if not redis_list:
             return None
+        pop = redis_list.popleft if direction == 'LEFT' else redis_list.pop
+        values = [pop() for _ in xrange(min(count, len(redis_list)))]
+        self._notify(NOTIFY_LIST, 'lpop' if direction == 'LEFT' else 'rpop', key)
+        if not redis_list:
+            del self.redis[key]
+            self._notify(NOTIFY_GENERIC, 'del', key)
+        return [key, self._decode_values(values)]
 
-        key, val = transfer_item
-        self.lpush(destination, val)
-        return val
+    def _parse_mpop_args(self, command, num_keys, args, kwargs):
+        """
+        Split the arguments of lmpop and blmpop into keys, direction and count.
+        """
+        num_keys = int(num_keys)
+        if num_keys <= 0 or len(args) < num_keys:
+            raise ResponseError("numkeys should be greater than 0")
+        keys, options = list(args[:num_keys]), list(args[num_keys:])
+        direction, count = kwargs.get('direction'), kwargs.get('count', 1)
+        if options:
+            direction = options.pop(0)
+            if len(options) == 2 and str(options[0]).upper() == 'COUNT':
+                count = options[1]
+            elif options:
+                raise ResponseError("syntax error")
+        if direction is None:
+            raise TypeError("{} requires a direction".format(command.lower()))
+        count = int(count)
+        if count <= 0:
+            raise ResponseError("count should be greater than 0")
+        return keys, self._list_end(direction), count
+
+    def _list_end(self, where):
+        """
+        Validate a LEFT or RIGHT list end argument.
+        """
+        where = str(where).upper()
+        if where not in ('LEFT', 'RIGHT'):
+            raise ResponseError("syntax error")
+        return where
 
     def lset(self, key, index, value):
         """Emulate lset."""
@@ -680,9 +1758,10 @@ class MockRedis(object):
         if redis_list is None:
             raise ResponseError("no such key")
         try:
-            redis_list[index] = value
+            redis_list[index] = self._stored(value)
         except IndexError:
             raise ResponseError("index out of range")
+        self._notify(NOTIFY_LIST, 'lset', key)
 
     def sort(self, name,
              start=None,
@@ -693,73 +1772,127 @@ class MockRedis(object):
              alpha=False,
              store=None,
              groups=False):
+        """
+        Emulate sort.
+
+        Sorts a list, set or sorted set. ``by`` and ``get`` patterns may look up string
+        values (``weight_*``) or hash fields (``object_*->weight``), and ``get`` may be '#'
+        for the member itself. The sort keys are computed once per member and, given a
+        ``start`` and ``num``, only the first ``start + num`` members are fully ordered.
+        """
         # check valid parameter combos
         if [start, num] != [None, None] and None in [start, num]:
             raise ValueError('start and num must both be specified together')
 
-        # check up-front if there's anything to actually do
-        items = num != 0 and self.get(name)
-        if not items:
-            if store:
-                return 0
-            else:
-                return []
+        members = self._sort_source(name)
+        # a BY pattern without '*' (such as 'nosort') skips sorting
+        dontsort = by is not None and '*' not in by
+        if dontsort and store and type(self.redis.get(name)) in (IntSet, IndexedSet):
+            # sort set members anyway, so that the stored result is deterministic
+            dontsort, by, alpha = False, None, True
 
-        # always organize the items as tuples of the value from the list itself and the value to sort by
-        if by and '*' in by:
-            items = [(i, self.get(by.replace('*', str(i)))) for i in items]
-        elif by in [None, 'nosort']:
-            items = [(i, i) for i in items]
+        if start is None:
+            start, end = 0, None
         else:
-            raise ValueError('invalid value for "by": %s' % by)
+            start = max(0, start)
+            end = None if num < 0 else start + num
 
-        if by != 'nosort':
-            # if sorting, do alpha sort or float (default) and take desc flag into account
-            sort_type = alpha and str or float
-            items.sort(key=lambda x: sort_type(x[1]), reverse=bool(desc))
+        if dontsort:
+            members = members[start:end]
+        else:
+            # order the positions of the members by their precomputed keys
+            key = self._sort_keys(members, by, alpha).__getitem__
+            if end is None:
+                order = sorted(range(len(members)), key=key, reverse=bool(desc))
+            else:
+                # partial sort: only the first ``end`` members are needed
+                order = (nlargest if desc else nsmallest)(end, range(len(members)), key=key)
+            members = [members[index] for index in order[start:end]]
 
-        # results is a list of lists to support different styles of get and also groups
-        results = []
         if get:
             if isinstance(get, basestring):
                 # always deal with get specifiers as a list
                 get = [get]
-            for g in get:
-                if g == '#':
-                    results.append([self.get(i) for i in items])
-                else:
-                    results.append([self.get(g.replace('*', str(i[0]))) for i in items])
-        else:
-            # if not using GET then returning just the item itself
-            results.append([i[0] for i in items])
-
-        # results to either list of tuples or list of values
-        if len(results) > 1:
-            results = list(zip(*results))
-        elif results:
-            results = results[0]
-
-        # apply the 'start' and 'num' to the results
-        if not start:
-            start = 0
-        if not num:
-            if start:
-                results = results[start:]
-        else:
-            end = start + num
-            results = results[start:end]
-
-        # if more than one GET then flatten if groups not wanted
-        if get and len(get) > 1:
-            if not groups:
+            results = [tuple(self._sort_lookup(pattern, member) for pattern in get)
+                       for member in members]
+            if len(get) == 1:
+                results = [result[0] for result in results]
+            elif not groups or store:
+                # if more than one GET then flatten if groups not wanted
                 results = list(chain(*results))
+        else:
+            # if not using GET then returning just the member itself
+            results = self._decode_values(members)
 
         # either store value and return length of results or just return results
         if store:
-            self.redis[store] = results
+            if not results:
+                self.delete(store)
+                return 0
+            self._replace(store, QuickList(self._stored('' if result is None else result)
+                                           for result in results))
+            self._notify(NOTIFY_LIST, 'sortstore', store)
+            self._signal_list(store)
             return len(results)
-        else:
-            return results
+        return results
+
+    def _sort_source(self, name):
+        """
+        Get the members of the list, set or sorted set to sort, in their stored order.
+        """
+        value = self.redis.get(name)
+        if value is None:
+            return []
+        type_ = self.TYPE_NAMES.get(type(value))
+        if type_ == 'zset':
+            return [member for _, member in value]
+        if type_ not in ('list', 'set'):
+            raise TypeError("SORT requires a list, set or sorted set")
+        if type(value) is IntSet:
+            return [str(member) for member in value]
+        return list(value)
+
+    def _sort_keys(self, members, by, alpha):
+        """
+        Compute the key to sort each member by: its value (or looked up value) as a string if
+        ``alpha``, with missing values empty, or else as a number, with missing values zero.
+
+        As in Redis, ties between equal numbers are broken by comparing the members.
+        """
+        text = self._text
+        values = members if by is None else [self._sort_lookup(by, member) for member in members]
+        if alpha:
+            return ['' if value is None else value if type(value) is str else text(value)
+                    for value in values]
+        try:
+            scores = [0.0 if value is None else float(value) for value in values]
+        except ValueError:
+            raise ResponseError("One or more scores can't be converted into double")
+        if len(set(scores)) == len(scores):
+            return scores
+        return list(zip(scores, [member if type(member) is str else text(member)
+                                 for member in members]))
+
+    def _sort_lookup(self, pattern, member):
+        """
+        Look up a SORT BY or GET pattern for a member: '#' is the member itself, ``key_*`` the
+        string value of a key and ``key_*->field`` a field of a hash. Returns None if there
+        is no such value.
+        """
+        if pattern == '#':
+            return self._decode(member)
+        if '*' not in pattern:
+            return None
+        field = None
+        if '->' in pattern and not pattern.endswith('->'):
+            pattern, field = pattern.split('->', 1)
+        key = pattern.replace('*', self._text(member), 1)
+        type_ = self.TYPE_NAMES.get(type(self.redis.get(key)))
+        if field is None:
+            return self._decode(self.redis[key]) if type_ == 'string' else None
+        if type_ != 'hash':
+            return None
+        return self._decode(self._get_hash(key, 'SORT').get(self._field(field)))
 
     #### SCAN COMMANDS ####
 
@@ -802,39 +1935,43 @@ class MockRedis(object):
     def sscan(self, name, cursor='0', match=None, count=10):
         """Emulate sscan."""
         def value_function():
-            members = list(self.smembers(name))
-            members.sort()  # sort for consistent order
-            return members
-        return self._common_scan(value_function, cursor=cursor, match=match, count=count)
+            # sort for consistent order
+            return sorted(self._get_set(name, 'SSCAN'), key=self._text)
+        scanned = self._common_scan(value_function, cursor=cursor, match=match, count=count,
+                                    key=self._text)
+        scanned[1] = self._decode_values(scanned[1])
+        return scanned
 
     def zscan(self, name, cursor='0', match=None, count=10):
         """Emulate zscan."""
         def value_function():
-            values = self.zrange(name, 0, -1, withscores=True)
-            values.sort(key=lambda x: x[1])  # sort for consistent order
-            return values
-        return self._common_scan(value_function, cursor=cursor, match=match, count=count, key=lambda v: v[0])
+            zset = self._get_zset(name, 'ZSCAN')
+            # list of (member, score) tuples, in score order for consistent order
+            return [(member, score) for score, member in zset] if zset else []
+        scanned = self._common_scan(value_function, cursor=cursor, match=match, count=count,
+                                    key=lambda v: self._text(v[0]))
+        scanned[1] = [(self._decode(member), score) for member, score in scanned[1]]
+        return scanned
 
     def hscan(self, name, cursor='0', match=None, count=10):
         """Emulate hscan."""
         def value_function():
-            values = self.hgetall(name)
-            values = list(values.items())  # list of tuples for sorting and matching
-            values.sort(key=lambda x: x[0])  # sort for consistent order
-            return values
+            # list of tuples for sorting and matching, sorted for consistent order
+            return sorted(self._get_hash(name, 'HSCAN').items(), key=lambda x: x[0])
         scanned = self._common_scan(value_function, cursor=cursor, match=match, count=count, key=lambda v: v[0])
-        scanned[1] = dict(scanned[1])  # from list of tuples back to dict
+        # from list of tuples back to dict
+        scanned[1] = dict((self._decode(attribute), self._decode(value))
+                          for attribute, value in scanned[1])
         return scanned
 
     #### SET COMMANDS ####
 
     def sadd(self, key, *values):
         """Emulate sadd."""
-        redis_set = self._get_set(key, 'SADD', create=True)
-        before_count = len(redis_set)
-        redis_set.update(map(str, values))
-        after_count = len(redis_set)
-        return after_count - before_count
+        added = self._add_to_set(key, [shared(self._element(value)) for value in values], 'SADD')
+        if added:
+            self._notify(NOTIFY_SET, 'sadd', key)
+        return added
 
     def scard(self, key):
         """Emulate scard."""
@@ -843,62 +1980,94 @@ class MockRedis(object):
 
     def sdiff(self, keys, *args):
         """Emulate sdiff."""
-        func = lambda left, right: left.difference(right)
-        return self._apply_to_sets(func, "SDIFF", keys, *args)
+        return set(self._decode_values(difference(self._get_sets(keys, args, "SDIFF"))))
 
     def sdiffstore(self, dest, keys, *args):
         """Emulate sdiffstore."""
-        result = self.sdiff(keys, *args)
-        self.redis[dest] = result
-        return len(result)
+        result = difference(self._get_sets(keys, args, "SDIFFSTORE"))
+        return self._store_set(dest, result, 'sdiffstore')
 
     def sinter(self, keys, *args):
         """Emulate sinter."""
-        func = lambda left, right: left.intersection(right)
-        return self._apply_to_sets(func, "SINTER", keys, *args)
+        return set(self._decode_values(intersection(self._get_sets(keys, args, "SINTER"))))
+
+    def sintercard(self, numkeys, keys, limit=0):
+        """
+        Emulate sintercard.
+
+        Counting stops once ``limit`` members are found, if limit is non-zero.
+        """
+        if numkeys < 1:
+            raise ResponseError("numkeys should be greater than 0")
+        if numkeys != len(keys):
+            raise ResponseError("Number of keys can't be greater than number of args")
+        if limit < 0:
+            raise ResponseError("LIMIT can't be negative")
+        sets = self._get_sets(keys, (), "SINTERCARD")
+        return sum(1 for _ in intersection(sets, limit))
 
     def sinterstore(self, dest, keys, *args):
         """Emulate sinterstore."""
-        result = self.sinter(keys, *args)
-        self.redis[dest] = result
-        return len(result)
+        result = intersection(self._get_sets(keys, args, "SINTERSTORE"))
+        return self._store_set(dest, result, 'sinterstore')
 
     def sismember(self, name, value):
         """Emulate sismember."""
-        redis_set = self._get_set(name, 'SISMEMBER')
-        if not redis_set:
-            return 0
+        return self._smembership(name, [value], 'SISMEMBER')[0]
 
-        result = str(value) in redis_set
-        return 1 if result else 0
+    def smismember(self, name, values, *args):
+        """Emulate smismember."""
+        values = self._list_or_args(values, args)
+        return self._smembership(name, values, 'SMISMEMBER')
 
     def smembers(self, name):
         """Emulate smembers."""
-        return self._get_set(name, 'SMEMBERS').copy()
+        redis_set = self._get_set(name, 'SMEMBERS')
+        if self.zero_copy:
+            return self._view(SetView, redis_set)
+        return set(self._decode_values(redis_set))
 
     def smove(self, src, dst, value):
         """Emulate smove."""
+        value = self._element(value)
         src_set = self._get_set(src, 'SMOVE')
-        dst_set = self._get_set(dst, 'SMOVE')
+        self._get_set(dst, 'SMOVE')
 
         if value not in src_set:
             return False
+        if src == dst:
+            return True
 
+        src_set = self._unshare(src, src_set)
         src_set.discard(value)
-        dst_set.add(value)
-        self.redis[src], self.redis[dst] = src_set, dst_set
+        self._notify(NOTIFY_SET, 'srem', src)
+        if not src_set:
+            self.delete(src)
+        self._add_to_set(dst, [value], 'SMOVE')
+        self._notify(NOTIFY_SET, 'sadd', dst)
         return True
 
-    def spop(self, name):
-        """Emulate spop."""
+    def spop(self, name, count=None):
+        """
+        Emulate spop.
+
+        Returns a single member, or a list of up to ``count`` members if count is given.
+        """
+        if count is not None and count < 0:
+            raise ResponseError("value is out of range, must be positive")
         redis_set = self._get_set(name, 'SPOP')
-        if not redis_set:
-            return None
-        member = choice(list(redis_set))
-        redis_set.remove(member)
+        if not redis_set or count == 0:
+            return None if count is None else []
+        redis_set = self._unshare(name, redis_set)
+        if count is None:
+            result = redis_set.pop_random()
+        else:
+            result = [redis_set.pop_random() for _ in xrange(min(count, len(redis_set)))]
+        self._notify(NOTIFY_SET, 'spop', name)
         if len(redis_set) == 0:
             del self.redis[name]
-        return member
+            self._notify(NOTIFY_GENERIC, 'del', name)
+        return self._decode(result) if count is None else self._decode_values(result)
 
     def srandmember(self, name, number=None):
         """Emulate srandmember."""
@@ -906,35 +2075,38 @@ class MockRedis(object):
         if not redis_set:
             return None if number is None else []
         if number is None:
-            return choice(list(redis_set))
+            return self._decode(redis_set.random_member())
         elif number > 0:
-            return sample(list(redis_set), min(number, len(redis_set)))
+            return self._decode_values(redis_set.sample(number))
         else:
-            return [choice(list(redis_set)) for _ in xrange(abs(number))]
+            return self._decode_values(redis_set.choices(abs(number)))
 
     def srem(self, key, *values):
         """Emulate srem."""
         redis_set = self._get_set(key, 'SREM')
         if not redis_set:
             return 0
+        redis_set = self._unshare(key, redis_set)
         before_count = len(redis_set)
         for value in values:
-            redis_set.discard(str(value))
+            redis_set.discard(self._element(value))
         after_count = len(redis_set)
+        if after_count != before_count:
+            self._notify(NOTIFY_SET, 'srem', key)
         if before_count > 0 and len(redis_set) == 0:
             del self.redis[key]
+            self._notify(NOTIFY_GENERIC, 'del', key)
         return before_count - after_count
 
     def sunion(self, keys, *args):
         """Emulate sunion."""
-        func = lambda left, right: left.union(right)
-        return self._apply_to_sets(func, "SUNION", keys, *args)
+        result = self._decode_values(union(self._get_sets(keys, args, "SUNION")))
+        return result if isinstance(result, set) else set(result)
 
     def sunionstore(self, dest, keys, *args):
         """Emulate sunionstore."""
-        result = self.sunion(keys, *args)
-        self.redis[dest] = result
-        return len(result)
+        result = union(self._get_sets(keys, args, "SUNIONSTORE"))
+        return self._store_set(dest, result, 'sunionstore')
 
     #### SORTED SET COMMANDS ####
 
@@ -957,8 +2129,17 @@ class MockRedis(object):
         # kwargs
         pieces.extend(kwargs.items())
 
-        insert_count = lambda member, score: 1 if zset.insert(str(member), float(score)) else 0
-        return sum((insert_count(member, score) for member, score in pieces))
+        result = 0
+        changed = False
+        for member, score in pieces:
+            member, score = self._element(member), float(score)
+            # only members that are new or whose score changes count as changes
+            if zset.score(member) != score:
+                changed = True
+                result += 1 if zset.insert(member, score) else 0
+        if changed:
+            self._notify(NOTIFY_ZSET, 'zadd', name)
+        return result
 
     def zcard(self, name):
         zset = self._get_zset(name, "ZCARD")
@@ -976,10 +2157,11 @@ class MockRedis(object):
     def zincrby(self, name, value, amount=1):
         zset = self._get_zset(name, "ZINCRBY", create=True)
 
-        value = str(value)
+        value = self._element(value)
         score = zset.score(value) or 0.0
         score += float(amount)
         zset[value] = score
+        self._notify(NOTIFY_ZSET, 'zincr', name)
         return score
 
     def zinterstore(self, dest, keys, aggregate=None):
@@ -1002,7 +2184,8 @@ class MockRedis(object):
             intersection[member] = reduce(aggregate_func, scores)
 
         # always override existing keys
-        self.redis[dest] = intersection
+        self._replace(dest, intersection)
+        self._notify(NOTIFY_ZSET, 'zinterstore', dest)
         return len(intersection)
 
     def zrange(self, name, start, end, desc=False, withscores=False,
@@ -1039,7 +2222,7 @@ class MockRedis(object):
     def zrank(self, name, value):
         zset = self._get_zset(name, "ZRANK")
 
-        return zset.rank(value) if zset else None
+        return zset.rank(self._element(value)) if zset else None
 
     def zrem(self, name, *values):
         zset = self._get_zset(name, "ZREM")
@@ -1047,10 +2230,9 @@ class MockRedis(object):
         if not zset:
             return 0
 
-        count_removals = lambda value: 1 if zset.remove(value) else 0
+        count_removals = lambda value: 1 if zset.remove(self._element(value)) else 0
         removal_count = sum((count_removals(value) for value in values))
-        if removal_count > 0 and len(zset) == 0:
-            del self.redis[name]
+        self._notify_zset_removal('zrem', name, zset, removal_count)
         return removal_count
 
     def zremrangebyrank(self, name, start, end):
@@ -1062,8 +2244,7 @@ class MockRedis(object):
         start, end = self._translate_range(len(zset), start, end)
         count_removals = lambda score, member: 1 if zset.remove(member) else 0
         removal_count = sum((count_removals(score, member) for score, member in zset.range(start, end)))
-        if removal_count > 0 and len(zset) == 0:
-            del self.redis[name]
+        self._notify_zset_removal('zremrangebyrank', name, zset, removal_count)
         return removal_count
 
     def zremrangebyscore(self, name, min_, max_):
@@ -1080,8 +2261,7 @@ class MockRedis(object):
                              for score, member in zset.scorerange(min_, max_,
                                                                   start_inclusive=include_start,
                                                                   end_inclusive=include_end)))
-        if removal_count > 0 and len(zset) == 0:
-            del self.redis[name]
+        self._notify_zset_removal('zremrangebyscore', name, zset, removal_count)
         return removal_count
 
     def zrevrange(self, name, start, end, withscores=False,
@@ -1116,12 +2296,12 @@ class MockRedis(object):
         if zset is None:
             return None
 
-        return len(zset) - zset.rank(value) - 1
+        return len(zset) - zset.rank(self._element(value)) - 1
 
     def zscore(self, name, value):
         zset = self._get_zset(name, "ZSCORE")
 
-        return zset.score(value) if zset is not None else None
+        return zset.score(self._element(value)) if zset is not None else None
 
     def zunionstore(self, dest, keys, aggregate=None):
         union = SortedSet()
@@ -1139,7 +2319,8 @@ class MockRedis(object):
                     union[member] = score
 
         # always override existing keys
-        self.redis[dest] = union
+        self._replace(dest, union)
+        self._notify(NOTIFY_ZSET, 'zunionstore', dest)
         return len(union)
 
     #### Script Commands ####
@@ -1256,25 +2437,151 @@ class MockRedis(object):
     def publish(self, channel, message):
         self.pubsub[channel].append(message)
 
+    def _notify(self, type_, event, key):
+        """
+        Publish a keyspace notification for ``event`` on ``key``, if its class is enabled.
+        """
+        flags = self._notify_flags
+        if not flags & type_:
+            return
+        if flags & NOTIFY_KEYSPACE:
+            self.publish('__keyspace@{}__:{}'.format(self.db, key), event)
+        if flags & NOTIFY_KEYEVENT:
+            self.publish('__keyevent@{}__:{}'.format(self.db, event), key)
+
+    def _notify_zset_removal(self, event, name, zset, removal_count):
+        """
+        Shared zrem and zremrange* routine that publishes removals and deletes emptied zsets.
+        """
+        if removal_count > 0:
+            self._notify(NOTIFY_ZSET, event, name)
+            if len(zset) == 0:
+                del self.redis[name]
+                self._notify(NOTIFY_GENERIC, 'del', name)
+
     #### Internal ####
 
     def _get_list(self, key, operation, create=False):
         """
         Get (and maybe create) a list by name.
         """
-        return self._get_by_type(key, operation, create, 'list', [])
+        return self._get_by_type(key, operation, create, 'list', QuickList())
 
     def _get_set(self, key, operation, create=False):
         """
         Get (and maybe create) a set by name.
         """
-        return self._get_by_type(key, operation, create, 'set', set())
+        return self._get_by_type(key, operation, create, 'set', IntSet())
 
     def _get_hash(self, name, operation, create=False):
         """
         Get (and maybe create) a hash by name.
+
+        Expired fields of the hash are removed first.
+        """
+        if name in self.hash_timeouts:
+            self._expire_hash_fields(name, self.clock.now())
+        return self._get_by_type(name, operation, create, 'hash', CompactHash())
+
+    def _hash_for_write(self, name, operation, items):
+        """
+        Get (and maybe create) a hash by name, ready for the (field, value) ``items`` to be
+        written to it.
+
+        The hash is unshared from any live views, and switches from the listpack encoding to
+        a dict if it would exceed ``hash-max-listpack-entries`` fields or an item is longer
+        than ``hash-max-listpack-value``.
+        """
+        redis_hash = self._unshare(name, self._get_hash(name, operation, create=True))
+        if isinstance(redis_hash, CompactHash):
+            limit = self._max_listpack_value
+            new_count = sum(1 for attribute, _ in items if attribute not in redis_hash)
+            if len(redis_hash) + new_count > self._max_listpack_entries or \
+                    any(len(attribute) > limit or
+                        (type(value) not in INTEGER_TYPES and len(value) > limit)
+                        for attribute, value in items):
+                redis_hash = self.redis[name] = dict(redis_hash.items())
+        return redis_hash
+
+    def _expire_hash_fields(self, name, now, limit=None):
+        """
+        Remove (up to ``limit``) fields of the hash ``name`` that expired before ``now``.
+
+        Returns the number of fields removed.
+        """
+        field_timeouts = self.hash_timeouts.get(name)
+        if field_timeouts is None:
+            return 0
+        expired = field_timeouts.pop_due(now, limit)
+        if expired:
+            redis_hash = self._unshare(name, self.redis.get(name, {}))
+            for attribute, _ in expired:
+                redis_hash.pop(attribute, None)
+            self._notify(NOTIFY_HASH, 'hexpired', name)
+            if not redis_hash:
+                self.redis.pop(name, None)
+                self._forget_hash_timeouts(name)
+                self._notify(NOTIFY_GENERIC, 'del', name)
+                return len(expired)
+        self._schedule_hash_expiry(name)
+        return len(expired)
+
+    def _schedule_hash_expiry(self, name):
         """
-        return self._get_by_type(name, operation, create, 'hash', {})
+        Record when the next field of the hash ``name`` expires.
+        """
+        field_timeouts = self.hash_timeouts.get(name)
+        next_expiry = field_timeouts.next_expiry() if field_timeouts is not None else None
+        if next_expiry is None:
+            self._forget_hash_timeouts(name)
+        else:
+            self._hash_expiries[name] = next_expiry
+
+    def _persist_hash_fields(self, name, attributes):
+        """
+        Remove the expiry times of hash fields that are overwritten or deleted.
+        """
+        field_timeouts = self.hash_timeouts.get(name)
+        if field_timeouts:
+            for attribute in attributes:
+                field_timeouts.pop(attribute, None)
+
+    def _forget_hash_timeouts(self, name):
+        """
+        Remove all hash field expiry times of ``name``.
+        """
+        self.hash_timeouts.pop(name, None)
+        self._hash_expiries.pop(name, None)
+
+    def _replace(self, key, value, keep_ttl=False):
+        """
+        Store ``value`` in place of any value of ``key``, removing its timeout (unless
+        ``keep_ttl``) and the hash field expiry times of the value it replaces.
+        """
+        self.redis[key] = value
+        self._forget_hash_timeouts(key)
+        if not keep_ttl:
+            self.timeouts.pop(key, None)
+
+    def _view(self, view_type, value):
+        """
+        Create a read-only view of a stored set or hash, and keep track of it so that
+        ``_unshare`` can protect it from writes.
+        """
+        view = view_type(value, self._decode)
+        self._views[next(self._view_tokens)] = view
+        return view
+
+    def _unshare(self, key, value):
+        """
+        Prepare the set or hash ``value`` stored at ``key`` to be modified.
+
+        If a live view reads it, the stored structure is replaced by a copy, which is
+        returned, so that the view is not affected by the modification.
+        """
+        if self._views and any(view.shares(value) for view in list(self._views.values())):
+            value = self.redis[key] = value.copy()
+        return value
 
     def _get_zset(self, name, operation, create=False):
         """
@@ -1287,13 +2594,15 @@ class MockRedis(object):
         Get (and maybe create) a redis data structure by name and type.
         """
         key = str(key)
-        if self.type(key) in [type_, 'none']:
+        value = self.redis.get(key)
+        if value is None:
             if create:
-                return self.redis.setdefault(key, default)
-            else:
-                return self.redis.get(key, default if return_default else None)
-
-        raise TypeError("{} requires a {}".format(operation, type_))
+                value = self.redis[key] = default
+                return value
+            return default if return_default else None
+        if self.TYPE_NAMES.get(type(value)) != type_:
+            raise TypeError("{} requires a {}".format(operation, type_))
+        return value
 
     def _translate_range(self, len_, start, end):
         """
@@ -1320,9 +2629,10 @@ class MockRedis(object):
         Return a suitable function from (score, member)
         """
         if withscores:
-            return lambda score_member: (score_member[1], score_cast_func(str(score_member[0])))
+            return lambda score_member: (self._decode(score_member[1]),
+                                         score_cast_func(str(score_member[0])))
         else:
-            return lambda score_member: score_member[1]
+            return lambda score_member: self._decode(score_member[1])
 
     def _aggregate_func(self, aggregate):
         """
@@ -1335,16 +2645,69 @@ class MockRedis(object):
         except KeyError:
             raise TypeError("Unsupported aggregate: {}".format(aggregate))
 
-    def _apply_to_sets(self, func, operation, keys, *args):
-        """Helper function for sdiff, sinter, and sunion"""
+    def _new_set(self, members):
+        """
+        Create a set of ``members``, with the intset encoding if they are all integers and
+        there are at most ``set-max-intset-entries`` of them.
+        """
+        if not isinstance(members, (IntSet, IndexedSet, set)):
+            members = list(members)
+        if len(members) <= self._max_intset_entries:
+            if isinstance(members, IntSet):
+                return members
+            if all(as_integer(member) is not None for member in members):
+                return IntSet(members)
+        return IndexedSet(members)
+
+    def _add_to_set(self, key, members, operation):
+        """
+        Add string ``members`` to a set (creating it if needed), switching from the intset
+        encoding to a hash set when a member is not an integer or the set grows too large.
+
+        Returns the number of members added.
+        """
+        redis_set = self._unshare(key, self._get_set(key, operation, create=True))
+        if isinstance(redis_set, IntSet) and \
+                not all(as_integer(member) is not None for member in members):
+            redis_set = self.redis[key] = IndexedSet(redis_set)
+        before_count = len(redis_set)
+        redis_set.update(members)
+        if isinstance(redis_set, IntSet) and len(redis_set) > self._max_intset_entries:
+            self.redis[key] = IndexedSet(redis_set)
+        return len(redis_set) - before_count
+
+    def _smembership(self, name, values, operation):
+        """
+        Test each of ``values`` for membership of a set, looking the set up only once.
+
+        Returns a list of 1 (member) or 0 (not a member).
+        """
+        redis_set = self._get_set(name, operation)
+        if not redis_set:
+            return [0] * len(values)
+        return [1 if self._element(value) in redis_set else 0 for value in values]
+
+    def _get_sets(self, keys, args, operation):
+        """
+        Helper function for the set algebra commands: get the sets for keys and args.
+        """
         keys = self._list_or_args(keys, args)
         if not keys:
             raise TypeError("{} takes at least two arguments".format(operation.lower()))
-        left = self._get_set(keys[0], operation) or set()
-        for key in keys[1:]:
-            right = self._get_set(key, operation) or set()
-            left = func(left, right)
-        return left
+        return [self._get_set(key, operation) for key in keys]
+
+    def _store_set(self, dest, result, event):
+        """
+        Helper function for the set algebra store commands: store (or, if empty, delete)
+        the result and return its cardinality.
+        """
+        result = self._new_set(result)
+        if not result:
+            self.delete(dest)
+            return 0
+        self._replace(dest, result)
+        self._notify(NOTIFY_SET, event, dest)
+        return len(result)
 
     def _list_or_args(self, keys, args):
         """
@@ -1368,6 +2731,19 @@ class MockRedis(object):
             return False, float(score[1:])
         return True, float(score)
 
+
+def format_float(value):
+    """
+    Format a float as Redis does for INCRBYFLOAT: without an exponent or trailing zeros.
+    """
+    text = repr(value)
+    if 'e' in text:
+        text = '{:.17f}'.format(value)
+    if '.' in text:
+        text = text.rstrip('0').rstrip('.')
+    return text
+
+
 def get_total_seconds(td):
     """
     For python 2.6 support
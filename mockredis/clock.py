@@ -2,7 +2,9 @@
 Simple clock abstraction.
 """
 from abc import ABCMeta, abstractmethod
-from datetime import datetime
+from datetime import datetime, timedelta
+from weakref import ref
+import time
 
 
 class Clock(object):
@@ -17,8 +19,86 @@ class Clock(object):
     def now(self):
         pass
 
+    def sleep(self, seconds):
+        """
+        Wait for ``seconds`` to pass on this clock.
+        """
+        time.sleep(seconds)
+
+    def wait(self, condition, timeout):
+        """
+        Wait on ``condition`` (whose lock must be held) until notified or until ``timeout``
+        seconds pass on this clock.
+        """
+        condition.wait(timeout)
+
 
 class SystemClock(Clock):
 
     def now(self):
         return datetime.now()
+
+
+class VirtualClock(Clock):
+    """
+    A clock that only moves when told to.
+
+    Every MockRedis created with a virtual clock registers with it, so that ``advance``
+    expires keys as their timeouts pass; it holds them weakly, so that clients that are no
+    longer used are freed. Blocking operations that would wait on a virtual clock advance it
+    to their deadline instead of sleeping or waiting.
+    """
+
+    def __init__(self, start=None):
+        self._now = datetime.now() if start is None else start
+        self._listeners = []
+
+    def now(self):
+        return self._now
+
+    def register(self, listener):
+        """
+        Register a callable to be invoked (with the new time) whenever the clock advances.
+
+        Bound methods are held by a weak reference to their object, and dropped once it is
+        freed.
+        """
+        self._listeners.append(_weak_listener(listener))
+
+    def advance(self, seconds):
+        """
+        Move the clock forward by ``seconds``, which may be a number or a timedelta.
+        """
+        delta = seconds if isinstance(seconds, timedelta) else timedelta(seconds=seconds)
+        if delta < timedelta(0):
+            raise ValueError("cannot move a clock backwards")
+        self._now += delta
+        listeners = [(reference, reference()) for reference in self._listeners]
+        self._listeners = [reference for reference, listener in listeners
+                           if listener is not None]
+        for _, listener in listeners:
+            if listener is not None:
+                listener(self._now)
+
+    sleep = advance
+
+    def wait(self, condition, timeout):
+        self.advance(timeout)
+
+
+def _weak_listener(listener):
+    """
+    Return a function that returns ``listener``, or None once it has been freed.
+
+    A bound method is held by a weak reference to its object, so that registering it does
+    not keep the object alive.
+    """
+    owner = getattr(listener, '__self__', None)
+    if owner is None:
+        return lambda: listener
+    owner, function = ref(owner), listener.__func__
+
+    def dereference():
+        instance = owner()
+        return None if instance is None else function.__get__(instance, type(instance))
+    return dereference
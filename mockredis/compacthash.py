@@ -0,0 +1,85 @@
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
+
+
+class CompactHash(MutableMapping):
+    """
+    Redis-style hash implementation for small hashes.
+
+    Stores fields and values alternately in a single flat tuple, as Redis does with its
+    listpack encoding. This avoids the per-hash overhead (and spare capacity) of a hash
+    table, at the cost of linear-time lookups and writes, so hashes are expected to switch
+    to a dict once they grow.
+    """
+    __slots__ = ('_entries',)
+
+    def __init__(self, items=()):
+        """
+        Create a hash, optionally populated with a mapping or sequence of pairs.
+        """
+        # field, value, field, value, ...
+        self._entries = ()
+        self.update(items)
+
+    def copy(self):
+        """
+        Return a shallow copy of the hash.
+        """
+        other = CompactHash()
+        # tuples are immutable, so they can be shared
+        other._entries = self._entries
+        return other
+
+    def __len__(self):
+        return len(self._entries) // 2
+
+    def __contains__(self, field):
+        return self._find(field) >= 0
+
+    def __iter__(self):
+        return iter(self._entries[::2])
+
+    def __getitem__(self, field):
+        position = self._find(field)
+        if position < 0:
+            raise KeyError(field)
+        return self._entries[position + 1]
+
+    def __setitem__(self, field, value):
+        position = self._find(field)
+        entries = self._entries
+        if position < 0:
+            self._entries = entries + (field, value)
+        else:
+            self._entries = entries[:position + 1] + (value,) + entries[position + 2:]
+
+    def __delitem__(self, field):
+        position = self._find(field)
+        if position < 0:
+            raise KeyError(field)
+        self._entries = self._entries[:position] + self._entries[position + 2:]
+
+    def __repr__(self):
+        return "CompactHash({})".format(dict(self.items()))
+
+    def items(self):
+        entries = self._entries
+        return list(zip(entries[::2], entries[1::2]))
+
+    def _find(self, field):
+        """
+        Return the position of ``field`` in the entries, or -1 if it is not present.
+        """
+        entries = self._entries
+        position = 0
+        while True:
+            try:
+                position = entries.index(field, position)
+            except ValueError:
+                return -1
+            # skip values that happen to equal the field name
+            if position % 2 == 0:
+                return position
+            position += 1
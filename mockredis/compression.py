@@ -0,0 +1,111 @@
+"""
+Optional compression of large string values.
+"""
+from collections import OrderedDict
+import sys
+import zlib
+
+if sys.version_info >= (3, 0):
+    unicode = str
+
+
+class CompressedString(object):
+    """
+    A compressed string value, with the length of the original bytes and whether it was text.
+    """
+    __slots__ = ('data', 'length', 'is_text')
+
+    def __init__(self, data, length, is_text):
+        self.data = data
+        self.length = length
+        self.is_text = is_text
+
+    def __eq__(self, other):
+        if not isinstance(other, CompressedString):
+            return NotImplemented
+        return (self.data, self.length, self.is_text) == (other.data, other.length, other.is_text)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.data, self.length, self.is_text))
+
+
+class Compressor(object):
+    """
+    Compresses string values of at least ``threshold`` bytes with zlib or lzma.
+
+    Values are decompressed when they are read, and the ``cache_size`` most recently
+    decompressed values are kept, so that repeated reads of the same few large values do not
+    decompress them again.
+    """
+
+    def __init__(self, threshold, codec='zlib', cache_size=16, encoding='utf-8'):
+        self.threshold = threshold
+        self.codec = codec
+        self._compress, self._decompress = _codec_functions(codec)
+        self.cache_size = cache_size
+        self.encoding = encoding
+        # ordered dictionary from CompressedString to decompressed value, least recent first
+        self._cache = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def compress(self, value):
+        """
+        Return a ``CompressedString`` for a large text or bytes value, or the value itself if
+        it is small or does not compress.
+        """
+        if isinstance(value, unicode):
+            # a quick check before encoding, as a character is at most four bytes
+            if len(value) * 4 < self.threshold:
+                return value
+            data, is_text = value.encode(self.encoding), True
+        elif isinstance(value, bytes):
+            data, is_text = value, False
+        else:
+            return value
+        if len(data) < self.threshold:
+            return value
+        compressed = self._compress(data)
+        if len(compressed) >= len(data):
+            return value
+        return CompressedString(compressed, len(data), is_text)
+
+    def decompress(self, value):
+        """
+        Return the original value of a ``CompressedString``.
+        """
+        cache = self._cache
+        try:
+            result = cache.pop(value)
+            self.cache_hits += 1
+        except KeyError:
+            result = self._decompress(value.data)
+            if value.is_text:
+                result = result.decode(self.encoding)
+            self.cache_misses += 1
+            if not self.cache_size:
+                return result
+            if len(cache) >= self.cache_size:
+                cache.popitem(last=False)
+        cache[value] = result
+        return result
+
+
+def _codec_functions(codec):
+    """
+    Return the compression and decompression functions of ``codec``.
+
+    :raises: RuntimeError if lzma is requested but not available.
+    """
+    if codec == 'zlib':
+        return zlib.compress, zlib.decompress
+    if codec == 'lzma':
+        try:
+            import lzma
+        except ImportError:
+            raise RuntimeError("lzma not installed")
+        return lzma.compress, lzma.decompress
+    raise ValueError("Unsupported compression: {}".format(codec))
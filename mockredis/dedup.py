@@ -0,0 +1,89 @@
+"""
+Optional deduplication of large stored values.
+"""
+import sys
+
+from mockredis.compression import CompressedString
+
+# the pool is pruned when it grows past this many values, and then when it doubles
+MIN_PRUNE_SIZE = 1024
+
+
+class ValuePool(object):
+    """
+    Content-addressed store of large values, so that identical values written to several
+    keys, hash fields or list elements are stored once.
+
+    Values are looked up by their contents, which costs one hash of each value written (or,
+    for a compressed value, of its compressed bytes). Values are reference counted by the
+    interpreter: once nothing but the pool refers to a value, it is dropped the next time
+    the pool is pruned, which happens whenever it doubles in size. Pruning relies on
+    ``sys.getrefcount``, so on interpreters without it values are never dropped.
+    """
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        # dictionary from value (or, for compressed values, their compressed bytes) to value
+        self._values = {}
+        self._next_prune = MIN_PRUNE_SIZE
+
+    def __len__(self):
+        return len(self._values)
+
+    def share(self, value):
+        """
+        Return the stored value equal to ``value`` if there is one, or else store and
+        return ``value`` itself; values smaller than ``threshold`` bytes are returned as they
+        are.
+        """
+        if type(value) is CompressedString:
+            if value.length < self.threshold:
+                return value
+            key = (value.is_text, value.data)
+        elif isinstance(value, (bytes, str)) and len(value) >= self.threshold:
+            key = value
+        else:
+            return value
+        stored = self._values.setdefault(key, value)
+        if type(stored) is not type(value):
+            # equal but of different types (str and unicode under Python 2)
+            return value
+        if len(self._values) >= self._next_prune:
+            self.prune()
+        return stored
+
+    def prune(self):
+        """
+        Drop the values that nothing but the pool refers to.
+        """
+        if _LIMITS is not None:
+            for key in [key for key, same, count in _reference_counts(self._values)
+                        if count <= _LIMITS[same]]:
+                del self._values[key]
+        self._next_prune = max(MIN_PRUNE_SIZE, 2 * len(self._values))
+
+
+def _reference_counts(values):
+    """
+    Return the key of each value, whether the key is the value itself, and its reference
+    count.
+    """
+    return [(key, key is values[key], sys.getrefcount(values[key])) for key in values]
+
+
+def _calibrate():
+    """
+    Return the reference counts, by whether the key is the value itself, that values have
+    when nothing but the pool refers to them, or None if they cannot be counted.
+    """
+    if not hasattr(sys, 'getrefcount'):
+        return None
+    values = {}
+    value = ''.join(['x', 'y'])
+    values[value] = value
+    values[(False, b'')] = CompressedString(b'', 0, False)
+    del value
+    return dict((same, count) for _, same, count in _reference_counts(values))
+
+
+_LIMITS = _calibrate()
@@ -0,0 +1,105 @@
+"""
+Expiry bookkeeping.
+"""
+from heapq import heapify, heappop, heappush
+from itertools import count
+
+
+class ExpiryIndex(object):
+    """
+    A mapping from name to expiry time that can also yield its due entries in expiry order.
+
+    Maintains two internal data structures:
+
+    1. A dictionary from name to expiry time.
+    2. A min-heap of (expiry time, sequence number, name) entries; the sequence number keeps
+       entries with equal expiry times from comparing their names.
+
+    Heap entries are not removed when a name is deleted or given a new expiry time; instead,
+    stale entries are skipped when they reach the top of the heap (and the heap is rebuilt once
+    stale entries outnumber live ones). Setting an expiry and finding the next due entry are
+    therefore both O(log N).
+    """
+    def __init__(self):
+        """
+        Create an empty index.
+        """
+        # dictionary from name to expiry time
+        self._expiries = {}
+        # heap of (expiry time, sequence number, name)
+        self._heap = []
+        self._counter = count()
+
+    def clear(self):
+        """
+        Remove all entries from the index.
+        """
+        self.__init__()
+
+    def __len__(self):
+        return len(self._expiries)
+
+    def __contains__(self, name):
+        return name in self._expiries
+
+    def __iter__(self):
+        return iter(self._expiries)
+
+    def __getitem__(self, name):
+        return self._expiries[name]
+
+    def __setitem__(self, name, when):
+        self._expiries[name] = when
+        heappush(self._heap, (when, next(self._counter), name))
+        if len(self._heap) > 2 * len(self._expiries) + 16:
+            self._compact()
+
+    def __delitem__(self, name):
+        del self._expiries[name]
+
+    def get(self, name, default=None):
+        return self._expiries.get(name, default)
+
+    def pop(self, name, *default):
+        return self._expiries.pop(name, *default)
+
+    def items(self):
+        return list(self._expiries.items())
+
+    def next_expiry(self):
+        """
+        Return the earliest expiry time in the index, or None if the index is empty.
+        """
+        self._discard_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now, limit=None):
+        """
+        Remove and return the (name, expiry time) pairs that expired before ``now``, earliest first.
+
+        :param limit: optional maximum number of entries to remove.
+        """
+        due = []
+        while self._heap and (limit is None or len(due) < limit):
+            self._discard_stale()
+            if not self._heap or self._heap[0][0] >= now:
+                break
+            when, _, name = heappop(self._heap)
+            del self._expiries[name]
+            due.append((name, when))
+        return due
+
+    def _discard_stale(self):
+        """
+        Pop heap entries that no longer match the current expiry of their name.
+        """
+        heap = self._heap
+        while heap and self._expiries.get(heap[0][2]) != heap[0][0]:
+            heappop(heap)
+
+    def _compact(self):
+        """
+        Rebuild the heap from the live entries.
+        """
+        self._heap = [(when, next(self._counter), name) for name, when in self._expiries.items()]
+        heapify(self._heap)
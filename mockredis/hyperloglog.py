@@ -0,0 +1,371 @@
+"""
+Redis-compatible HyperLogLog: the same hash, registers and estimator as Redis, so counts
+match those of a real server, and the same string representation, so values can be read
+with GET and written back with SET.
+"""
+from math import sqrt
+import struct
+import sys
+
+if sys.version_info >= (3, 0):
+    xrange = range
+
+    def _ord(byte):
+        return byte
+else:
+    _ord = ord
+
+# number of bits of the hash used to pick a register, and the number of registers
+HLL_P = 14
+HLL_REGISTERS = 1 << HLL_P
+# number of bits of the hash used to count leading zeros
+HLL_Q = 64 - HLL_P
+# number of bits per register in the dense representation
+HLL_BITS = 6
+HLL_DENSE_SIZE = HLL_REGISTERS * HLL_BITS // 8
+# largest value a register can have in the sparse representation
+HLL_SPARSE_MAX_VALUE = 32
+
+HLL_MAGIC = b'HYLL'
+HLL_HEADER_SIZE = 16
+HLL_DENSE, HLL_SPARSE = 0, 1
+
+HLL_ALPHA_INF = 0.721347520444481703680
+HLL_SEED = 0xadc83b19
+
+MURMUR_M = 0xc6a4a7935bd1e995
+MURMUR_R = 47
+UINT64_MASK = (1 << 64) - 1
+
+
+class HyperLogLog(object):
+    """
+    Redis-style HyperLogLog implementation.
+
+    Starts sparse, holding a dictionary from register index to value for the few registers
+    that are set, and is promoted to dense, holding a bytearray with one byte per register,
+    when its sparse representation would grow too large. The estimated cardinality is cached
+    until a register changes.
+    """
+    __slots__ = ('_sparse', '_dense', '_cardinality')
+
+    def __init__(self):
+        # dictionary from register index to (non-zero) value, or None once dense
+        self._sparse = {}
+        # bytearray with one byte per register, or None while sparse
+        self._dense = None
+        # cached cardinality, or None if it needs to be estimated
+        self._cardinality = 0
+
+    @property
+    def is_sparse(self):
+        return self._dense is None
+
+    def copy(self):
+        """
+        Return a copy of the HyperLogLog.
+        """
+        other = HyperLogLog()
+        if self._dense is None:
+            other._sparse = dict(self._sparse)
+        else:
+            other._sparse, other._dense = None, bytearray(self._dense)
+        other._cardinality = self._cardinality
+        return other
+
+    def __eq__(self, other):
+        if not isinstance(other, HyperLogLog):
+            return NotImplemented
+        if self._dense is not None and other._dense is not None:
+            return self._dense == other._dense
+        return self._registers() == other._registers()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def add(self, element):
+        """
+        Add an element (as bytes), returning whether a register changed.
+        """
+        index, count = register_for(element)
+        return self._update(index, count)
+
+    def count(self):
+        """
+        Return the estimated cardinality.
+        """
+        if self._cardinality is None:
+            self._cardinality = estimate(self._histogram())
+        return self._cardinality
+
+    def compact(self, max_sparse_bytes):
+        """
+        Promote the HyperLogLog to dense if its sparse representation is larger than
+        ``max_sparse_bytes`` or cannot represent one of its registers.
+        """
+        if self._dense is not None:
+            return
+        # every register needs at most three bytes, so the exact size is rarely needed
+        if (len(self._sparse) * 3 + 2 > max_sparse_bytes and
+                len(self._dump_sparse()) > max_sparse_bytes) or \
+                any(value > HLL_SPARSE_MAX_VALUE for value in self._sparse.values()):
+            self._promote()
+
+    @classmethod
+    def merge(cls, hlls, max_sparse_bytes):
+        """
+        Return a HyperLogLog whose registers are the maximum of those of ``hlls``.
+
+        Dense registers are combined with a single ``map(max, ...)`` over all of the
+        bytearrays, rather than register by register.
+        """
+        result = cls()
+        dense = [hll._dense for hll in hlls if hll._dense is not None]
+        if len(dense) > 1:
+            result._dense = bytearray(map(max, *dense))
+        elif dense:
+            result._dense = bytearray(dense[0])
+        if result._dense is not None:
+            result._sparse = None
+        for hll in hlls:
+            if hll._dense is None:
+                for index, value in hll._sparse.items():
+                    result._update(index, value)
+        result._cardinality = None
+        result.compact(max_sparse_bytes)
+        return result
+
+    def dumps(self):
+        """
+        Return the Redis string representation.
+        """
+        # the top bit of the cached cardinality marks it as invalid
+        card = b'\x00' * 7 + b'\x80' if self._cardinality is None \
+            else struct.pack('<Q', self._cardinality)
+        if self._dense is None:
+            return HLL_MAGIC + struct.pack('<B3x', HLL_SPARSE) + card + self._dump_sparse()
+        # every four 6-bit registers pack into three bytes, least significant bits first
+        dense = self._dense
+        packed = bytearray(HLL_DENSE_SIZE)
+        for index in xrange(0, HLL_REGISTERS, 4):
+            value = (dense[index] | dense[index + 1] << 6 | dense[index + 2] << 12 |
+                     dense[index + 3] << 18)
+            offset = index // 4 * 3
+            packed[offset:offset + 3] = struct.pack('<I', value)[:3]
+        return HLL_MAGIC + struct.pack('<B3x', HLL_DENSE) + card + bytes(packed)
+
+    @classmethod
+    def loads(cls, data):
+        """
+        Parse the Redis string representation.
+
+        :raises: ValueError if ``data`` is not a valid HyperLogLog.
+        """
+        data = bytes(data)
+        if len(data) < HLL_HEADER_SIZE or data[:4] != HLL_MAGIC:
+            raise ValueError("not a HyperLogLog")
+        hll = cls()
+        encoding = _ord(data[4])
+        body = data[HLL_HEADER_SIZE:]
+        if encoding == HLL_DENSE:
+            if len(body) != HLL_DENSE_SIZE:
+                raise ValueError("corrupted HyperLogLog")
+            packed = bytearray(body)
+            dense = bytearray(HLL_REGISTERS)
+            for index in xrange(0, HLL_REGISTERS, 4):
+                offset = index // 4 * 3
+                value = packed[offset] | packed[offset + 1] << 8 | packed[offset + 2] << 16
+                dense[index:index + 4] = (value & 0x3f, value >> 6 & 0x3f, value >> 12 & 0x3f,
+                                          value >> 18)
+            hll._sparse, hll._dense = None, dense
+        elif encoding == HLL_SPARSE:
+            hll._sparse = _load_sparse(body)
+        else:
+            raise ValueError("corrupted HyperLogLog")
+        card = data[8:HLL_HEADER_SIZE]
+        hll._cardinality = None if _ord(card[7]) & 0x80 else struct.unpack('<Q', card)[0]
+        return hll
+
+    def _update(self, index, value):
+        """
+        Raise a register to ``value``, returning whether it changed.
+        """
+        registers = self._sparse if self._dense is None else self._dense
+        if value <= (registers.get(index, 0) if self._dense is None else registers[index]):
+            return False
+        registers[index] = value
+        self._cardinality = None
+        return True
+
+    def _promote(self):
+        """
+        Switch to the dense representation.
+        """
+        dense = bytearray(HLL_REGISTERS)
+        for index, value in self._sparse.items():
+            dense[index] = value
+        self._sparse, self._dense = None, dense
+
+    def _registers(self):
+        """
+        Return a dictionary from register index to value for the non-zero registers.
+        """
+        if self._dense is None:
+            return self._sparse
+        return dict((index, value) for index, value in enumerate(self._dense) if value)
+
+    def _histogram(self):
+        """
+        Return the number of registers with each value.
+        """
+        histogram = [0] * (HLL_Q + 2)
+        if self._dense is None:
+            for value in self._sparse.values():
+                histogram[value] += 1
+            histogram[0] = HLL_REGISTERS - len(self._sparse)
+        else:
+            for value in xrange(HLL_Q + 2):
+                histogram[value] = self._dense.count(struct.pack('B', value))
+        return histogram
+
+    def _dump_sparse(self):
+        """
+        Return the sparse representation of the registers, as Redis encodes it: runs of zero
+        registers (ZERO and XZERO) and runs of up to four registers with the same value (VAL).
+        """
+        encoded = bytearray()
+        index = 0
+        run = 0
+        previous = None
+        for register in sorted(self._sparse):
+            value = self._sparse[register]
+            if run and register == index and value == previous and run < 4:
+                # extend the previous VAL opcode
+                encoded[-1] += 1
+                run += 1
+            else:
+                _dump_zeros(encoded, register - index)
+                encoded.append(0x80 | (value - 1) << 2)
+                run = 1
+            previous = value
+            index = register + 1
+        _dump_zeros(encoded, HLL_REGISTERS - index)
+        return bytes(encoded)
+
+
+def register_for(element):
+    """
+    Return the register index of an element (as bytes) and the value it sets the register to.
+    """
+    hash_value = murmurhash64a(element, HLL_SEED)
+    index = hash_value & (HLL_REGISTERS - 1)
+    hash_value = hash_value >> HLL_P | 1 << HLL_Q
+    # the number of trailing zeros, plus one
+    return index, (hash_value & -hash_value).bit_length()
+
+
+def murmurhash64a(data, seed):
+    """
+    MurmurHash64A, as Redis uses it, for little-endian machines.
+    """
+    length = len(data)
+    h = (seed ^ (length * MURMUR_M)) & UINT64_MASK
+    blocks = length // 8
+    for k in struct.unpack_from('<{}Q'.format(blocks), data):
+        k = (k * MURMUR_M) & UINT64_MASK
+        k ^= k >> MURMUR_R
+        k = (k * MURMUR_M) & UINT64_MASK
+        h ^= k
+        h = (h * MURMUR_M) & UINT64_MASK
+    tail = bytearray(data[blocks * 8:])
+    if tail:
+        for position in xrange(len(tail) - 1, -1, -1):
+            h ^= tail[position] << (8 * position)
+        h = (h * MURMUR_M) & UINT64_MASK
+    h ^= h >> MURMUR_R
+    h = (h * MURMUR_M) & UINT64_MASK
+    h ^= h >> MURMUR_R
+    return h
+
+
+def estimate(histogram):
+    """
+    Estimate the cardinality from the register histogram, with the improved estimator of
+    Otmar Ertl that Redis uses.
+    """
+    m = float(HLL_REGISTERS)
+    z = m * _tau((m - histogram[HLL_Q + 1]) / m)
+    for value in xrange(HLL_Q, 0, -1):
+        z += histogram[value]
+        z *= 0.5
+    z += m * _sigma(histogram[0] / m)
+    return int(round(HLL_ALPHA_INF * m * m / z))
+
+
+def _sigma(x):
+    if x == 1.0:
+        return float('inf')
+    y = 1.0
+    z = x
+    while True:
+        x *= x
+        previous = z
+        z += x * y
+        y += y
+        if previous == z:
+            return z
+
+
+def _tau(x):
+    if x == 0.0 or x == 1.0:
+        return 0.0
+    y = 1.0
+    z = 1 - x
+    while True:
+        x = sqrt(x)
+        previous = z
+        y *= 0.5
+        z -= (1 - x) ** 2 * y
+        if previous == z:
+            return z / 3
+
+
+def _dump_zeros(encoded, count):
+    """
+    Append ZERO (up to 64 registers) or XZERO (up to 16384 registers) opcodes.
+    """
+    while count > 64:
+        run = min(count, 16384)
+        encoded.append(0x40 | (run - 1) >> 8)
+        encoded.append((run - 1) & 0xff)
+        count -= run
+    if count:
+        encoded.append(count - 1)
+
+
+def _load_sparse(body):
+    """
+    Parse the sparse representation into a dictionary from register index to value.
+    """
+    registers = {}
+    body = bytearray(body)
+    index = position = 0
+    while position < len(body):
+        opcode = body[position]
+        if opcode & 0x80:
+            value, run = ((opcode >> 2) & 0x1f) + 1, (opcode & 0x3) + 1
+            for register in xrange(index, index + run):
+                registers[register] = value
+            position += 1
+        elif opcode & 0x40:
+            if position + 1 >= len(body):
+                raise ValueError("corrupted HyperLogLog")
+            run = ((opcode & 0x3f) << 8 | body[position + 1]) + 1
+            position += 2
+        else:
+            run = (opcode & 0x3f) + 1
+            position += 1
+        index += run
+    if index != HLL_REGISTERS:
+        raise ValueError("corrupted HyperLogLog")
+    return registers
@@ -0,0 +1,147 @@
+from random import randrange, sample
+import sys
+
+if sys.version_info >= (3, 0):
+    xrange = range
+
+
+class IndexedSet(object):
+    """
+    Redis-style set implementation that supports O(1) random access.
+
+    Maintains two internal data structures:
+
+    1. A dense list of members.
+    2. A dictionary from member to its position in the list.
+
+    Removal swaps the member with the last member of the list before popping it, so adding,
+    removing, membership tests and picking a random member are all O(1).
+    """
+    def __init__(self, members=()):
+        """
+        Create a set, optionally populated with ``members``.
+        """
+        # dense list of members
+        self._members = []
+        # dictionary from member to position
+        self._positions = {}
+        self.update(members)
+
+    def clear(self):
+        """
+        Remove all members from the set.
+        """
+        self._members = []
+        self._positions = {}
+
+    def copy(self):
+        """
+        Return a shallow copy of the set.
+        """
+        other = IndexedSet()
+        other._members = list(self._members)
+        other._positions = dict(self._positions)
+        return other
+
+    def __len__(self):
+        return len(self._members)
+
+    def __contains__(self, member):
+        return member in self._positions
+
+    def __iter__(self):
+        return iter(self._members)
+
+    def __str__(self):
+        return self.__repr__()
+
+    def __repr__(self):
+        return "IndexedSet({})".format(self._members)
+
+    def __eq__(self, other):
+        if isinstance(other, IndexedSet):
+            other = other._positions
+        elif not isinstance(other, (set, frozenset)):
+            return NotImplemented
+        return len(self) == len(other) and all(member in other for member in self._members)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def add(self, member):
+        """
+        Add a member, returning whether it was not already present.
+        """
+        if member in self._positions:
+            return False
+        self._positions[member] = len(self._members)
+        self._members.append(member)
+        return True
+
+    def update(self, members):
+        """
+        Add several members.
+        """
+        for member in members:
+            self.add(member)
+
+    def discard(self, member):
+        """
+        Remove a member if present, returning whether it was present.
+        """
+        position = self._positions.pop(member, None)
+        if position is None:
+            return False
+        last = self._members.pop()
+        if position < len(self._members):
+            # move the last member into the vacated position
+            self._members[position] = last
+            self._positions[last] = position
+        return True
+
+    def remove(self, member):
+        """
+        Remove a member.
+
+        :raises: KeyError if the member is not present.
+        """
+        if not self.discard(member):
+            raise KeyError(member)
+
+    def random_member(self):
+        """
+        Return a random member.
+
+        :raises: IndexError if the set is empty.
+        """
+        if not self._members:
+            raise IndexError("random member of an empty set")
+        return self._members[randrange(len(self._members))]
+
+    def pop_random(self):
+        """
+        Remove and return a random member.
+
+        :raises: IndexError if the set is empty.
+        """
+        member = self.random_member()
+        self.discard(member)
+        return member
+
+    def sample(self, count):
+        """
+        Return up to ``count`` distinct random members, without copying the set.
+        """
+        count = min(count, len(self._members))
+        return [self._members[position] for position in sample(xrange(len(self._members)), count)]
+
+    def choices(self, count):
+        """
+        Return ``count`` random members, possibly repeated.
+        """
+        if not self._members:
+            return []
+        return [self._members[randrange(len(self._members))] for _ in xrange(count)]
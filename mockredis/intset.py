@@ -0,0 +1,222 @@
+from array import array
+from bisect import bisect_left
+from heapq import merge
+from random import randrange, sample
+import sys
+
+if sys.version_info >= (3, 0):
+    xrange = range
+
+# 'q' (long long) is only available from Python 3.3
+try:
+    TYPECODE = 'q'
+    array(TYPECODE)
+except ValueError:
+    TYPECODE = 'l'
+
+INTSET_MAX = 2 ** (8 * array(TYPECODE).itemsize - 1) - 1
+INTSET_MIN = -INTSET_MAX - 1
+
+
+def as_integer(member):
+    """
+    Return ``member`` as an integer if it is the canonical string form of an integer that an
+    intset can hold, or None otherwise.
+    """
+    try:
+        value = int(member)
+    except (TypeError, ValueError):
+        return None
+    if str(value) != member or not INTSET_MIN <= value <= INTSET_MAX:
+        return None
+    return value
+
+
+class IntSet(object):
+    """
+    Redis-style set implementation for sets of integers.
+
+    Stores members as a sorted array of machine integers, as Redis does with its intset
+    encoding, which takes a fraction of the memory of a hash set of strings:
+
+    1. Membership tests are binary searches, so they are O(log N).
+    2. Adding or removing a member shifts the members after it, so it is O(N); sets are
+       expected to switch to a hash set encoding before this matters.
+    3. Unions of intsets merge the sorted arrays.
+
+    Members are accepted and returned as strings, like the members of other sets.
+    """
+    def __init__(self, members=()):
+        """
+        Create a set, optionally populated with ``members``.
+
+        :raises: ValueError if any member is not an integer.
+        """
+        self._values = array(TYPECODE)
+        self.update(members)
+
+    @classmethod
+    def merge(cls, intsets):
+        """
+        Return the union of several intsets, merging their sorted arrays.
+        """
+        result = cls()
+        result._values = _merge_unique(intset._values for intset in intsets)
+        return result
+
+    def clear(self):
+        """
+        Remove all members from the set.
+        """
+        self._values = array(TYPECODE)
+
+    def copy(self):
+        """
+        Return a shallow copy of the set.
+        """
+        other = IntSet()
+        other._values = array(TYPECODE, self._values)
+        return other
+
+    def __len__(self):
+        return len(self._values)
+
+    def __contains__(self, member):
+        return self._find(as_integer(member)) is not None
+
+    def __iter__(self):
+        for value in self._values:
+            yield str(value)
+
+    def __str__(self):
+        return self.__repr__()
+
+    def __repr__(self):
+        return "IntSet({})".format(list(self._values))
+
+    def __eq__(self, other):
+        if isinstance(other, IntSet):
+            return self._values == other._values
+        if not hasattr(other, '__contains__') or not hasattr(other, '__len__'):
+            return NotImplemented
+        return len(self) == len(other) and all(member in other for member in self)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def add(self, member):
+        """
+        Add a member, returning whether it was not already present.
+
+        :raises: ValueError if the member is not an integer.
+        """
+        value = self._parse(member)
+        values = self._values
+        position = bisect_left(values, value)
+        if position < len(values) and values[position] == value:
+            return False
+        values.insert(position, value)
+        return True
+
+    def update(self, members):
+        """
+        Add several members, merging them into the array in one pass.
+
+        :raises: ValueError if any member is not an integer (in which case none are added).
+        """
+        new = sorted(set(self._parse(member) for member in members))
+        if new:
+            self._values = _merge_unique([self._values, new])
+
+    def discard(self, member):
+        """
+        Remove a member if present, returning whether it was present.
+        """
+        position = self._find(as_integer(member))
+        if position is None:
+            return False
+        del self._values[position]
+        return True
+
+    def remove(self, member):
+        """
+        Remove a member.
+
+        :raises: KeyError if the member is not present.
+        """
+        if not self.discard(member):
+            raise KeyError(member)
+
+    def random_member(self):
+        """
+        Return a random member.
+
+        :raises: IndexError if the set is empty.
+        """
+        if not self._values:
+            raise IndexError("random member of an empty set")
+        return str(self._values[randrange(len(self._values))])
+
+    def pop_random(self):
+        """
+        Remove and return a random member.
+
+        :raises: IndexError if the set is empty.
+        """
+        if not self._values:
+            raise IndexError("random member of an empty set")
+        return str(self._values.pop(randrange(len(self._values))))
+
+    def sample(self, count):
+        """
+        Return up to ``count`` distinct random members, without copying the set.
+        """
+        values = self._values
+        count = min(count, len(values))
+        return [str(values[position]) for position in sample(xrange(len(values)), count)]
+
+    def choices(self, count):
+        """
+        Return ``count`` random members, possibly repeated.
+        """
+        values = self._values
+        if not values:
+            return []
+        return [str(values[randrange(len(values))]) for _ in xrange(count)]
+
+    def _find(self, value):
+        """
+        Return the position of integer ``value`` (which may be None), or None if not present.
+        """
+        if value is None:
+            return None
+        values = self._values
+        position = bisect_left(values, value)
+        if position < len(values) and values[position] == value:
+            return position
+        return None
+
+    def _parse(self, member):
+        """
+        Convert a member to an integer.
+
+        :raises: ValueError if the member is not an integer.
+        """
+        value = as_integer(member)
+        if value is None:
+            raise ValueError("{!r} cannot be stored in an intset".format(member))
+        return value
+
+
+def _merge_unique(sequences):
+    """
+    Merge sorted sequences of integers into a new array, dropping duplicates.
+    """
+    result = array(TYPECODE)
+    for value in merge(*sequences):
+        if not result or value != result[-1]:
+            result.append(value)
+    return result
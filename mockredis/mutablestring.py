@@ -0,0 +1,84 @@
+import re
+import sys
+
+if sys.version_info >= (3, 0):
+    unicode = str
+
+# largest string Redis accepts (proto-max-bulk-len)
+MAX_STRING_LENGTH = 512 * 1024 * 1024
+
+_NON_ASCII = re.compile(u'[^\x00-\x7f]')
+
+
+if hasattr(unicode, 'isascii'):
+    def is_ascii(value):
+        """
+        Return whether text has only ASCII characters, which CPython records when creating it.
+        """
+        return value.isascii()
+else:
+    def is_ascii(value):
+        return _NON_ASCII.search(value) is None
+
+
+def is_ascii_compatible(encoding):
+    """
+    Return whether ``encoding`` encodes each ASCII character as that single byte.
+    """
+    return u'\x00\x7f'.encode(encoding) == b'\x00\x7f'
+
+
+def to_bytes(value, encoding):
+    """
+    Convert a stored (or to be stored) string value to bytes, returning the bytes and whether
+    the value was text.
+    """
+    if isinstance(value, unicode):
+        return value.encode(encoding), True
+    if isinstance(value, (bytes, bytearray)):
+        return value, getattr(value, 'is_text', False)
+    return str(value).encode(encoding), True
+
+
+class MutableString(bytearray):
+    """
+    Redis-style string implementation for strings modified in place.
+
+    APPEND and SETRANGE convert a string to a bytearray, which grows in place, so appending is
+    amortized O(1) instead of copying the whole value. ``is_text`` records whether the value
+    was text, so it is read back in the same way as an unmodified string.
+    """
+    __slots__ = ('is_text',)
+
+    def __init__(self, value=b'', is_text=False):
+        super(MutableString, self).__init__(value)
+        self.is_text = is_text
+
+    @classmethod
+    def from_value(cls, value, encoding):
+        """
+        Create a mutable copy of a stored string value.
+        """
+        data, is_text = to_bytes(value, encoding)
+        return cls(data, is_text)
+
+    def write(self, offset, value, encoding):
+        """
+        Overwrite the bytes from ``offset`` with ``value``, padding with zero bytes first if
+        the string is shorter than ``offset``.
+        """
+        data, is_text = to_bytes(value, encoding)
+        self.is_text = self.is_text and is_text
+        if offset >= len(self):
+            self.extend(b'\x00' * (offset - len(self)))
+            self.extend(data)
+        else:
+            self[offset:offset + len(data)] = data
+
+    def to_value(self, encoding):
+        """
+        Return an immutable copy of the value, as text if it was text.
+        """
+        if self.is_text and str is unicode:
+            return self.decode(encoding, 'replace')
+        return bytes(self)
@@ -0,0 +1,75 @@
+"""
+Keyspace notification classes, as configured by ``notify-keyspace-events``.
+"""
+
+NOTIFY_KEYSPACE = 1 << 0
+NOTIFY_KEYEVENT = 1 << 1
+NOTIFY_GENERIC = 1 << 2
+NOTIFY_STRING = 1 << 3
+NOTIFY_LIST = 1 << 4
+NOTIFY_SET = 1 << 5
+NOTIFY_HASH = 1 << 6
+NOTIFY_ZSET = 1 << 7
+NOTIFY_EXPIRED = 1 << 8
+NOTIFY_EVICTED = 1 << 9
+NOTIFY_STREAM = 1 << 10
+NOTIFY_KEY_MISS = 1 << 11
+NOTIFY_MODULE = 1 << 12
+NOTIFY_NEW = 1 << 13
+
+# the classes selected by the "A" alias
+NOTIFY_ALL = (NOTIFY_GENERIC | NOTIFY_STRING | NOTIFY_LIST | NOTIFY_SET | NOTIFY_HASH |
+              NOTIFY_ZSET | NOTIFY_EXPIRED | NOTIFY_EVICTED | NOTIFY_STREAM | NOTIFY_MODULE)
+
+# the flags that select which channels are published to
+NOTIFY_CHANNELS = NOTIFY_KEYSPACE | NOTIFY_KEYEVENT
+
+# class characters in the order redis reports them
+_CLASS_CHARS = [
+    ("g", NOTIFY_GENERIC),
+    ("$", NOTIFY_STRING),
+    ("l", NOTIFY_LIST),
+    ("s", NOTIFY_SET),
+    ("h", NOTIFY_HASH),
+    ("z", NOTIFY_ZSET),
+    ("x", NOTIFY_EXPIRED),
+    ("e", NOTIFY_EVICTED),
+    ("t", NOTIFY_STREAM),
+    ("d", NOTIFY_MODULE),
+]
+
+_FLAG_CHARS = [
+    ("K", NOTIFY_KEYSPACE),
+    ("E", NOTIFY_KEYEVENT),
+    ("m", NOTIFY_KEY_MISS),
+    ("n", NOTIFY_NEW),
+]
+
+_FLAGS = dict(_CLASS_CHARS + _FLAG_CHARS + [("A", NOTIFY_ALL)])
+
+
+def parse_flags(value):
+    """
+    Convert a ``notify-keyspace-events`` string into a bitmask.
+
+    :raises: ValueError for unknown characters.
+    """
+    flags = 0
+    for char in value:
+        try:
+            flags |= _FLAGS[char]
+        except KeyError:
+            raise ValueError("Invalid event class character. Use 'Ag$lshzxeKEtmdn'.")
+    return flags
+
+
+def flags_to_string(flags):
+    """
+    Convert a bitmask back into its canonical ``notify-keyspace-events`` string.
+    """
+    if flags & NOTIFY_ALL == NOTIFY_ALL:
+        chars = ["A"]
+    else:
+        chars = [char for char, flag in _CLASS_CHARS if flags & flag]
+    chars.extend(char for char, flag in _FLAG_CHARS if flags & flag)
+    return "".join(chars)
@@ -1,4 +1,5 @@
 from copy import deepcopy
+from itertools import groupby
 
 from mockredis.exceptions import RedisError, WatchError
 
@@ -26,7 +27,7 @@ class MockRedisPipeline(object):
                 # execute the command immediately
                 return command(*args, **kwargs)
             else:
-                self.commands.append(lambda: command(*args, **kwargs))
+                self.commands.append((name, command, args, kwargs))
                 return self
         return wrapper
 
@@ -60,10 +61,28 @@ class MockRedisPipeline(object):
             for key, value in self._watched_keys.items():
                 if self.mock_redis.redis.get(key) != value:
                     raise WatchError("Watched variable changed.")
-            return [command() for command in self.commands]
+            results = []
+            for key, batch in groupby(self.commands, self._membership_key):
+                if key is None:
+                    results.extend(command(*args, **kwargs) for _, command, args, kwargs in batch)
+                else:
+                    # consecutive SISMEMBER calls on one set become a single SMISMEMBER
+                    values = [args[1] for _, _, args, _ in batch]
+                    results.extend(self.mock_redis.smismember(key, values))
+            return results
         finally:
             self._reset()
 
+    def _membership_key(self, queued):
+        """
+        Return the set a queued command tests membership of, or None if it is not a
+        SISMEMBER call.
+        """
+        name, _, args, kwargs = queued
+        if name == 'sismember' and len(args) == 2 and not kwargs:
+            return args[0]
+        return None
+
     def _reset(self):
         """
         Reset instance variables.
@@ -0,0 +1,359 @@
+from collections import deque
+from itertools import islice
+import sys
+
+if sys.version_info >= (3, 0):
+    xrange = range
+
+
+class QuickList(object):
+    """
+    Redis-style list implementation.
+
+    Stores values in a deque of bounded-size chunks (Python lists), as Redis does with a
+    doubly linked list of listpacks:
+
+    1. Pushes and pops at either end only touch the first or last chunk, so they are O(1).
+    2. Positional access walks chunks (not values) from the nearer end, so it is O(N / chunk_size).
+    3. Insertion in the middle only shifts values within one chunk, splitting it when it is full.
+    """
+    def __init__(self, values=(), chunk_size=128):
+        """
+        Create a list, optionally populated with ``values``.
+        """
+        if chunk_size < 2:
+            raise ValueError("chunk_size must be at least 2")
+        self.chunk_size = chunk_size
+        # deque of non-empty lists of at most chunk_size values
+        self._chunks = deque()
+        self._len = 0
+        self.extend(values)
+
+    def clear(self):
+        """
+        Remove all values from the list.
+        """
+        self._chunks.clear()
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            for value in chunk:
+                yield value
+
+    def __reversed__(self):
+        for chunk in reversed(self._chunks):
+            for value in reversed(chunk):
+                yield value
+
+    def __str__(self):
+        return self.__repr__()
+
+    def __repr__(self):
+        return "QuickList({})".format(list(self))
+
+    def __eq__(self, other):
+        if not isinstance(other, (QuickList, list)):
+            return NotImplemented
+        return len(self) == len(other) and all(left == right for left, right in zip(self, other))
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def __getitem__(self, index):
+        """
+        Get the value at ``index``, or a list of values for a slice.
+        """
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._len)
+            if step != 1:
+                return list(self)[index]
+            return self._slice(start, stop)
+        chunk_index, offset = self._locate(index)
+        return self._chunks[chunk_index][offset]
+
+    def __setitem__(self, index, value):
+        """
+        Replace the value at ``index``.
+        """
+        chunk_index, offset = self._locate(index)
+        self._chunks[chunk_index][offset] = value
+
+    def __delitem__(self, index):
+        """
+        Remove the value at ``index``.
+        """
+        chunk_index, offset = self._locate(index)
+        self._delete(chunk_index, offset)
+
+    def append(self, value):
+        """
+        Add a value to the tail of the list.
+        """
+        chunks = self._chunks
+        if not chunks or len(chunks[-1]) >= self.chunk_size:
+            chunks.append([value])
+        else:
+            chunks[-1].append(value)
+        self._len += 1
+
+    def appendleft(self, value):
+        """
+        Add a value to the head of the list.
+        """
+        chunks = self._chunks
+        if not chunks or len(chunks[0]) >= self.chunk_size:
+            chunks.appendleft([value])
+        else:
+            chunks[0].insert(0, value)
+        self._len += 1
+
+    def extend(self, values):
+        """
+        Add values to the tail of the list, in order.
+        """
+        for value in values:
+            self.append(value)
+
+    def extendleft(self, values):
+        """
+        Add values to the head of the list, one at a time (so they end up in reverse order).
+        """
+        for value in values:
+            self.appendleft(value)
+
+    def pop(self):
+        """
+        Remove and return the value at the tail of the list.
+
+        :raises: IndexError if the list is empty.
+        """
+        if not self._len:
+            raise IndexError("pop from an empty list")
+        chunks = self._chunks
+        value = chunks[-1].pop()
+        if not chunks[-1]:
+            chunks.pop()
+        self._len -= 1
+        return value
+
+    def popleft(self):
+        """
+        Remove and return the value at the head of the list.
+
+        :raises: IndexError if the list is empty.
+        """
+        if not self._len:
+            raise IndexError("pop from an empty list")
+        chunks = self._chunks
+        value = chunks[0].pop(0)
+        if not chunks[0]:
+            chunks.popleft()
+        self._len -= 1
+        return value
+
+    def insert(self, index, value):
+        """
+        Insert a value before ``index``, splitting the containing chunk if it is full.
+        """
+        if index < 0:
+            index = max(0, index + self._len)
+        if index == 0:
+            return self.appendleft(value)
+        if index >= self._len:
+            return self.append(value)
+        chunk_index, offset = self._locate_chunk(index)
+        chunk = self._chunks[chunk_index]
+        chunk.insert(offset, value)
+        if len(chunk) > self.chunk_size:
+            half = len(chunk) // 2
+            self._insert_chunk(chunk_index + 1, chunk[half:])
+            del chunk[half:]
+        self._len += 1
+
+    def count(self, value):
+        """
+        Return the number of occurrences of ``value``.
+        """
+        return sum(chunk.count(value) for chunk in self._chunks)
+
+    def remove(self, value):
+        """
+        Remove the first occurrence of ``value``.
+
+        :raises: ValueError if the value is not present.
+        """
+        for chunk_index, chunk in enumerate(self._chunks):
+            if value in chunk:
+                self._delete(chunk_index, chunk.index(value))
+                return
+        raise ValueError("value not in list")
+
+    def find(self, value, reverse=False, maxlen=0):
+        """
+        Yield the indices of ``value``, from the head (or from the tail if ``reverse``),
+        examining at most ``maxlen`` values (or all of them if zero).
+        """
+        remaining = maxlen or self._len
+        if not reverse:
+            base = 0
+            for chunk in self._chunks:
+                end = min(len(chunk), remaining)
+                offset = 0
+                while True:
+                    try:
+                        offset = chunk.index(value, offset, end)
+                    except ValueError:
+                        break
+                    yield base + offset
+                    offset += 1
+                base += len(chunk)
+                remaining -= end
+                if not remaining:
+                    return
+        else:
+            base = self._len
+            for chunk in reversed(self._chunks):
+                base -= len(chunk)
+                end = max(0, len(chunk) - remaining)
+                for offset in xrange(len(chunk) - 1, end - 1, -1):
+                    if chunk[offset] == value:
+                        yield base + offset
+                remaining -= len(chunk) - end
+                if not remaining:
+                    return
+
+    def remove_value(self, value, count=0):
+        """
+        Remove occurrences of ``value`` in a single pass, as LREM does: the first ``count``
+        occurrences if count is positive, the last ``-count`` if negative and all if zero.
+
+        Returns the number of values removed.
+        """
+        limit = abs(count) or self._len
+        removed = 0
+        for chunk in (reversed(self._chunks) if count < 0 else self._chunks):
+            if removed >= limit:
+                break
+            if value not in chunk:
+                continue
+            kept = []
+            for item in (reversed(chunk) if count < 0 else chunk):
+                if removed < limit and item == value:
+                    removed += 1
+                else:
+                    kept.append(item)
+            if count < 0:
+                kept.reverse()
+            chunk[:] = kept
+        if removed:
+            self._chunks = deque(chunk for chunk in self._chunks if chunk)
+            self._len -= removed
+        return removed
+
+    def trim(self, start, stop):
+        """
+        Keep only the values from ``start`` to ``stop`` (inclusive, non-negative), as LTRIM does.
+
+        Whole chunks are dropped from either end, so the cost is proportional to the number
+        of values trimmed rather than the length of the list.
+        """
+        if start > stop or start >= self._len:
+            return self.clear()
+        stop = min(stop, self._len - 1)
+        chunks = self._chunks
+        drop = start
+        while drop:
+            if len(chunks[0]) <= drop:
+                drop -= len(chunks.popleft())
+            else:
+                del chunks[0][:drop]
+                drop = 0
+        drop = self._len - stop - 1
+        while drop:
+            if len(chunks[-1]) <= drop:
+                drop -= len(chunks.pop())
+            else:
+                del chunks[-1][-drop:]
+                drop = 0
+        self._len = stop - start + 1
+
+    def _delete(self, chunk_index, offset):
+        """
+        Remove the value at ``offset`` within a chunk, dropping the chunk if it becomes empty.
+        """
+        chunks = self._chunks
+        chunk = chunks[chunk_index]
+        del chunk[offset]
+        self._len -= 1
+        if not chunk:
+            chunks.rotate(-chunk_index)
+            chunks.popleft()
+            chunks.rotate(chunk_index)
+
+    def _insert_chunk(self, chunk_index, chunk):
+        """
+        Insert a chunk at position ``chunk_index`` (deque.insert is not available before 3.5).
+        """
+        chunks = self._chunks
+        chunks.rotate(-chunk_index)
+        chunks.appendleft(chunk)
+        chunks.rotate(chunk_index)
+
+    def _locate(self, index):
+        """
+        Return the position of the chunk holding ``index`` (which may be negative) and the
+        offset within it.
+
+        :raises: IndexError if the index is out of range.
+        """
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("list index out of range")
+        return self._locate_chunk(index)
+
+    def _locate_chunk(self, index):
+        """
+        Return the position of the chunk holding the in-range, non-negative ``index`` and the
+        offset within it, walking from whichever end of the list is nearer.
+        """
+        chunks = self._chunks
+        if index < self._len // 2:
+            for chunk_index, chunk in enumerate(chunks):
+                if index < len(chunk):
+                    return chunk_index, index
+                index -= len(chunk)
+        else:
+            index = self._len - index
+            chunk_index = len(chunks)
+            for chunk in reversed(chunks):
+                chunk_index -= 1
+                if index <= len(chunk):
+                    return chunk_index, len(chunk) - index
+                index -= len(chunk)
+        raise IndexError("list index out of range")
+
+    def _slice(self, start, stop):
+        """
+        Return the values from ``start`` up to (but excluding) ``stop`` as a list.
+        """
+        if start >= stop:
+            return []
+        chunk_index, offset = self._locate_chunk(start)
+        result = []
+        remaining = stop - start
+        for chunk in islice(self._chunks, chunk_index, None):
+            values = chunk[offset:offset + remaining]
+            result.extend(values)
+            remaining -= len(values)
+            if not remaining:
+                break
+            offset = 0
+        return result
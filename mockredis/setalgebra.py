@@ -0,0 +1,56 @@
+"""
+Multi-way set operations, as used by SINTER, SUNION, SDIFF and their variants.
+
+Each operation takes all of its input sets at once, instead of folding them pairwise, so no
+intermediate sets are built.
+"""
+from mockredis.intset import IntSet
+
+
+def intersection(sets, limit=0):
+    """
+    Yield the members common to all ``sets``, stopping after ``limit`` members if non-zero.
+
+    Iterates over the smallest set and tests membership in the others from smallest to
+    largest, so the work is bounded by the smallest set and most members are rejected early.
+    """
+    sets = sorted(sets, key=len)
+    if not sets or not sets[0]:
+        return
+    smallest, others = sets[0], sets[1:]
+    found = 0
+    for member in smallest:
+        if all(member in other for other in others):
+            yield member
+            found += 1
+            if found == limit:
+                return
+
+
+def union(sets):
+    """
+    Return the members of all ``sets``, collected in a single pass: as a new IntSet merged
+    from their sorted arrays if they are all intsets, or else as a new Python set.
+    """
+    if sets and all(isinstance(members, IntSet) for members in sets):
+        return IntSet.merge(sets)
+    result = set()
+    for members in sets:
+        result.update(members)
+    return result
+
+
+def difference(sets):
+    """
+    Yield the members of the first of ``sets`` that are in none of the others.
+    """
+    if not sets or not sets[0]:
+        return
+    first = sets[0]
+    # empty sets cannot remove anything and the first set removes everything
+    others = sorted((other for other in sets[1:] if other), key=len, reverse=True)
+    if any(other is first for other in others):
+        return
+    for member in first:
+        if not any(member in other for other in others):
+            yield member
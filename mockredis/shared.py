@@ -0,0 +1,31 @@
+"""
+Shared value objects.
+
+Redis shares the objects for the integers 0 to 9999 between all keys. MockRedis does the
+same for int-encoded values, and shares short strings by interning them, so that values
+repeated across many keys (such as ``0`` and ``1`` flags) are stored once.
+"""
+import sys
+
+if sys.version_info >= (3, 0):
+    long = int
+    from sys import intern
+
+# int-encoded values below this are shared
+SHARED_INTEGERS = 10000
+# strings up to this length are shared
+SHARED_STRING_LENGTH = 8
+
+_integers = tuple(range(SHARED_INTEGERS))
+
+
+def shared(value):
+    """
+    Return the shared object equal to ``value`` (a stored value) if there is one, or else
+    ``value`` itself.
+    """
+    if isinstance(value, str):
+        return intern(value) if len(value) <= SHARED_STRING_LENGTH else value
+    if type(value) in (int, long) and 0 <= value < SHARED_INTEGERS:
+        return _integers[value]
+    return value
@@ -10,10 +10,11 @@ class SortedSet(object):
     1. A multimap from score to member
     2. A dictionary from member to score.
 
-    The multimap is implemented using a sorted list of (score, member) pairs. The bisect operations
-    used to maintain the multimap are O(log N), but insertion into and removal from a list are O(N),
-    so insertion and removal O(N). It should be possible to swap in an indexable skip list to get
-    the expected O(log N) behavior.
+    The multimap is implemented using a sorted list of (score, member) pairs. Members with equal
+    scores are ordered by their bytes, as in Redis; text is compared by its UTF-8 encoding, so text
+    and bytes members can share a score. The binary searches used to maintain the multimap are
+    O(log N), but insertion into and removal from a list are O(N), so insertion and removal O(N).
+    It should be possible to swap in an indexable skip list to get the expected O(log N) behavior.
     """
     def __init__(self):
         """
@@ -34,7 +35,7 @@ class SortedSet(object):
         return len(self._members)
 
     def __contains__(self, member):
-        return str(member) in self._members
+        return member in self._members
 
     def __str__(self):
         return self.__repr__()
@@ -81,7 +82,7 @@ class SortedSet(object):
         inserted (True) or updated (False)
         """
         found = self.remove(member)
-        index = bisect_left(self._scores, (score, member))
+        index = self._index(score, member)
         self._scores.insert(index, (score, member))
         self._members[member] = score
         return not found
@@ -90,11 +91,10 @@ class SortedSet(object):
         """
         Identical to __delitem__, but returns whether a member was removed.
         """
-        member = str(member)
         if member not in self:
             return False
         score = self._members[member]
-        score_index = bisect_left(self._scores, (score, member))
+        score_index = self._index(score, member)
         del self._scores[score_index]
         del self._members[member]
         return True
@@ -104,17 +104,16 @@ class SortedSet(object):
         Identical to __getitem__, but returns None instead of raising
         KeyError if member is not found.
         """
-        return self._members.get(str(member))
+        return self._members.get(member)
 
     def rank(self, member):
         """
         Get the rank (index of a member).
         """
-        member = str(member)
         score = self._members.get(member)
         if score is None:
             return None
-        return bisect_left(self._scores, (score, member))
+        return self._index(score, member)
 
     def range(self, start, end, desc=False):
         """
@@ -148,8 +147,32 @@ class SortedSet(object):
                 left += 1
         return self._scores[left:right]
 
+    def _index(self, score, member):
+        """
+        Find the position of (score, member) in the sorted list of pairs.
+        """
+        key = (score, _order(member))
+        scores = self._scores
+        low, high = 0, len(scores)
+        while low < high:
+            middle = (low + high) // 2
+            if (scores[middle][0], _order(scores[middle][1])) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
     def min_score(self):
         return self._scores[0][0]
 
     def max_score(self):
         return self._scores[-1][0]
+
+
+def _order(member):
+    """
+    Return the bytes by which members with equal scores are ordered.
+    """
+    if isinstance(member, bytes):
+        return member
+    return member.encode('utf-8')
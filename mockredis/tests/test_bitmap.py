@@ -0,0 +1,131 @@
+from nose.tools import eq_, ok_
+
+from mockredis.bitops import CHUNK_SIZE, bitcount, bitop, bitpos
+from mockredis.tests.fixtures import raises_response_error, setup
+
+
+class TestBitops(object):
+    """
+    Tests the bitmap helpers, not the redis commands.
+    """
+
+    def test_bitcount_across_chunks(self):
+        data = bytearray(b'\x0f' * (CHUNK_SIZE + 3))
+        eq_(4 * len(data), bitcount(data))
+        eq_(3, bitcount(data, 5, 12))
+        eq_(4, bitcount(data, CHUNK_SIZE * 8, CHUNK_SIZE * 8 + 8))
+
+    def test_bitpos_across_chunks(self):
+        data = bytearray(CHUNK_SIZE * 2)
+        data[-1] = 1
+        eq_(len(data) * 8 - 1, bitpos(data, 1))
+        eq_(-1, bitpos(data, 1, 0, len(data) * 8 - 1))
+        eq_(3, bitpos(data, 0, 3))
+
+    def test_bitop_pads_shorter_values(self):
+        eq_(b'\x0f\x00', bitop('AND', [b'\xff\xff', b'\x0f']))
+        eq_(b'\xff\xff', bitop('OR', [b'\xff\xff', b'\x0f']))
+        eq_(b'\xf0\xff', bitop('XOR', [b'\xff\xff', b'\x0f']))
+        eq_(b'\xf0', bitop('NOT', [b'\x0f']))
+
+
+class TestRedisBitmap(object):
+    """bitmap tests"""
+
+    def setup(self):
+        setup(self)
+
+    def test_setbit_getbit(self):
+        eq_(0, self.redis.setbit('key', 7, 1))
+        eq_(1, self.redis.getbit('key', 7))
+        eq_(0, self.redis.getbit('key', 0))
+        eq_(0, self.redis.getbit('key', 100))
+        eq_(0, self.redis.getbit('missing', 0))
+        eq_(1, self.redis.setbit('key', 7, 0))
+        eq_(0, self.redis.setbit('key', 100, 1))
+        eq_(13, self.redis.strlen('key'))
+
+    @raises_response_error
+    def test_setbit_invalid_value(self):
+        self.redis.setbit('key', 0, 2)
+
+    @raises_response_error
+    def test_setbit_negative_offset(self):
+        self.redis.setbit('key', -1, 1)
+
+    def test_bitcount(self):
+        eq_(0, self.redis.bitcount('missing'))
+        self.redis.set('key', 'foobar')
+        eq_(26, self.redis.bitcount('key'))
+        eq_(4, self.redis.bitcount('key', 0, 0))
+        eq_(6, self.redis.bitcount('key', 1, 1))
+        eq_(7, self.redis.bitcount('key', -2, -1))
+        eq_(0, self.redis.bitcount('key', 3, 1))
+        eq_(17, self.redis.bitcount('key', 5, 30, 'BIT'))
+
+    def test_bitpos(self):
+        self.redis.set('key', b'\xff\xf0\x00')
+        eq_(12, self.redis.bitpos('key', 0))
+        eq_(0, self.redis.bitpos('key', 1))
+        eq_(-1, self.redis.bitpos('key', 1, 2))
+        eq_(12, self.redis.bitpos('key', 0, 2, -1, 'BIT'))
+
+        self.redis.set('key', b'\x00\xff\xf0')
+        eq_(8, self.redis.bitpos('key', 1, 7, 15, 'BIT'))
+
+        # looking for a clear bit past the end of an all-set string
+        self.redis.set('key', b'\xff\xff')
+        eq_(16, self.redis.bitpos('key', 0))
+        eq_(-1, self.redis.bitpos('key', 0, 0, -1))
+
+        eq_(0, self.redis.bitpos('missing', 0))
+        eq_(-1, self.redis.bitpos('missing', 1))
+
+    def test_bitop(self):
+        self.redis.set('key1', 'foobar')
+        self.redis.set('key2', 'abcdef')
+        eq_(6, self.redis.bitop('AND', 'dest', 'key1', 'key2'))
+        eq_(b'`bc`ab', self.redis.get('dest'))
+        eq_(6, self.redis.bitop('OR', 'dest', 'key1', 'missing'))
+        eq_(26, self.redis.bitcount('dest'))
+
+        self.redis.set('dest', 'value')
+        eq_(0, self.redis.bitop('XOR', 'dest', 'missing'))
+        ok_('dest' not in self.redis.keys())
+
+    @raises_response_error
+    def test_bitop_not_single_key(self):
+        self.redis.bitop('NOT', 'dest', 'key1', 'key2')
+
+    def test_bitfield(self):
+        eq_([1, 0], self.redis.bitfield('key').incrby('i5', 100, 1).get('u4', 0).execute())
+        eq_([0, 44, 0, 15, -1],
+            self.redis.bitfield('key2')
+                .set('u8', '#1', 300).get('u8', 8)
+                .set('i8', 0, -1).get('u4', 0).get('i8', 0)
+                .execute())
+
+    def test_bitfield_overflow(self):
+        bitfield = self.redis.bitfield('key')
+        for _ in range(4):
+            bitfield.incrby('u2', 100, 1, overflow='SAT')
+        eq_([1, 2, 3, 3], bitfield.execute())
+        eq_([None, 3], self.redis.bitfield('key').overflow('FAIL').incrby('u2', 100, 1)
+            .get('u2', 100).execute())
+        eq_([1, -56], self.redis.bitfield('key').incrby('u2', 0, 5).incrby('i8', 8, 200).execute())
+        eq_([-128], self.redis.bitfield('key', default_overflow='SAT')
+            .incrby('i8', 8, -1000).execute())
+
+    def test_bitfield_large_fields(self):
+        eq_([0, -5, 2 ** 63 - 5],
+            self.redis.bitfield('key').set('i64', 0, -5).get('i64', 0).get('u63', 1).execute())
+
+    def test_bitfield_ro(self):
+        self.redis.bitfield('key').set('u8', 0, 255).set('u8', 8, 44).execute()
+        eq_([255, 44], self.redis.bitfield_ro('key', 'u8', 0, items=[('u8', 8)]))
+        eq_([0], self.redis.bitfield_ro('missing', 'i64', 0))
+        ok_('missing' not in self.redis.keys())
+
+    @raises_response_error
+    def test_bitfield_invalid_type(self):
+        self.redis.bitfield('key').get('u64', 0).execute()
@@ -0,0 +1,224 @@
+"""
+Tests for virtual time don't support verification against redis-server.
+"""
+from datetime import datetime, timedelta
+from weakref import ref
+import gc
+
+from nose.tools import assert_raises, eq_, ok_
+
+from mockredis import MockRedis
+from mockredis.clock import Clock, VirtualClock
+from mockredis.expiry import ExpiryIndex
+
+
+class ManualClock(Clock):
+    """
+    A clock that does not expire anything when moved.
+    """
+
+    def __init__(self, time):
+        self.time = time
+
+    def now(self):
+        return self.time
+
+
+class TestVirtualClock(object):
+
+    def setup(self):
+        self.clock = VirtualClock(start=datetime(2014, 1, 1))
+        self.redis = MockRedis(clock=self.clock)
+
+    def test_advance(self):
+        self.clock.advance(90)
+        eq_(datetime(2014, 1, 1, 0, 1, 30), self.clock.now())
+        self.clock.advance(timedelta(minutes=1))
+        eq_(datetime(2014, 1, 1, 0, 2, 30), self.clock.now())
+
+    def test_advance_backwards(self):
+        with assert_raises(ValueError):
+            self.clock.advance(-1)
+
+    def test_advance_expires_keys(self):
+        self.redis.set('short', 'value', ex=10)
+        self.redis.set('long', 'value', ex=100)
+        self.redis.set('forever', 'value')
+
+        self.clock.advance(5)
+        eq_(5, self.redis.ttl('short'))
+        ok_('short' in self.redis)
+
+        self.clock.advance(6)
+        ok_('short' not in self.redis)
+        ok_('long' in self.redis)
+
+        self.clock.advance(3600)
+        eq_(['forever'], self.redis.keys())
+
+    def test_advance_honors_updated_expiry(self):
+        self.redis.set('key', 'value', ex=10)
+        self.redis.expire('key', 60)
+        self.clock.advance(30)
+        ok_('key' in self.redis)
+        self.redis.set('key', 'value')
+        self.clock.advance(60)
+        ok_('key' in self.redis)
+
+    def test_blocking_pop_does_not_sleep(self):
+        eq_(None, self.redis.blpop('list', 5))
+        eq_(datetime(2014, 1, 1, 0, 0, 5), self.clock.now())
+
+    def test_advance_expires_str_and_bytes_keys_together(self):
+        self.redis.set('key', 'value')
+        self.redis.set(b'key', 'value')
+        self.redis.expire('key', 10)
+        self.redis.expire(b'key', 10)
+        self.clock.advance(11)
+        ok_('key' not in self.redis)
+        ok_(b'key' not in self.redis)
+
+    def test_hour_of_churn(self):
+        for second in range(3600):
+            self.redis.set('key{}'.format(second), 'value', ex=second % 60 + 1)
+            self.clock.advance(1)
+        eq_(30, len(self.redis.keys()))
+
+    def test_discarded_clients_are_freed(self):
+        client = ref(MockRedis(clock=self.clock))
+        gc.collect()
+        eq_(None, client())
+        self.clock.advance(1)
+        eq_(1, len(self.clock._listeners))
+
+
+class TestExpiryIndex(object):
+
+    def test_pop_due(self):
+        index = ExpiryIndex()
+        index['a'] = 3
+        index['b'] = 1
+        index['c'] = 2
+        index['b'] = 5
+
+        eq_(2, index.next_expiry())
+        eq_([('c', 2), ('a', 3)], index.pop_due(4))
+        eq_(1, len(index))
+        eq_([], index.pop_due(5))
+        eq_([('b', 5)], index.pop_due(6))
+
+    def test_pop_due_limit(self):
+        index = ExpiryIndex()
+        for when in range(10):
+            index[str(when)] = when
+        eq_(['0', '1'], [name for name, _ in index.pop_due(10, limit=2)])
+        eq_(8, len(index))
+
+    def test_deleted_entries_are_skipped(self):
+        index = ExpiryIndex()
+        index['a'] = 1
+        index['b'] = 2
+        del index['a']
+        eq_([('b', 2)], index.pop_due(3))
+
+    def test_equal_expiries_on_str_and_bytes_names(self):
+        index = ExpiryIndex()
+        index['a'] = 1
+        index[b'a'] = 1
+        index['b'] = 2
+        eq_(set([('a', 1), (b'a', 1)]), set(index.pop_due(2)))
+
+
+class TestHashFieldExpiry(object):
+
+    def setup(self):
+        self.clock = VirtualClock(start=datetime(2014, 1, 1))
+        self.redis = MockRedis(clock=self.clock)
+
+    def test_lazy_expiry(self):
+        clock = ManualClock(datetime(2014, 1, 1))
+        redis = MockRedis(clock=clock)
+        redis.hmset('hash', {'a': '1', 'b': '2', 'c': '3'})
+        redis.hexpire('hash', 10, 'a')
+        redis.hexpire('hash', 20, 'b')
+
+        clock.time += timedelta(seconds=15)
+        eq_(3, len(redis.redis['hash']))
+        eq_(None, redis.hget('hash', 'a'))
+        eq_({'b': '2', 'c': '3'}, redis.hgetall('hash'))
+        eq_([5], redis.httl('hash', 'b'))
+
+    def test_active_reclaim(self):
+        self.redis.hmset('hash', {'a': '1', 'b': '2'})
+        self.redis.hexpire('hash', 10, 'a', 'b')
+        self.redis.hmset('other', {'a': '1', 'b': '2'})
+        self.redis.hexpire('other', 30, 'a')
+
+        self.clock.advance(15)
+        ok_('hash' not in self.redis)
+        eq_({'a': '1', 'b': '2'}, self.redis.redis['other'])
+
+        self.clock.advance(30)
+        eq_({'b': '2'}, self.redis.redis['other'])
+        eq_({}, self.redis.hash_timeouts)
+
+    def test_active_reclaim_is_bounded(self):
+        self.redis.hash_field_reclaim_limit = 10
+        self.redis.hmset('hash', dict((str(i), str(i)) for i in range(25)))
+        self.redis.hexpire('hash', 10, *[str(i) for i in range(25)])
+
+        self.clock.advance(15)
+        eq_(15, len(self.redis.redis['hash']))
+        self.clock.advance(1)
+        eq_(5, len(self.redis.redis['hash']))
+        self.clock.advance(1)
+        ok_('hash' not in self.redis)
+
+    def test_key_delete_forgets_field_ttls(self):
+        self.redis.hset('hash', 'a', '1')
+        self.redis.hexpire('hash', 10, 'a')
+        self.redis.delete('hash')
+        self.redis.hset('hash', 'a', '1')
+        eq_([-1], self.redis.httl('hash', 'a'))
+
+    def _overwrite_hash(self, overwrite, type_):
+        """
+        Overwrite a hash that has a timeout and a field TTL, and check that both are dropped.
+        """
+        self.redis.hset('hash', 'a', '1')
+        self.redis.hexpire('hash', 10, 'a')
+        self.redis.expire('hash', 30)
+        overwrite()
+        self.clock.advance(20)
+        eq_(type_, self.redis.type('hash'))
+        eq_(None, self.redis.ttl('hash'))
+        eq_({}, self.redis.hash_timeouts)
+
+    def test_sunionstore_forgets_field_ttls(self):
+        self.redis.sadd('set', 'x')
+        self._overwrite_hash(lambda: self.redis.sunionstore('hash', 'set'), 'set')
+
+    def test_sort_store_forgets_field_ttls(self):
+        self.redis.rpush('list', '2', '1')
+        self._overwrite_hash(lambda: self.redis.sort('list', store='hash'), 'list')
+
+    def test_zunionstore_forgets_field_ttls(self):
+        self.redis.zadd('zset', x=1)
+        self._overwrite_hash(lambda: self.redis.zunionstore('hash', ['zset']), 'zset')
+
+    def test_zinterstore_forgets_field_ttls(self):
+        self.redis.zadd('zset', x=1)
+        self._overwrite_hash(lambda: self.redis.zinterstore('hash', ['zset']), 'zset')
+
+    def test_bitop_forgets_field_ttls(self):
+        self.redis.set('string', 'x')
+        self._overwrite_hash(lambda: self.redis.bitop('NOT', 'hash', 'string'), 'string')
+
+    def test_pfmerge_keeps_timeout(self):
+        self.redis.pfadd('hll', 'x')
+        self.redis.pfadd('other', 'y')
+        self.redis.expire('hll', 10)
+        self.redis.pfmerge('hll', 'other')
+        eq_(10, self.redis.ttl('hll'))
+        self.clock.advance(20)
+        ok_('hll' not in self.redis)
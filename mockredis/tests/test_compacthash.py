@@ -0,0 +1,91 @@
+from nose.tools import assert_raises, eq_, ok_
+
+from mockredis import MockRedis
+from mockredis.compacthash import CompactHash
+
+
+class TestCompactHash(object):
+    """
+    Tests the compact hash data structure, not the redis commands.
+    """
+
+    def setup(self):
+        self.hash = CompactHash()
+
+    def test_initially_empty(self):
+        eq_(0, len(self.hash))
+        eq_({}, self.hash)
+        ok_("a" not in self.hash)
+        with assert_raises(KeyError):
+            self.hash["a"]
+        with assert_raises(KeyError):
+            del self.hash["a"]
+
+    def test_set_and_delete(self):
+        self.hash["a"] = "1"
+        self.hash["b"] = "2"
+        self.hash["c"] = "3"
+        self.hash["b"] = "4"
+        eq_(["a", "b", "c"], list(self.hash))
+        eq_({"a": "1", "b": "4", "c": "3"}, self.hash)
+        del self.hash["a"]
+        eq_([("b", "4"), ("c", "3")], self.hash.items())
+        eq_("3", self.hash.pop("c"))
+        eq_(None, self.hash.pop("c", None))
+        eq_(1, len(self.hash))
+
+    def test_values_are_not_fields(self):
+        """
+        A value equal to a field name is not mistaken for the field.
+        """
+        self.hash["a"] = "b"
+        ok_("b" not in self.hash)
+        self.hash["b"] = "a"
+        eq_({"a": "b", "b": "a"}, self.hash)
+        del self.hash["b"]
+        eq_({"a": "b"}, self.hash)
+
+    def test_copy(self):
+        self.hash.update({"a": "1", "b": "2"})
+        other = self.hash.copy()
+        other["a"] = "3"
+        eq_({"a": "1", "b": "2"}, self.hash)
+        eq_({"a": "3", "b": "2"}, other)
+
+
+class TestCompactHashEncoding(object):
+    """
+    Tests the choice between listpack and hashtable encodings for redis hashes.
+    """
+
+    def setup(self):
+        self.redis = MockRedis()
+        self.redis.config_set('hash-max-listpack-entries', 2)
+        self.redis.config_set('hash-max-listpack-value', 8)
+
+    def test_small(self):
+        self.redis.hmset("h", {"a": 1, "b": 2})
+        ok_(isinstance(self.redis.redis["h"], CompactHash))
+        eq_("listpack", self.redis.object("encoding", "h"))
+        eq_({"a": "1", "b": "2"}, self.redis.hgetall("h"))
+
+    def test_too_many_entries(self):
+        self.redis.hmset("h", {"a": 1, "b": 2})
+        self.redis.hincrby("h", "c")
+        eq_("hashtable", self.redis.object("encoding", "h"))
+        eq_({"a": "1", "b": "2", "c": "1"}, self.redis.hgetall("h"))
+
+    def test_long_value(self):
+        self.redis.hset("h", "a", 1)
+        self.redis.hsetnx("h", "b", "x" * 9)
+        eq_("hashtable", self.redis.object("encoding", "h"))
+        eq_({"a": "1", "b": "x" * 9}, self.redis.hgetall("h"))
+
+    def test_interned_fields(self):
+        """
+        Field names are shared across hashes.
+        """
+        field = "".join(["created", "_at"])
+        self.redis.hset("h1", field, 1)
+        self.redis.hset("h2", "".join(["created", "_at"]), 1)
+        ok_(list(self.redis.redis["h1"])[0] is list(self.redis.redis["h2"])[0])
@@ -0,0 +1,94 @@
+from nose.tools import eq_, ok_
+
+from mockredis import MockRedis
+from mockredis.compression import CompressedString, Compressor
+
+
+DOCUMENT = '{"values": [' + ', '.join('{{"id": {}}}'.format(i) for i in range(1000)) + ']}'
+
+
+class TestCompressor(object):
+    """
+    Tests the compressor, not the redis commands.
+    """
+
+    def setup(self):
+        self.compressor = Compressor(100, cache_size=2)
+
+    def test_compress(self):
+        compressed = self.compressor.compress(DOCUMENT)
+        ok_(isinstance(compressed, CompressedString))
+        ok_(len(compressed.data) < len(DOCUMENT))
+        eq_(len(DOCUMENT), compressed.length)
+        eq_(DOCUMENT, self.compressor.decompress(compressed))
+
+        compressed = self.compressor.compress(DOCUMENT.encode('utf-8'))
+        eq_(DOCUMENT.encode('utf-8'), self.compressor.decompress(compressed))
+
+    def test_small_values_are_not_compressed(self):
+        eq_('small', self.compressor.compress('small'))
+        eq_(12345, self.compressor.compress(12345))
+
+    def test_cache(self):
+        first, second, third = [self.compressor.compress(DOCUMENT + str(i)) for i in range(3)]
+        self.compressor.decompress(first)
+        self.compressor.decompress(first)
+        eq_((1, 1), (self.compressor.cache_hits, self.compressor.cache_misses))
+        self.compressor.decompress(second)
+        self.compressor.decompress(third)
+        # the least recently decompressed value was evicted
+        self.compressor.decompress(first)
+        eq_((1, 4), (self.compressor.cache_hits, self.compressor.cache_misses))
+        # equal values share a cache entry
+        self.compressor.decompress(self.compressor.compress(DOCUMENT + '2'))
+        eq_((2, 4), (self.compressor.cache_hits, self.compressor.cache_misses))
+
+
+class TestCompressedValues(object):
+    """
+    Tests string commands on compressed values.
+    """
+
+    def setup(self):
+        self.redis = MockRedis(compress_threshold=100)
+
+    def test_set_and_get(self):
+        self.redis.set('doc', DOCUMENT)
+        self.redis.mset({'doc2': DOCUMENT, 'small': 'value'})
+        ok_(isinstance(self.redis.redis['doc'], CompressedString))
+        ok_(isinstance(self.redis.redis['doc2'], CompressedString))
+        eq_('value', self.redis.redis['small'])
+        eq_(DOCUMENT, self.redis.get('doc'))
+        eq_([DOCUMENT, 'value'], self.redis.mget('doc2', 'small'))
+        eq_('string', self.redis.type('doc'))
+
+    def test_string_commands(self):
+        self.redis.set('doc', DOCUMENT)
+        eq_(len(DOCUMENT), self.redis.strlen('doc'))
+        eq_(DOCUMENT[:10], self.redis.getrange('doc', 0, 9))
+        eq_(len(DOCUMENT) + 1, self.redis.append('doc', '!'))
+        eq_(DOCUMENT + '!', self.redis.get('doc'))
+
+    def test_watch(self):
+        self.redis.set('doc', DOCUMENT)
+        with self.redis.pipeline() as pipeline:
+            pipeline.watch('doc')
+            pipeline.multi()
+            pipeline.strlen('doc')
+            eq_([len(DOCUMENT)], pipeline.execute())
+
+    def test_info(self):
+        self.redis.set('doc', DOCUMENT)
+        self.redis.set('small', 'value')
+        info = self.redis.info()
+        eq_({'keys': 2, 'expires': 0, 'avg_ttl': 0}, info['db0'])
+        eq_(1, info['compressed_keys'])
+        eq_(len(DOCUMENT), info['uncompressed_bytes'])
+        ok_(info['compression_ratio'] > 1)
+        ok_('db0' not in self.redis.info('compression'))
+
+    def test_disabled_by_default(self):
+        redis = MockRedis()
+        redis.set('doc', DOCUMENT)
+        eq_(DOCUMENT, redis.redis['doc'])
+        ok_('compression' not in redis.info())
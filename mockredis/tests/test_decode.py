@@ -0,0 +1,134 @@
+from nose.tools import eq_, ok_
+
+from mockredis import MockRedis
+
+
+BLOB = b'\x08\x96\x01\xff\x00'
+
+
+class TestBytesStorage(object):
+    """
+    Tests that bytes values are stored and returned as they are, except that hash fields and
+    values, list elements and set and sorted set members that are valid text are the same as
+    that text.
+    """
+
+    def setup(self):
+        self.redis = MockRedis()
+
+    def test_string(self):
+        self.redis.set('key', BLOB)
+        ok_(self.redis.get('key') is BLOB)
+        self.redis.set('key', bytearray(BLOB))
+        eq_(BLOB, self.redis.get('key'))
+        self.redis.set('key', memoryview(BLOB))
+        eq_(BLOB, self.redis.get('key'))
+        eq_('embstr', self.redis.object('encoding', 'key'))
+
+    def test_hash(self):
+        self.redis.hset('hkey', b'field', BLOB)
+        eq_(BLOB, self.redis.hget('hkey', b'field'))
+        eq_({'field': BLOB}, self.redis.hgetall('hkey'))
+
+    def test_list(self):
+        self.redis.rpush('lkey', BLOB, b'other')
+        eq_([BLOB, 'other'], self.redis.lrange('lkey', 0, -1))
+        eq_(0, self.redis.lpos('lkey', BLOB))
+        eq_(BLOB, self.redis.lpop('lkey'))
+
+    def test_set(self):
+        self.redis.sadd('skey', BLOB)
+        eq_(set([BLOB]), self.redis.smembers('skey'))
+        ok_(self.redis.sismember('skey', BLOB))
+        eq_(BLOB, self.redis.spop('skey'))
+
+    def test_zset(self):
+        self.redis.zadd('zkey', BLOB, 1)
+        eq_([BLOB], self.redis.zrange('zkey', 0, -1))
+        eq_(0, self.redis.zrank('zkey', BLOB))
+        eq_(['0', [(BLOB, 1.0)]], self.redis.zscan('zkey'))
+        eq_(1, self.redis.zrem('zkey', BLOB))
+
+    def test_mixed_set(self):
+        eq_(1, self.redis.sadd('skey', 'a', b'a'))
+        eq_(0, self.redis.sadd('skey', u'a'))
+        ok_(self.redis.sismember('skey', b'a'))
+        eq_([1, 1], self.redis.smismember('skey', ['a', b'a']))
+        eq_(1, self.redis.srem('skey', b'a'))
+        eq_(0, self.redis.scard('skey'))
+
+    def test_mixed_hash_fields(self):
+        self.redis.hset('hkey', b'field', '1')
+        eq_('1', self.redis.hget('hkey', 'field'))
+        self.redis.hset('hkey', 'field', b'2')
+        eq_({'field': '2'}, self.redis.hgetall('hkey'))
+        ok_(self.redis.hexists('hkey', b'field'))
+        eq_(1, self.redis.hdel('hkey', b'field'))
+
+    def test_mixed_list_values(self):
+        self.redis.rpush('lkey', 'a', b'a', BLOB, 'b')
+        eq_(0, self.redis.lpos('lkey', b'a'))
+        eq_([0, 1], self.redis.lpos('lkey', 'a', count=0))
+        eq_(2, self.redis.lpos('lkey', BLOB))
+        eq_(2, self.redis.lrem('lkey', b'a'))
+        eq_([BLOB, 'b'], self.redis.lrange('lkey', 0, -1))
+
+    def test_mixed_zset_members(self):
+        self.redis.zadd('zkey', a=1)
+        eq_(0, self.redis.zadd('zkey', b'a', 2))
+        eq_(2.0, self.redis.zscore('zkey', 'a'))
+        eq_(1, self.redis.zadd('zkey', BLOB, 2))
+        eq_(1, self.redis.zrank('zkey', b'a'))
+        eq_(2.0, self.redis.zscore('zkey', BLOB))
+        eq_(1, self.redis.zrem('zkey', b'a', 'a'))
+        eq_(1, self.redis.zcard('zkey'))
+
+
+class TestDecodeResponses(object):
+    """
+    Tests the redis-py compatible ``decode_responses`` modes.
+    """
+
+    def test_decode(self):
+        redis = MockRedis(decode_responses=True)
+        redis.set('key', b'value')
+        eq_(u'value', redis.get('key'))
+        redis.hset('hkey', b'field', b'value')
+        eq_({u'field': u'value'}, redis.hgetall('hkey'))
+        redis.rpush('lkey', b'one', b'two')
+        eq_([u'one', u'two'], redis.lrange('lkey', 0, -1))
+        eq_(u'two', redis.rpop('lkey'))
+        redis.sadd('skey', b'one')
+        eq_(set([u'one']), redis.smembers('skey'))
+
+    def test_encode(self):
+        redis = MockRedis(decode_responses=False)
+        redis.set('key', u'value')
+        eq_(b'value', redis.get('key'))
+        redis.incr('counter')
+        eq_(b'1', redis.get('counter'))
+        redis.hset('hkey', 'field', 1)
+        eq_({b'field': b'1'}, redis.hgetall('hkey'))
+        eq_([b'field'], redis.hkeys('hkey'))
+        redis.sadd('skey', 'one', 2)
+        eq_(set([b'one', b'2']), redis.smembers('skey'))
+
+    def test_encode_zset(self):
+        redis = MockRedis(decode_responses=False)
+        redis.zadd('zkey', 'one', 1, BLOB, 2)
+        eq_([b'one', BLOB], redis.zrange('zkey', 0, -1))
+        eq_([(BLOB, 2.0)], redis.zrangebyscore('zkey', 2, 2, withscores=True))
+        eq_(['0', [(b'one', 1.0)]], redis.zscan('zkey', match='o*'))
+
+    def test_encode_sscan_match(self):
+        redis = MockRedis(decode_responses=False)
+        redis.sadd('skey', 'one', 'two', BLOB)
+        eq_(['0', [b'one']], redis.sscan('skey', match='o*'))
+
+    def test_no_zero_copy(self):
+        """
+        Zero-copy mode is not available with decode_responses.
+        """
+        redis = MockRedis(decode_responses=False, zero_copy=True)
+        redis.sadd('skey', 'one')
+        eq_(set([b'one']), redis.smembers('skey'))
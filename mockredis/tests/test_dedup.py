@@ -0,0 +1,72 @@
+from nose.tools import eq_, ok_
+
+from mockredis import MockRedis
+from mockredis.dedup import ValuePool
+
+
+def _payload(text='payload', count=20):
+    """
+    Build a large string at runtime, so that each call returns a new object.
+    """
+    return ''.join([text] * count)
+
+
+class TestValuePool(object):
+    """
+    Tests the value pool, not the redis commands.
+    """
+
+    def setup(self):
+        self.pool = ValuePool(64)
+
+    def test_share(self):
+        first = self.pool.share(_payload())
+        ok_(self.pool.share(_payload()) is first)
+        ok_(self.pool.share(_payload('other')) is not first)
+        eq_(2, len(self.pool))
+
+    def test_small_values_are_not_shared(self):
+        value = _payload(count=2)
+        ok_(self.pool.share(value) is value)
+        eq_(0, len(self.pool))
+
+    def test_prune(self):
+        kept = self.pool.share(_payload())
+        self.pool.share(_payload('other'))
+        self.pool.prune()
+        eq_(1, len(self.pool))
+        ok_(self.pool.share(_payload()) is kept)
+
+
+class TestDeduplication(object):
+    """
+    Tests that identical values are stored once.
+    """
+
+    def setup(self):
+        self.redis = MockRedis(dedup_threshold=64)
+
+    def test_strings_hashes_and_lists(self):
+        self.redis.set('key1', _payload())
+        self.redis.mset({'key2': _payload()})
+        self.redis.hset('hash', 'field', _payload())
+        self.redis.rpush('list', _payload(), _payload())
+        stored = self.redis.redis['key1']
+        ok_(self.redis.redis['key2'] is stored)
+        ok_(self.redis.hget('hash', 'field') is stored)
+        ok_(all(value is stored for value in self.redis.lrange('list', 0, -1)))
+        eq_(_payload(), self.redis.get('key1'))
+        eq_(1, self.redis.info('dedup')['dedup_values'])
+
+    def test_unreferenced_values_are_dropped(self):
+        self.redis.set('key1', _payload())
+        self.redis.set('key2', _payload('other'))
+        self.redis.delete('key1')
+        eq_(1, self.redis.info('dedup')['dedup_values'])
+
+    def test_with_compression(self):
+        redis = MockRedis(dedup_threshold=64, compress_threshold=64)
+        redis.set('key1', _payload())
+        redis.set('key2', _payload())
+        ok_(redis.redis['key1'] is redis.redis['key2'])
+        eq_(_payload(), redis.get('key2'))
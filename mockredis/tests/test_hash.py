@@ -104,3 +104,39 @@ class TestRedisHash(object):
         hashkey = "hash"
         self.redis.hmset(hashkey, {1: 2, 3: 4})
         eq_(["2", "4"], sorted(self.redis.hvals(hashkey)))
+
+    def test_hexpire(self):
+        hashkey = "hash"
+        eq_([-2], self.redis.hexpire(hashkey, 100, "key"))
+        self.redis.hmset(hashkey, {"key": "value", "other": "value"})
+        eq_([1, -2], self.redis.hexpire(hashkey, 100, "key", "missing"))
+        eq_([0], self.redis.hexpire(hashkey, 200, "key", nx=True))
+        eq_([0], self.redis.hexpire(hashkey, 50, "key", gt=True))
+        eq_([1], self.redis.hexpire(hashkey, 200, "key", gt=True))
+        eq_([0], self.redis.hexpire(hashkey, 100, "other", xx=True))
+        ttl = self.redis.httl(hashkey, "key", "other", "missing")
+        ok_(190 < ttl[0] <= 200)
+        eq_([-1, -2], ttl[1:])
+        ok_(190000 < self.redis.hpttl(hashkey, "key")[0] <= 200000)
+
+    def test_hexpire_past(self):
+        hashkey = "hash"
+        self.redis.hmset(hashkey, {"key": "value", "other": "value"})
+        eq_([2], self.redis.hexpire(hashkey, 0, "key"))
+        eq_({"other": "value"}, self.redis.hgetall(hashkey))
+        eq_([2], self.redis.hpexpire(hashkey, 0, "other"))
+        ok_(not self.redis.exists(hashkey))
+
+    def test_hpersist(self):
+        hashkey = "hash"
+        self.redis.hmset(hashkey, {"key": "value", "other": "value"})
+        self.redis.hexpire(hashkey, 100, "key")
+        eq_([1, -1, -2], self.redis.hpersist(hashkey, "key", "other", "missing"))
+        eq_([-1], self.redis.httl(hashkey, "key"))
+
+    def test_hset_clears_field_ttl(self):
+        hashkey = "hash"
+        self.redis.hset(hashkey, "key", "value")
+        self.redis.hexpire(hashkey, 100, "key")
+        self.redis.hset(hashkey, "key", "value")
+        eq_([-1], self.redis.httl(hashkey, "key"))
@@ -0,0 +1,151 @@
+from nose.tools import eq_, ok_
+
+from mockredis import MockRedis
+from mockredis.hyperloglog import HLL_REGISTERS, HyperLogLog
+from mockredis.tests.fixtures import assert_raises_watch_error, raises_response_error, setup
+
+
+def _hll(values):
+    hll = HyperLogLog()
+    for value in values:
+        hll.add(str(value).encode('ascii'))
+    return hll
+
+
+class TestHyperLogLog(object):
+    """
+    Tests the HyperLogLog data structure, not the redis commands.
+    """
+
+    def test_cached_cardinality(self):
+        hll = _hll(range(100))
+        ok_(hll._cardinality is None)
+        count = hll.count()
+        eq_(count, hll._cardinality)
+        ok_(not hll.add(b'1'))
+        eq_(count, hll._cardinality)
+        ok_(hll.add(b'new'))
+        ok_(hll._cardinality is None)
+
+    def test_promotion(self):
+        hll = _hll(range(100))
+        hll.compact(3000)
+        ok_(hll.is_sparse)
+        hll.compact(10)
+        ok_(not hll.is_sparse)
+        eq_(_hll(range(100)).count(), hll.count())
+
+    def test_round_trip(self):
+        for hll in (_hll(range(10)), _hll(range(10000)), HyperLogLog()):
+            hll.compact(3000)
+            copy = HyperLogLog.loads(hll.dumps())
+            eq_(hll.is_sparse, copy.is_sparse)
+            eq_(hll.count(), copy.count())
+            eq_(hll.dumps(), copy.dumps())
+
+    def test_merge(self):
+        sparse, dense = _hll(range(0, 10)), _hll(range(5, 20000))
+        dense.compact(0)
+        merged = HyperLogLog.merge([sparse, dense, dense.copy()], 3000)
+        ok_(not merged.is_sparse)
+        eq_(_hll(range(20000)).count(), merged.count())
+        merged = HyperLogLog.merge([sparse, _hll(range(10, 20))], 3000)
+        ok_(merged.is_sparse)
+        eq_(_hll(range(20)).count(), merged.count())
+        eq_(0, HyperLogLog.merge([], 3000).count())
+
+    def test_equality(self):
+        hll = _hll(range(100))
+        dense = hll.copy()
+        dense.compact(0)
+        ok_(not dense.is_sparse)
+        eq_(hll, dense)
+        eq_(dense, hll)
+        ok_(hll != _hll(range(101)))
+        ok_(dense != _hll(range(101)))
+
+    def test_empty(self):
+        hll = HyperLogLog()
+        eq_(0, hll.count())
+        eq_(HLL_REGISTERS, hll._histogram()[0])
+
+
+class TestHyperLogLogEncoding(object):
+    """
+    Tests how PFADD stores HyperLogLogs.
+    """
+
+    def setup(self):
+        self.redis = MockRedis()
+
+    def test_sparse_to_dense(self):
+        self.redis.pfadd('hll', *range(10))
+        ok_(self.redis.redis['hll'].is_sparse)
+        self.redis.config_set('hll-sparse-max-bytes', 0)
+        self.redis.pfadd('hll', 'more')
+        ok_(not self.redis.redis['hll'].is_sparse)
+
+    def test_get_and_set(self):
+        self.redis.pfadd('hll', *range(1000))
+        value = self.redis.get('hll')
+        ok_(value.startswith(b'HYLL'))
+        self.redis.set('copy', value)
+        eq_(self.redis.pfcount('hll'), self.redis.pfcount('copy'))
+        eq_('raw', self.redis.object('encoding', 'hll'))
+
+    def test_watch(self):
+        self.redis.pfadd('hll', *range(10))
+        with self.redis.pipeline() as pipeline:
+            pipeline.watch('hll')
+            pipeline.multi()
+            pipeline.pfcount('hll')
+            eq_([10], pipeline.execute())
+
+        with self.redis.pipeline() as pipeline:
+            pipeline.watch('hll')
+            self.redis.pfadd('hll', 'more')
+            pipeline.multi()
+            pipeline.pfcount('hll')
+            with assert_raises_watch_error():
+                pipeline.execute()
+
+
+class TestRedisHyperLogLog(object):
+    """HyperLogLog tests"""
+
+    def setup(self):
+        setup(self)
+
+    def test_pfadd_pfcount(self):
+        eq_(1, self.redis.pfadd('hll', 'foo', 'bar', 'zap'))
+        eq_(0, self.redis.pfadd('hll', 'zap', 'zap', 'zap'))
+        eq_(0, self.redis.pfadd('hll', 'foo', 'bar'))
+        eq_(3, self.redis.pfcount('hll'))
+        eq_(1, self.redis.pfadd('other', 1, 2, 3))
+        eq_(6, self.redis.pfcount('hll', 'other'))
+        eq_(0, self.redis.pfcount('missing'))
+
+    def test_pfadd_without_values(self):
+        eq_(1, self.redis.pfadd('hll'))
+        eq_(0, self.redis.pfadd('hll'))
+        eq_(0, self.redis.pfcount('hll'))
+        eq_('string', self.redis.type('hll'))
+
+    def test_pfcount_error(self):
+        self.redis.pfadd('hll', *range(10000))
+        ok_(abs(self.redis.pfcount('hll') - 10000) < 200)
+
+    def test_pfmerge(self):
+        self.redis.pfadd('hll1', 'foo', 'bar', 'zap', 'a')
+        self.redis.pfadd('hll2', 'a', 'b', 'c', 'foo')
+        ok_(self.redis.pfmerge('hll3', 'hll1', 'hll2', 'missing'))
+        eq_(6, self.redis.pfcount('hll3'))
+        # the destination is merged too
+        self.redis.pfadd('hll4', 'x')
+        self.redis.pfmerge('hll4', 'hll1')
+        eq_(5, self.redis.pfcount('hll4'))
+
+    @raises_response_error
+    def test_pfcount_invalid_value(self):
+        self.redis.set('key', 'value')
+        self.redis.pfcount('key')
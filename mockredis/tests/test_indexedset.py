@@ -0,0 +1,70 @@
+from nose.tools import assert_raises, eq_, ok_
+
+from mockredis.indexedset import IndexedSet
+
+
+class TestIndexedSet(object):
+    """
+    Tests the indexed set data structure, not the redis commands.
+    """
+
+    def setup(self):
+        self.iset = IndexedSet()
+
+    def test_initially_empty(self):
+        """
+        Indexed set is created empty.
+        """
+        eq_(0, len(self.iset))
+        eq_(set(), self.iset)
+        eq_([], self.iset.sample(3))
+        eq_([], self.iset.choices(3))
+        with assert_raises(IndexError):
+            self.iset.random_member()
+        with assert_raises(IndexError):
+            self.iset.pop_random()
+
+    def test_add_and_discard(self):
+        """
+        Removal keeps the positions of the remaining members consistent.
+        """
+        ok_(self.iset.add("one"))
+        ok_(not self.iset.add("one"))
+        self.iset.update(["two", "three", "four"])
+        eq_(set(["one", "two", "three", "four"]), self.iset)
+
+        ok_(self.iset.discard("one"))
+        ok_(not self.iset.discard("one"))
+        self.iset.remove("four")
+        with assert_raises(KeyError):
+            self.iset.remove("four")
+        eq_(set(["two", "three"]), self.iset)
+        for position, member in enumerate(self.iset._members):
+            eq_(position, self.iset._positions[member])
+
+    def test_pop_random(self):
+        members = set(range(20))
+        self.iset.update(members)
+        popped = set(self.iset.pop_random() for _ in range(20))
+        eq_(members, popped)
+        eq_(0, len(self.iset))
+
+    def test_sample(self):
+        self.iset.update(range(10))
+        members = self.iset.sample(5)
+        eq_(5, len(set(members)))
+        ok_(all(member in self.iset for member in members))
+        eq_(set(range(10)), set(self.iset.sample(100)))
+
+    def test_choices(self):
+        self.iset.update(["one", "two"])
+        members = self.iset.choices(10)
+        eq_(10, len(members))
+        ok_(all(member in self.iset for member in members))
+
+    def test_copy(self):
+        self.iset.update(["one", "two"])
+        other = self.iset.copy()
+        other.discard("one")
+        eq_(set(["one", "two"]), self.iset)
+        eq_(IndexedSet(["two"]), other)
@@ -0,0 +1,127 @@
+from nose.tools import assert_raises, eq_, ok_
+
+from mockredis import MockRedis
+from mockredis.exceptions import ResponseError
+from mockredis.indexedset import IndexedSet
+from mockredis.intset import IntSet, INTSET_MAX, as_integer
+
+
+class TestIntSet(object):
+    """
+    Tests the intset data structure, not the redis commands.
+    """
+
+    def setup(self):
+        self.intset = IntSet()
+
+    def test_as_integer(self):
+        eq_(12, as_integer("12"))
+        eq_(-12, as_integer("-12"))
+        eq_(INTSET_MAX, as_integer(str(INTSET_MAX)))
+        for member in ["012", "+12", " 12", "1.5", "one", "", str(INTSET_MAX + 1)]:
+            eq_(None, as_integer(member))
+
+    def test_sorted(self):
+        """
+        Members are kept sorted and unique, whatever order they are added in.
+        """
+        ok_(self.intset.add("5"))
+        ok_(not self.intset.add("5"))
+        self.intset.update(["3", "-7", "5", "11", "3"])
+        ok_(self.intset.add("4"))
+        eq_(["-7", "3", "4", "5", "11"], list(self.intset))
+        ok_("4" in self.intset)
+        ok_("6" not in self.intset)
+        ok_("four" not in self.intset)
+
+    def test_non_integer(self):
+        """
+        Non-integer members are rejected without changing the set.
+        """
+        self.intset.add("1")
+        with assert_raises(ValueError):
+            self.intset.add("one")
+        with assert_raises(ValueError):
+            self.intset.update(["2", "two"])
+        eq_(["1"], list(self.intset))
+
+    def test_discard(self):
+        self.intset.update(["1", "2", "3"])
+        ok_(self.intset.discard("2"))
+        ok_(not self.intset.discard("2"))
+        ok_(not self.intset.discard("two"))
+        with assert_raises(KeyError):
+            self.intset.remove("2")
+        eq_(["1", "3"], list(self.intset))
+
+    def test_merge(self):
+        merged = IntSet.merge([IntSet(["1", "3", "5"]), IntSet(["2", "3"]), IntSet()])
+        eq_(["1", "2", "3", "5"], list(merged))
+
+    def test_random(self):
+        members = set(str(value) for value in range(20))
+        self.intset.update(members)
+        ok_(self.intset.random_member() in members)
+        eq_(5, len(set(self.intset.sample(5))))
+        ok_(all(member in members for member in self.intset.choices(30)))
+        eq_(members, set(self.intset.pop_random() for _ in range(20)))
+        with assert_raises(IndexError):
+            self.intset.pop_random()
+
+    def test_equality(self):
+        self.intset.update(["1", "2"])
+        eq_(IntSet(["2", "1"]), self.intset)
+        eq_(set(["1", "2"]), self.intset)
+        eq_(IndexedSet(["1", "2"]), self.intset)
+        ok_(self.intset != IntSet(["1"]))
+
+
+class TestIntSetEncoding(object):
+    """
+    Tests the choice between intset and hash set encodings for redis sets.
+    """
+
+    def setup(self):
+        self.redis = MockRedis()
+        self.redis.config_set('set-max-intset-entries', 4)
+
+    def test_integers(self):
+        self.redis.sadd("x", 1, 2, 3)
+        ok_(isinstance(self.redis.redis["x"], IntSet))
+        eq_(set(["1", "2", "3"]), self.redis.smembers("x"))
+
+    def test_promote_non_integer(self):
+        self.redis.sadd("x", 1, 2)
+        self.redis.sadd("x", "three")
+        ok_(isinstance(self.redis.redis["x"], IndexedSet))
+        eq_(set(["1", "2", "three"]), self.redis.smembers("x"))
+
+    def test_promote_size(self):
+        self.redis.sadd("x", 1, 2, 3, 4)
+        ok_(isinstance(self.redis.redis["x"], IntSet))
+        self.redis.sadd("x", 5)
+        ok_(isinstance(self.redis.redis["x"], IndexedSet))
+        eq_(5, self.redis.scard("x"))
+
+    def test_smove(self):
+        self.redis.sadd("x", "one")
+        self.redis.sadd("y", 1)
+        ok_(self.redis.smove("x", "y", "one"))
+        ok_(isinstance(self.redis.redis["y"], IndexedSet))
+        eq_(set(["1", "one"]), self.redis.smembers("y"))
+        eq_([], self.redis.keys("x"))
+
+    def test_store(self):
+        self.redis.sadd("x", 1, 2, 3)
+        self.redis.sadd("y", 3, 4, 5)
+        eq_(5, self.redis.sunionstore("z", "x", "y"))
+        ok_(isinstance(self.redis.redis["z"], IndexedSet))
+        eq_(1, self.redis.sinterstore("z", "x", "y"))
+        ok_(isinstance(self.redis.redis["z"], IntSet))
+        eq_(set(["1", "2"]), self.redis.sdiff("x", "y"))
+        eq_(set(["1", "2", "3", "4", "5"]), self.redis.sunion("x", "y"))
+
+    def test_config(self):
+        eq_({'set-max-intset-entries': '4'}, self.redis.config_get('set-max-intset-entries'))
+        with assert_raises(ResponseError):
+            self.redis.config_set('set-max-intset-entries', 'many')
@@ -1,8 +1,10 @@
+from threading import Thread
 import time
 
-from nose.tools import assert_raises, eq_
+from nose.tools import assert_raises, eq_, ok_
 
-from mockredis.tests.fixtures import setup
+
+from mockredis.tests.fixtures import raises_response_error, setup
 from mockredis.tests.test_constants import (
     LIST1, LIST2, VAL1, VAL2, VAL3, VAL4
 )
@@ -184,6 +186,120 @@ class TestRedisList(object):
         eq_(None, self.redis.brpoplpush(LIST1, LIST2, timeout))
         eq_(timeout, int(time.time() - start))
 
+    def test_blpop_woken_by_push(self):
+        results = []
+        waiter = Thread(target=lambda: results.append(self.redis.blpop(LIST1, 5)))
+        waiter.start()
+        time.sleep(0.1)
+        start = time.time()
+        self.redis.rpush(LIST1, VAL1)
+        waiter.join()
+        ok_(time.time() - start < 1)
+        eq_([(LIST1, VAL1)], results)
+        eq_([], self.redis.keys("*"))
+
+    def test_blocking_pop_fairness(self):
+        """
+        Clients blocked on a list are served in the order they blocked.
+        """
+        results = []
+        waiters = []
+        for name in ("first", "second", "third"):
+            waiter = Thread(target=lambda name=name:
+                            results.append((name, self.redis.brpop(LIST1, 5))))
+            waiter.start()
+            waiters.append(waiter)
+            time.sleep(0.1)
+        self.redis.rpush(LIST1, VAL1, VAL2, VAL3)
+        for waiter in waiters:
+            waiter.join()
+        eq_({"first": (LIST1, VAL3), "second": (LIST1, VAL2), "third": (LIST1, VAL1)},
+            dict(results))
+
+    def test_brpoplpush_woken_by_push(self):
+        results = []
+        waiter = Thread(target=lambda: results.append(self.redis.brpoplpush(LIST1, LIST2, 5)))
+        waiter.start()
+        time.sleep(0.1)
+        self.redis.lpush(LIST1, VAL1)
+        waiter.join()
+        eq_([VAL1], results)
+        eq_([], self.redis.lrange(LIST1, 0, -1))
+        eq_([VAL1], self.redis.lrange(LIST2, 0, -1))
+
+    def test_lmove(self):
+        self.redis.rpush(LIST1, VAL1, VAL2, VAL3)
+        eq_(VAL1, self.redis.lmove(LIST1, LIST2))
+        eq_(VAL3, self.redis.lmove(LIST1, LIST2, 'RIGHT', 'LEFT'))
+        eq_([VAL3, VAL1], self.redis.lrange(LIST2, 0, -1))
+        eq_(VAL2, self.redis.lmove(LIST1, LIST1, 'left', 'right'))
+        eq_([VAL2], self.redis.lrange(LIST1, 0, -1))
+        eq_(VAL2, self.redis.lmove(LIST1, LIST2, 'LEFT', 'RIGHT'))
+        eq_([VAL3, VAL1, VAL2], self.redis.lrange(LIST2, 0, -1))
+        eq_(None, self.redis.lmove(LIST1, LIST2))
+        eq_([LIST2], self.redis.keys("*"))
+
+    def test_blmove_woken_by_push(self):
+        results = []
+        waiter = Thread(target=lambda:
+                        results.append(self.redis.blmove(LIST1, LIST2, 5, 'LEFT', 'LEFT')))
+        waiter.start()
+        time.sleep(0.1)
+        self.redis.rpush(LIST1, VAL1, VAL2)
+        waiter.join()
+        eq_([VAL1], results)
+        eq_([VAL2], self.redis.lrange(LIST1, 0, -1))
+        eq_([VAL1], self.redis.lrange(LIST2, 0, -1))
+
+    def test_lmpop(self):
+        self.redis.rpush(LIST2, VAL1, VAL2, VAL3)
+        eq_(None, self.redis.lmpop(1, LIST1, direction='LEFT'))
+        eq_([LIST2, [VAL1]], self.redis.lmpop(2, LIST1, LIST2, direction='LEFT'))
+        eq_([LIST2, [VAL3, VAL2]], self.redis.lmpop(2, LIST1, LIST2, direction='RIGHT', count=5))
+        eq_([], self.redis.keys("*"))
+
+    def test_blmpop(self):
+        self.redis.rpush(LIST2, VAL1, VAL2, VAL3)
+        eq_([LIST2, [VAL1, VAL2]], self.redis.blmpop(1, 2, LIST1, LIST2, direction='LEFT', count=2))
+        eq_([LIST2, [VAL3]], self.redis.blmpop(1, 2, LIST1, LIST2, direction='LEFT', count=2))
+        eq_(None, self.redis.blmpop(1, 2, LIST1, LIST2, direction='LEFT'))
+
+    def test_push_returns_length(self):
+        eq_(2, self.redis.rpush(LIST1, VAL1, VAL2))
+        eq_(3, self.redis.lpush(LIST1, VAL3))
+
+    def test_pushx(self):
+        eq_(0, self.redis.lpushx(LIST1, VAL1))
+        eq_(0, self.redis.rpushx(LIST1, VAL1))
+        eq_([], self.redis.keys("*"))
+        self.redis.rpush(LIST1, VAL1)
+        eq_(3, self.redis.lpushx(LIST1, VAL2, VAL3))
+        eq_(4, self.redis.rpushx(LIST1, VAL4))
+        eq_([VAL3, VAL2, VAL1, VAL4], self.redis.lrange(LIST1, 0, -1))
+
+    def test_linsert(self):
+        eq_(0, self.redis.linsert(LIST1, 'BEFORE', VAL1, VAL2))
+        self.redis.rpush(LIST1, VAL1, VAL2, VAL1)
+        eq_(-1, self.redis.linsert(LIST1, 'BEFORE', VAL3, VAL4))
+        eq_(4, self.redis.linsert(LIST1, 'BEFORE', VAL1, VAL3))
+        eq_(5, self.redis.linsert(LIST1, 'after', VAL2, VAL4))
+        eq_([VAL3, VAL1, VAL2, VAL4, VAL1], self.redis.lrange(LIST1, 0, -1))
+
+    def test_lpos(self):
+        self.redis.rpush(LIST1, 'a', 'b', 'c', '1', '2', '3', 'c', 'c')
+        eq_(2, self.redis.lpos(LIST1, 'c'))
+        eq_(None, self.redis.lpos(LIST1, 'x'))
+        eq_(6, self.redis.lpos(LIST1, 'c', rank=2))
+        eq_(7, self.redis.lpos(LIST1, 'c', rank=-1))
+        eq_([2, 6], self.redis.lpos(LIST1, 'c', count=2))
+        eq_([2, 6, 7], self.redis.lpos(LIST1, 'c', count=0))
+        eq_([7, 6], self.redis.lpos(LIST1, 'c', rank=-1, count=2))
+        eq_([6, 7], self.redis.lpos(LIST1, 'c', rank=2, count=0))
+        eq_([2], self.redis.lpos(LIST1, 'c', count=0, maxlen=6))
+        eq_([7], self.redis.lpos(LIST1, 'c', rank=-1, count=0, maxlen=1))
+        eq_([], self.redis.lpos(LIST1, 'a', rank=-1, count=0, maxlen=2))
+        eq_(None, self.redis.lpos(LIST2, 'c'))
+
     def test_rpoplpush(self):
         self.redis.rpush(LIST1, VAL1, VAL2)
         self.redis.rpush(LIST2, VAL3, VAL4)
@@ -361,6 +477,51 @@ class TestRedisList(object):
         eq_(self.redis.sort(LIST1, get=['get1_*', 'get2_*'], groups=True, start=1, num=1), [('c', 'z')])
         eq_(self.redis.sort(LIST1, get=['get1_*', 'get2_*'], groups=True, start=1, num=2), [('c', 'z'), ('b', 'y')])
 
+        # test returning the members themselves alongside other keys
+        eq_(self.redis.sort(LIST1, get=['#', 'get1_*']), ['0.1', 'a', '1.3', 'c', '2', 'b'])
+
+    def test_sort_limit(self):
+        values = ['5', '3', '8', '1', '9', '2', '3']
+        self._reinitialize_list(LIST1, *values)
+        ordered = sorted(values, key=float)
+        for start, num in [(0, 3), (2, 3), (5, 10), (10, 2), (-1, 2), (1, -1)]:
+            end = None if num < 0 else max(0, start) + num
+            eq_(ordered[max(0, start):end], self.redis.sort(LIST1, start=start, num=num))
+            eq_(ordered[::-1][max(0, start):end],
+                self.redis.sort(LIST1, start=start, num=num, desc=True))
+
+    def test_sort_sets(self):
+        self.redis.sadd('set', 3, 1, 10, 2)
+        eq_(['1', '2', '3', '10'], self.redis.sort('set'))
+        eq_(['1', '10', '2', '3'], self.redis.sort('set', alpha=True))
+        eq_(['10', '3'], self.redis.sort('set', desc=True, start=0, num=2))
+        # set members are sorted when stored, even without sorting
+        eq_(4, self.redis.sort('set', by='nosort', store='result'))
+        eq_(['1', '10', '2', '3'], self.redis.lrange('result', 0, -1))
+
+        self.redis.zadd('zset', a=3, b=1, c=2)
+        eq_(['b', 'c', 'a'], self.redis.sort('zset', by='nosort'))
+        eq_(['a', 'b', 'c'], self.redis.sort('zset', alpha=True))
+
+    def test_sort_hash_fields(self):
+        for member, weight, name in [('a', 3, 'alice'), ('b', 1, 'bob'), ('c', 2, 'carol')]:
+            self.redis.rpush(LIST1, member)
+            self.redis.hset('object_' + member, 'weight', weight)
+            self.redis.hset('object_' + member, 'name', name)
+        eq_(['bob', 'carol', 'alice'], self.redis.sort(LIST1, by='object_*->weight',
+                                                       get='object_*->name'))
+        eq_([('a', 'alice'), ('c', 'carol')],
+            self.redis.sort(LIST1, by='object_*->weight', get=['#', 'object_*->name'],
+                            desc=True, groups=True, start=0, num=2))
+        # missing values sort as zero, and ties are broken by the member
+        eq_(['a', 'b', 'c'], self.redis.sort(LIST1, by='object_*->missing'))
+        eq_([None, None, None], self.redis.sort(LIST1, get='object_*->missing', alpha=True))
+
+    @raises_response_error
+    def test_sort_invalid_scores(self):
+        self.redis.rpush(LIST1, 'a', 'b')
+        self.redis.sort(LIST1)
+
     def test_lset(self):
         with assert_raises(Exception):
             self.redis.lset(LIST1, 1, VAL1)
@@ -388,3 +549,8 @@ class TestRedisList(object):
         """
         self.redis.delete(LIST1)
         self.redis.lpush(LIST1, *reversed(values))
+
+    def test_ltrim_deletes_empty_list(self):
+        self._reinitialize_list(LIST1, VAL1, VAL2)
+        self.redis.ltrim(LIST1, 2, 1)
+        eq_([], self.redis.keys("*"))
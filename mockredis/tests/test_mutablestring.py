@@ -0,0 +1,56 @@
+from nose.tools import eq_, ok_
+
+from mockredis import MockRedis
+from mockredis.mutablestring import MutableString
+
+
+class TestMutableString(object):
+    """
+    Tests the mutable string data structure, not the redis commands.
+    """
+
+    def test_write(self):
+        value = MutableString(b'hello', is_text=True)
+        value.write(5, u' world', 'utf-8')
+        eq_(b'hello world', bytes(value))
+        value.write(0, u'J', 'utf-8')
+        eq_(b'Jello world', bytes(value))
+        value.write(13, u'!', 'utf-8')
+        eq_(b'Jello world\x00\x00!', bytes(value))
+        ok_(value.is_text)
+
+    def test_bytes_stay_bytes(self):
+        value = MutableString.from_value(u'text', 'utf-8')
+        ok_(value.is_text)
+        value.write(4, b'\xff', 'utf-8')
+        ok_(not value.is_text)
+        eq_(b'text\xff', value.to_value('utf-8'))
+
+
+class TestMutableStringEncoding(object):
+    """
+    Tests how APPEND and SETRANGE store strings.
+    """
+
+    def setup(self):
+        self.redis = MockRedis()
+
+    def test_append_grows_in_place(self):
+        self.redis.set('key', 'hello')
+        self.redis.append('key', ' ')
+        value = self.redis.redis['key']
+        ok_(isinstance(value, MutableString))
+        self.redis.append('key', 'world')
+        ok_(self.redis.redis['key'] is value)
+        eq_('raw', self.redis.object('encoding', 'key'))
+        eq_('hello world', self.redis.get('key'))
+
+    def test_append_to_missing_key(self):
+        self.redis.append('key', 'hello')
+        eq_('embstr', self.redis.object('encoding', 'key'))
+
+    def test_set_replaces_mutable_string(self):
+        self.redis.append('key', 'hello')
+        self.redis.append('key', 'world')
+        self.redis.set('key', 'value')
+        eq_('embstr', self.redis.object('encoding', 'key'))
@@ -71,3 +71,14 @@ def test_normalize_command_response():
     for command, response, expected in cases:
         yield _test, command, response, expected
 
+
+def test_call_lmpop():
+    redis = MockRedis()
+    redis.rpush("list", "a", "b", "c")
+    eq_(["list", ["c", "b"]], redis.call("LMPOP", 1, "list", "RIGHT", "COUNT", 2))
+
+
+def test_call_smismember():
+    redis = MockRedis()
+    redis.sadd("set", "a", "c")
+    eq_([1, 0, 1], redis.call("SMISMEMBER", "set", "a", "b", "c"))
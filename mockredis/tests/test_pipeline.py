@@ -150,3 +150,20 @@ class TestPipeline(object):
             pipeline.set("foo", "bar")
             with assert_raises_redis_error():
                 pipeline.multi()
+
+    def test_sismember_batch(self):
+        """
+        Consecutive membership tests of one set return one result each, in order.
+        """
+        self.redis.sadd("x", "one", "three")
+        self.redis.sadd("y", "two")
+        with self.redis.pipeline() as pipeline:
+            pipeline.sismember("x", "one")
+            pipeline.sismember("x", "two")
+            pipeline.sismember("x", "three")
+            pipeline.sismember("y", "two")
+            pipeline.sadd("y", "four")
+            pipeline.sismember("y", "four")
+            pipeline.sismember("y", "one")
+
+            eq_([1, 0, 1, 1, 1, 1, 0], pipeline.execute())
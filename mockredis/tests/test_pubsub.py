@@ -1,9 +1,11 @@
 """
 Tests for pubsub don't yet support verification against redis-server.
 """
-from nose.tools import eq_
+from nose.tools import assert_raises, eq_, ok_
 
 from mockredis import MockRedis
+from mockredis.clock import VirtualClock
+from mockredis.exceptions import ResponseError
 
 
 class TestRedisPubSub(object):
@@ -17,3 +19,75 @@ class TestRedisPubSub(object):
         msg = 'test message'
         self.redis.publish(channel, msg)
         eq_(self.redis.pubsub[channel], [msg])
+
+
+class TestKeyspaceNotifications(object):
+
+    def setup(self):
+        self.redis = MockRedis()
+        self.redis.flushdb()
+
+    def test_disabled_by_default(self):
+        self.redis.set('key', 'value')
+        self.redis.delete('key')
+        eq_({}, dict(self.redis.pubsub))
+
+    def test_config(self):
+        eq_({'notify-keyspace-events': ''}, self.redis.config_get('notify-*'))
+        self.redis.config_set('notify-keyspace-events', 'KEA')
+        eq_({'notify-keyspace-events': 'AKE'}, self.redis.config_get('notify-keyspace-events'))
+        self.redis.config_set('notify-keyspace-events', 'Elg')
+        eq_({'notify-keyspace-events': 'glE'}, self.redis.config_get('notify-keyspace-events'))
+        with assert_raises(ResponseError):
+            self.redis.config_set('notify-keyspace-events', 'Q')
+        with assert_raises(ResponseError):
+            self.redis.config_set('no-such-parameter', 'yes')
+
+    def test_keyevent(self):
+        self.redis.config_set('notify-keyspace-events', 'E$g')
+        self.redis.set('key', 'value')
+        self.redis.rpush('list', 'value')
+        self.redis.delete('key')
+        eq_(['key'], self.redis.pubsub['__keyevent@0__:set'])
+        eq_(['key'], self.redis.pubsub['__keyevent@0__:del'])
+        ok_('__keyevent@0__:rpush' not in self.redis.pubsub)
+
+    def test_keyspace(self):
+        self.redis.config_set('notify-keyspace-events', 'Kl')
+        self.redis.rpush('list', 'value')
+        self.redis.lpop('list')
+        eq_(['rpush', 'lpop'], self.redis.pubsub['__keyspace@0__:list'])
+
+    def test_class_without_channel(self):
+        self.redis.config_set('notify-keyspace-events', 'A')
+        self.redis.set('key', 'value')
+        eq_({}, dict(self.redis.pubsub))
+
+    def test_expired(self):
+        clock = VirtualClock()
+        redis = MockRedis(clock=clock, db=3)
+        redis.config_set('notify-keyspace-events', 'Ex')
+        redis.set('first', 'value', ex=10)
+        redis.set('second', 'value', ex=5)
+        clock.advance(20)
+        eq_(['second', 'first'], redis.pubsub['__keyevent@3__:expired'])
+
+    def test_zadd_without_changes(self):
+        self.redis.config_set('notify-keyspace-events', 'Kz')
+        self.redis.zadd('zset', one=1, two=2)
+        self.redis.zadd('zset', one=1)
+        self.redis.zadd('zset', one=3)
+        eq_(['zadd', 'zadd'], self.redis.pubsub['__keyspace@0__:zset'])
+
+    def test_spop_without_members(self):
+        self.redis.config_set('notify-keyspace-events', 'Ks')
+        self.redis.sadd('set', 'one')
+        eq_([], self.redis.spop('set', 0))
+        eq_(['sadd'], self.redis.pubsub['__keyspace@0__:set'])
+
+    def test_bitfield_without_writes(self):
+        self.redis.config_set('notify-keyspace-events', 'K$')
+        self.redis.bitfield('key').get('u8', 0).execute()
+        self.redis.bitfield('key').set('u2', 0, 1).execute()
+        self.redis.bitfield('key').overflow('FAIL').incrby('u2', 0, 10).execute()
+        eq_(['setbit'], self.redis.pubsub['__keyspace@0__:key'])
@@ -0,0 +1,135 @@
+from nose.tools import assert_raises, eq_, ok_
+
+from mockredis.quicklist import QuickList
+
+
+class TestQuickList(object):
+    """
+    Tests the quicklist data structure, not the redis commands.
+    """
+
+    def setup(self):
+        # small chunks so that every test spans several of them
+        self.qlist = QuickList(chunk_size=4)
+
+    def test_initially_empty(self):
+        """
+        Quicklist is created empty.
+        """
+        eq_(0, len(self.qlist))
+        eq_([], list(self.qlist))
+        with assert_raises(IndexError):
+            self.qlist.pop()
+        with assert_raises(IndexError):
+            self.qlist.popleft()
+
+    def test_push_and_pop(self):
+        """
+        Values pushed at both ends come back in order.
+        """
+        self.qlist.extend(range(10))
+        self.qlist.extendleft(range(10, 20))
+        eq_(list(range(19, 9, -1)) + list(range(10)), list(self.qlist))
+        eq_(list(reversed(list(self.qlist))), list(reversed(self.qlist)))
+
+        eq_(19, self.qlist.popleft())
+        eq_(9, self.qlist.pop())
+        eq_(18, len(self.qlist))
+        for _ in range(18):
+            self.qlist.pop()
+        eq_(0, len(self.qlist))
+        eq_([], list(self.qlist))
+
+    def test_indexing(self):
+        """
+        Positional access works from either end.
+        """
+        values = list(range(23))
+        self.qlist.extend(values)
+        for index in range(-23, 23):
+            eq_(values[index], self.qlist[index])
+        with assert_raises(IndexError):
+            self.qlist[23]
+        with assert_raises(IndexError):
+            self.qlist[-24]
+
+        self.qlist[17] = 'x'
+        values[17] = 'x'
+        eq_(values, list(self.qlist))
+
+    def test_slicing(self):
+        values = list(range(23))
+        self.qlist.extend(values)
+        for start in range(-25, 25):
+            for stop in range(-25, 25):
+                eq_(values[start:stop], self.qlist[start:stop])
+        eq_(values[::3], self.qlist[::3])
+
+    def test_insert(self):
+        """
+        Insertion in the middle splits full chunks.
+        """
+        values = list(range(10))
+        self.qlist.extend(values)
+        for index, value in [(5, 'a'), (0, 'b'), (-1, 'c'), (100, 'd'), (6, 'e'), (6, 'f')]:
+            values.insert(index, value)
+            self.qlist.insert(index, value)
+            eq_(values, list(self.qlist))
+        ok_(all(len(chunk) <= 4 for chunk in self.qlist._chunks))
+
+    def test_delete(self):
+        values = list(range(10))
+        self.qlist.extend(values)
+        for index in [5, 0, -1, 3, 3, 3]:
+            del values[index]
+            del self.qlist[index]
+            eq_(values, list(self.qlist))
+        ok_(all(self.qlist._chunks))
+
+    def test_remove_and_count(self):
+        self.qlist.extend([1, 2, 1, 3, 1, 4, 5, 1])
+        eq_(4, self.qlist.count(1))
+        self.qlist.remove(1)
+        self.qlist.remove(4)
+        eq_([2, 1, 3, 1, 5, 1], list(self.qlist))
+        with assert_raises(ValueError):
+            self.qlist.remove(4)
+
+    def test_equality(self):
+        self.qlist.extend([1, 2, 3])
+        eq_(QuickList([1, 2, 3]), self.qlist)
+        eq_([1, 2, 3], self.qlist)
+        ok_(self.qlist != [1, 2])
+        ok_(self.qlist != (1, 2, 3))
+
+    def test_remove_value(self):
+        values = [1, 2, 1, 3, 1, 4, 1, 5, 1, 6, 1]
+        for count, expected in [(0, [2, 3, 4, 5, 6]),
+                                (2, [2, 3, 1, 4, 1, 5, 1, 6, 1]),
+                                (-3, [1, 2, 1, 3, 1, 4, 5, 6]),
+                                (100, [2, 3, 4, 5, 6]),
+                                (-100, [2, 3, 4, 5, 6])]:
+            qlist = QuickList(values, chunk_size=3)
+            eq_(len(values) - len(expected), qlist.remove_value(1, count))
+            eq_(expected, list(qlist))
+            eq_(len(expected), len(qlist))
+            ok_(all(qlist._chunks))
+        eq_(0, QuickList(values).remove_value(7))
+
+    def test_trim(self):
+        values = list(range(23))
+        for start, stop in [(0, 22), (5, 17), (0, 0), (22, 22), (4, 3), (20, 100), (30, 40)]:
+            qlist = QuickList(values, chunk_size=4)
+            qlist.trim(start, stop)
+            eq_(values[start:stop + 1], list(qlist))
+            eq_(len(values[start:stop + 1]), len(qlist))
+            ok_(all(qlist._chunks))
+
+    def test_find(self):
+        values = [1, 2, 1, 3, 1, 4, 1, 5, 1, 6]
+        qlist = QuickList(values, chunk_size=3)
+        eq_([0, 2, 4, 6, 8], list(qlist.find(1)))
+        eq_([8, 6, 4, 2, 0], list(qlist.find(1, reverse=True)))
+        eq_([0, 2, 4], list(qlist.find(1, maxlen=6)))
+        eq_([8, 6], list(qlist.find(1, reverse=True, maxlen=4)))
+        eq_([], list(qlist.find(7)))
@@ -4,6 +4,7 @@ import sys
 
 from nose.tools import assert_raises, eq_, ok_
 
+from mockredis.exceptions import ResponseError
 from mockredis.tests.fixtures import setup
 
 if sys.version_info >= (3, 0):
@@ -51,6 +52,23 @@ class TestRedis(object):
 
             self.redis.flushdb()
 
+    def test_object_encoding(self):
+        eq_(None, self.redis.object('encoding', 'key'))
+        self.redis.set('key', 'value')
+        eq_('embstr', self.redis.object('encoding', 'key'))
+        self.redis.set('key', 'x' * 100)
+        eq_('raw', self.redis.object('encoding', 'key'))
+
+        self.redis.sadd('skey', 1, 2)
+        eq_('intset', self.redis.object('encoding', 'skey'))
+        self.redis.sadd('skey', 'three')
+        eq_('hashtable', self.redis.object('encoding', 'skey'))
+
+        self.redis.hset('hkey', 'item', 'value')
+        eq_('listpack', self.redis.object('encoding', 'hkey'))
+        self.redis.hset('hkey', 'item', 'x' * 100)
+        eq_('hashtable', self.redis.object('encoding', 'hkey'))
+
     def test_incr(self):
         '''
         incr, hincr when keys exist
@@ -76,6 +94,52 @@ class TestRedis(object):
 
             self.redis.flushdb()
 
+    def test_incr_encoding(self):
+        '''
+        counters are kept int-encoded, but read back as strings
+        '''
+        eq_(5, self.redis.incr('key', 5))
+        eq_(3, self.redis.decr('key', 2))
+        eq_('int', self.redis.object('encoding', 'key'))
+        eq_('3', self.redis.get('key'))
+        eq_(['3', None], self.redis.mget('key', 'other'))
+
+        self.redis.set('key', 10)
+        eq_('int', self.redis.object('encoding', 'key'))
+        eq_('10', self.redis.get('key'))
+
+        eq_(7, self.redis.hincrby('hkey', 'attr', 7))
+        eq_('7', self.redis.hget('hkey', 'attr'))
+        eq_({'attr': '7'}, self.redis.hgetall('hkey'))
+        eq_(['7'], self.redis.hvals('hkey'))
+
+    def test_incr_errors(self):
+        self.redis.set('key', 'one')
+        with assert_raises(ResponseError):
+            self.redis.incr('key')
+        self.redis.set('key', 2 ** 63 - 1)
+        with assert_raises(ResponseError):
+            self.redis.incr('key')
+        self.redis.hset('hkey', 'attr', 'one')
+        with assert_raises(ResponseError):
+            self.redis.hincrby('hkey', 'attr')
+
+    def test_incrbyfloat(self):
+        eq_(10.5, self.redis.incrbyfloat('key', 10.5))
+        eq_('10.5', self.redis.get('key'))
+        eq_(11.0, self.redis.incrbyfloat('key', 0.5))
+        eq_('11', self.redis.get('key'))
+        eq_(6.0, self.redis.incrbyfloat('key', -5))
+        self.redis.set('key', 0)
+        eq_(5e20, self.redis.incrbyfloat('key', 5e20))
+        eq_('500000000000000000000', self.redis.get('key'))
+
+        self.redis.incr('ikey')
+        eq_(1.5, self.redis.incrbyfloat('ikey', 0.5))
+        self.redis.set('key', 'one')
+        with assert_raises(ResponseError):
+            self.redis.incrbyfloat('key')
+
     def test_incr_init(self):
         '''
         incr, hincr, decr when keys do NOT exist
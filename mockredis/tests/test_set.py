@@ -1,5 +1,6 @@
 from nose.tools import assert_raises, eq_, ok_
 
+from mockredis.exceptions import ResponseError
 from mockredis.tests.fixtures import setup
 
 
@@ -103,6 +104,36 @@ class TestRedisSet(object):
         eq_(0, self.redis.sinterstore("w", ["x", "y"], "z"))
         eq_(set(), self.redis.smembers("w"))
 
+    def test_sinterstore_empty(self):
+        """
+        Storing an empty result deletes the destination.
+        """
+        self.redis.sadd("x", "one")
+        self.redis.sadd("y", "two")
+        self.redis.sadd("w", "three")
+        eq_(0, self.redis.sinterstore("w", "x", "y"))
+        eq_(0, self.redis.sdiffstore("w", "x", "x"))
+        eq_(0, self.redis.sunionstore("w", "v"))
+        eq_(set(["x", "y"]), set(self.redis.keys("*")))
+
+    def test_sintercard(self):
+        self.redis.sadd("x", "one", "two", "three", "four")
+        self.redis.sadd("y", "one", "two", "three")
+        self.redis.sadd("z", "two", "three", "five")
+
+        eq_(0, self.redis.sintercard(1, ["w"]))
+        eq_(4, self.redis.sintercard(1, ["x"]))
+        eq_(3, self.redis.sintercard(2, ["x", "y"]))
+        eq_(2, self.redis.sintercard(3, ["x", "y", "z"]))
+        eq_(0, self.redis.sintercard(4, ["x", "y", "z", "w"]))
+        eq_(1, self.redis.sintercard(3, ["x", "y", "z"], limit=1))
+        eq_(2, self.redis.sintercard(3, ["x", "y", "z"], limit=5))
+
+        with assert_raises(ResponseError):
+            self.redis.sintercard(2, ["x"])
+        with assert_raises(ResponseError):
+            self.redis.sintercard(1, ["x"], limit=-1)
+
     def test_sismember(self):
         key = "set"
         ok_(not self.redis.sismember(key, "one"))
@@ -113,6 +144,13 @@ class TestRedisSet(object):
         ok_(not self.redis.sismember(key, "two"))
         eq_(0, self.redis.sismember(key, "two"))
 
+    def test_smismember(self):
+        key = "set"
+        eq_([0, 0], self.redis.smismember(key, ["one", "two"]))
+        self.redis.sadd(key, "one", "three", 4)
+        eq_([1, 0, 1], self.redis.smismember(key, ["one", "two", "three"]))
+        eq_([1, 0, 1], self.redis.smismember(key, "one", "two", 4))
+
     def test_ismember_numeric(self):
         """
         Verify string conversion.
@@ -175,6 +213,19 @@ class TestRedisSet(object):
         eq_(0, self.redis.scard(key))
         eq_([], self.redis.keys("*"))
 
+    def test_spop_count(self):
+        key = "set"
+        eq_([], self.redis.spop(key, 2))
+        values = ["one", "two", "three"]
+        self.redis.sadd(key, *values)
+        first = self.redis.spop(key, 2)
+        eq_(2, len(first))
+        eq_(1, self.redis.scard(key))
+        second = self.redis.spop(key, 2)
+        eq_(1, len(second))
+        eq_(set(values), set(first + second))
+        eq_([], self.redis.keys("*"))
+
     def test_srandmember(self):
         key = "set"
         # count is None
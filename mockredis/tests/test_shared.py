@@ -0,0 +1,42 @@
+from nose.tools import eq_, ok_
+
+from mockredis import MockRedis
+from mockredis.shared import SHARED_INTEGERS, shared
+
+
+def _fresh(text):
+    """
+    Build a string at runtime, so it is not a compile-time constant.
+    """
+    return "".join(list(text))
+
+
+def test_shared_integers():
+    ok_(shared(int(_fresh("9999"))) is shared(int(_fresh("9999"))))
+    eq_(SHARED_INTEGERS, shared(SHARED_INTEGERS))
+    eq_(-1, shared(-1))
+
+
+def test_shared_strings():
+    ok_(shared(_fresh("flag")) is shared(_fresh("flag")))
+    long_value = _fresh("a longer string value")
+    ok_(shared(long_value) is long_value)
+
+
+def test_shared_values():
+    """
+    Equal small values stored under different keys are the same object.
+    """
+    redis = MockRedis()
+    redis.set("a", 1234)
+    redis.incrby("b", 1234)
+    ok_(redis.redis["a"] is redis.redis["b"])
+
+    redis.hset("h1", "flag", _fresh("on"))
+    redis.hmset("h2", {"flag": _fresh("on")})
+    redis.rpush("l", _fresh("on"))
+    redis.sadd("s", _fresh("on"))
+    value = redis.redis["h1"]["flag"]
+    ok_(redis.redis["h2"]["flag"] is value)
+    ok_(redis.redis["l"][0] is value)
+    ok_(list(redis.redis["s"])[0] is value)
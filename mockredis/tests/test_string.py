@@ -28,6 +28,36 @@ class TestRedisString(object):
         eq_(['value1', 'value2'], self.redis.mget('mget1', 'mget2'))
         eq_(['value1', 'value2'], self.redis.mget(['mget1', 'mget2']))
 
+    def test_mset_clears_ttl(self):
+        self.redis.set('key1', 'old', ex=200)
+        ok_(self.redis.mset({'key1': 'value1', 'key2': 2, 'key3': 'a long string value'}))
+        eq_(['value1', '2', 'a long string value'], self.redis.mget('key1', 'key2', 'key3'))
+        eq_(None, self.redis.ttl('key1'))
+        ok_(self.redis.mset(key4='value4'))
+        eq_('value4', self.redis.get('key4'))
+
+    def test_msetnx_is_atomic(self):
+        ok_(self.redis.msetnx({'key1': 'value1', 'key2': 'value2'}))
+        ok_(not self.redis.msetnx({'key2': 'other', 'key3': 'value3'}))
+        eq_(['value1', 'value2', None], self.redis.mget('key1', 'key2', 'key3'))
+
+    def test_msetex(self):
+        self.redis.set('key1', 'old')
+        ok_(self.redis.msetex({'key1': 'value1', 'key2': 'value2'}, ex=200))
+        eq_(['value1', 'value2'], self.redis.mget('key1', 'key2'))
+        ok_(0 < self.redis.ttl('key1') <= 200)
+        ok_(0 < self.redis.pttl('key2') <= 200000)
+
+        ok_(not self.redis.msetex({'key2': 'other', 'key3': 'value3'}, px=1000, nx=True))
+        ok_(not self.redis.msetex({'key2': 'other', 'key3': 'value3'}, px=1000, xx=True))
+        eq_(['value2', None], self.redis.mget('key2', 'key3'))
+        ok_(self.redis.msetex({'key1': 'new', 'key2': 'new'}, px=1000, xx=True))
+        ok_(self.redis.pttl('key1') <= 1000)
+
+    @raises_response_error
+    def test_msetex_requires_expiry(self):
+        self.redis.msetex({'key': 'value'})
+
     def test_set_no_options(self):
         self.redis.set('key', 'value')
         eq_('value', self.redis.get('key'))
@@ -278,3 +308,61 @@ class TestRedisString(object):
         eq_(None, self.redis.getset('getset_key', '1'))
         eq_('1', self.redis.getset('getset_key', '2'))
         eq_('2', self.redis.get('getset_key'))
+
+    def test_append(self):
+        eq_(5, self.redis.append('key', 'hello'))
+        eq_(11, self.redis.append('key', ' world'))
+        eq_('hello world', self.redis.get('key'))
+        eq_(11, self.redis.strlen('key'))
+
+        self.redis.set('counter', 12)
+        eq_(3, self.redis.append('counter', '3'))
+        eq_(124, self.redis.incr('counter'))
+
+    def test_append_keeps_ttl(self):
+        self.redis.set('key', 'hello', ex=200)
+        self.redis.append('key', ' world')
+        ok_(self.redis.ttl('key') > 0)
+
+    def test_getrange(self):
+        self.redis.set('key', 'This is a string')
+        eq_('This', self.redis.getrange('key', 0, 3))
+        eq_('ing', self.redis.getrange('key', -3, -1))
+        eq_('This is a string', self.redis.getrange('key', 0, -1))
+        eq_('string', self.redis.getrange('key', 10, 100))
+        eq_('', self.redis.getrange('key', 5, 3))
+        eq_('', self.redis.getrange('key', -1, -5))
+        eq_('', self.redis.getrange('missing', 0, -1))
+
+        self.redis.append('key', '!')
+        eq_('string!', self.redis.getrange('key', -7, -1))
+
+    def test_getrange_counts_bytes(self):
+        self.redis.set('key', u'h\xe9llo')
+        eq_(u'h\xe9', self.redis.getrange('key', 0, 2))
+        eq_(u'llo', self.redis.getrange('key', 3, -1))
+        eq_(b'h\xc3', self.redis.getrange('key', 0, 1))
+
+    def test_setrange(self):
+        self.redis.set('key', 'Hello World')
+        eq_(11, self.redis.setrange('key', 6, 'Redis'))
+        eq_('Hello Redis', self.redis.get('key'))
+        eq_(13, self.redis.setrange('key', 11, '!!'))
+        eq_('Hello Redis!!', self.redis.get('key'))
+
+        eq_(8, self.redis.setrange('padded', 5, 'abc'))
+        eq_('\x00\x00\x00\x00\x00abc', self.redis.get('padded'))
+
+        eq_(0, self.redis.setrange('missing', 5, ''))
+        ok_('missing' not in self.redis.keys())
+
+    @raises_response_error
+    def test_setrange_negative_offset(self):
+        self.redis.setrange('key', -1, 'value')
+
+    def test_strlen(self):
+        eq_(0, self.redis.strlen('missing'))
+        self.redis.set('key', 'value')
+        eq_(5, self.redis.strlen('key'))
+        self.redis.set('key', 12345)
+        eq_(5, self.redis.strlen('key'))
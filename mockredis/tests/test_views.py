@@ -0,0 +1,83 @@
+import gc
+
+from nose.tools import assert_raises, eq_, ok_
+
+from mockredis import MockRedis
+from mockredis.views import HashView, SetView
+
+
+class TestViews(object):
+    """
+    Tests zero-copy mode, in which sets and hashes are returned as copy-on-write views.
+    """
+
+    def setup(self):
+        self.redis = MockRedis(zero_copy=True)
+
+    def test_smembers(self):
+        self.redis.sadd("x", "one", "two")
+        members = self.redis.smembers("x")
+        ok_(isinstance(members, SetView))
+        ok_(members.shares(self.redis.redis["x"]))
+        eq_(set(["one", "two"]), members)
+        eq_(set(["two"]), members & set(["two", "three"]))
+        with assert_raises(AttributeError):
+            members.add("three")
+
+    def test_set_copy_on_write(self):
+        """
+        Modifying a set copies it if (and only if) a view of it is alive.
+        """
+        self.redis.sadd("x", "one", "two")
+        members = self.redis.smembers("x")
+        self.redis.sadd("x", "three")
+        self.redis.srem("x", "one")
+        eq_(set(["one", "two"]), members)
+        eq_(set(["two", "three"]), self.redis.smembers("x"))
+
+        stored = self.redis.redis["x"]
+        del members
+        gc.collect()
+        self.redis.sadd("x", "four")
+        ok_(self.redis.redis["x"] is stored)
+
+    def test_spop_and_smove(self):
+        self.redis.sadd("x", "one")
+        self.redis.sadd("y", "two")
+        x_members = self.redis.smembers("x")
+        y_members = self.redis.smembers("y")
+        ok_(self.redis.smove("x", "y", "one"))
+        eq_(set(["one"]), x_members)
+        eq_(set(["two"]), y_members)
+
+        y_members = self.redis.smembers("y")
+        popped = self.redis.spop("y")
+        eq_(set(["one", "two"]), y_members)
+        eq_(set(["one", "two"]) - set([popped]), self.redis.smembers("y"))
+
+    def test_hgetall(self):
+        self.redis.hset("h", "a", 1)
+        fields = self.redis.hgetall("h")
+        ok_(isinstance(fields, HashView))
+        eq_({"a": "1"}, fields)
+        with assert_raises(TypeError):
+            fields["b"] = "2"
+
+    def test_hash_copy_on_write(self):
+        self.redis.hmset("h", {"a": 1, "b": 2})
+        fields = self.redis.hgetall("h")
+        keys = self.redis.hkeys("h")
+        values = self.redis.hvals("h")
+        self.redis.hset("h", "c", 3)
+        self.redis.hincrby("h", "a")
+        self.redis.hdel("h", "b")
+        eq_({"a": "1", "b": "2"}, fields)
+        eq_(set(["a", "b"]), set(keys))
+        eq_(set(["1", "2"]), set(values))
+        eq_({"a": "2", "c": "3"}, self.redis.hgetall("h"))
+
+    def test_scan(self):
+        self.redis.sadd("x", "one", "two")
+        self.redis.hmset("h", {"a": 1, "b": 2})
+        eq_(["0", ["one", "two"]], self.redis.sscan("x"))
+        eq_(["0", {"a": "1", "b": "2"}], self.redis.hscan("h"))
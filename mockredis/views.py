@@ -0,0 +1,79 @@
+"""
+Read-only views of sets and hashes, returned instead of copies in zero-copy mode.
+
+A view reads the stored structure directly. MockRedis keeps track of live views, and a
+command that modifies a structure while a view of it is alive first replaces the stored
+structure with a copy (copy-on-write), so the view keeps seeing the contents it was created
+with.
+"""
+try:
+    from collections.abc import Mapping, Set
+except ImportError:
+    from collections import Mapping, Set
+
+
+class SetView(Set):
+    """
+    An immutable view of a redis set.
+
+    Supports the read-only operations of Python sets; the results of set operators such as
+    ``&`` and ``|`` are ordinary sets.
+    """
+
+    def __init__(self, members, decode):
+        self._members = members
+
+    @classmethod
+    def _from_iterable(cls, iterable):
+        return set(iterable)
+
+    def shares(self, value):
+        """
+        Return whether this view reads ``value``.
+        """
+        return self._members is value
+
+    def __contains__(self, member):
+        return member in self._members
+
+    def __iter__(self):
+        return iter(self._members)
+
+    def __len__(self):
+        return len(self._members)
+
+    def __repr__(self):
+        return "SetView({})".format(set(self._members))
+
+
+class HashView(Mapping):
+    """
+    An immutable view of a redis hash.
+
+    Values are converted with ``decode`` as they are read.
+    """
+
+    def __init__(self, fields, decode):
+        self._fields = fields
+        self._decode = decode
+
+    def shares(self, value):
+        """
+        Return whether this view reads ``value``.
+        """
+        return self._fields is value
+
+    def __getitem__(self, attribute):
+        return self._decode(self._fields[attribute])
+
+    def __contains__(self, attribute):
+        return attribute in self._fields
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __repr__(self):
+        return "HashView({})".format(dict(self.items()))